@@ -0,0 +1,40 @@
+"""Gunicorn configuration for spareparts_manager.
+
+The app is served through its ASGI entry point using uvicorn workers, so
+the async JSON endpoints can hold many idle connections per process while
+the remaining sync views run in Django's thread pool.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+wsgi_app = "spareparts_manager.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 75))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+
+# Workers write Prometheus samples to mmap files in this directory so that
+# /metrics reports totals for the whole server. It must be set before any
+# worker imports prometheus_client.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "partstrack-metrics"),
+)
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    """Start every server run with an empty metrics directory."""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Drop live-gauge files of workers that have exited."""
+    from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,177 @@
+"""Non-blocking, batched handlers for the JSON access log.
+
+``AsyncAccessLogHandler`` is configured in ``LOGGING`` for the
+``inventory.access`` logger. Request threads only put records on an
+in-memory queue; a background thread formats them and hands them to a
+:class:`BatchedRotatingFileHandler`, which writes them to disk in batches
+and rotates by size. The handler builds its own queue and listener because
+``dictConfig`` only learned to configure queue handlers in Python 3.12.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that writes records in batches.
+
+    Formatted records are held in memory until ``batch_size`` are waiting
+    or the oldest is ``flush_interval`` seconds old, then written with a
+    single write and flush.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        filename,
+        maxBytes=0,  # pylint: disable=invalid-name
+        backupCount=0,  # pylint: disable=invalid-name
+        batch_size=100,
+        flush_interval=1.0,
+        encoding="utf-8",
+    ):
+        super().__init__(
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            encoding=encoding,
+            delay=True,
+        )
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            self._pending.append(self.format(record) + self.terminator)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+            return
+        if (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write pending records, rotating first if they would overflow."""
+        self.acquire()
+        try:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            data = "".join(self._pending)
+            self._pending = []
+            if self.stream is None:
+                self.stream = self._open()
+            size = self.stream.tell()
+            if self.maxBytes > 0 and size > 0 and size + len(data) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class AsyncAccessLogHandler(QueueHandler):
+    """Queue handler that never blocks the logging thread on disk I/O.
+
+    Records go onto a bounded queue; when it is full they are dropped and
+    counted in ``dropped`` rather than stalling the request. The writer
+    thread is started lazily in each process, so handlers created before a
+    server forks its workers still get a thread per worker.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        filename,
+        maxBytes=0,  # pylint: disable=invalid-name
+        backupCount=0,  # pylint: disable=invalid-name
+        batch_size=100,
+        flush_interval=1.0,
+        queue_size=10000,
+    ):
+        super().__init__(queue.Queue(queue_size))
+        self.target = BatchedRotatingFileHandler(
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+        )
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _running(self):
+        """Return True if this process's writer thread is alive."""
+        return (
+            self._pid == os.getpid()
+            and self._thread is not None
+            and self._thread.is_alive()
+        )
+
+    def _ensure_thread(self):
+        if self._running():
+            return
+        with self._start_lock:
+            if self._running():
+                return
+            self._thread = threading.Thread(
+                target=self._drain,
+                name="access-log-writer",
+                daemon=True,
+            )
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _drain(self):
+        """Writer thread: hand queued records to the file handler."""
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.target.flush()
+                continue
+            try:
+                if record is None:
+                    self.target.flush()
+                    return
+                self.target.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def enqueue(self, record):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record has been written to disk."""
+        if not self._running():
+            return
+        self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        if self._running():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._pid = None
+        self.target.close()
+        super().close()
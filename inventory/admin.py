@@ -1,12 +1,220 @@
 """Admin configuration for the inventory app."""
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import SparePart, UserProfile, Sale
+from . import archive, bulk, forecast, outbox, purchasing, scorecard
+from .models import (
+    Category,
+    Job,
+    OutboxEmail,
+    PurchaseOrder,
+    PurchaseOrderLine,
+    SparePart,
+    Supplier,
+    UserProfile,
+    Sale,
+)
+
+# Unfiltered changelists larger than this show an estimated row count.
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimated_row_count(model):
+    """Return a cheap estimate of the number of rows in ``model``'s table.
+
+    Returns None when no trustworthy estimate is available.
+    """
+    # pylint: disable=protected-access
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
+    if connection.vendor != 'sqlite':
+        return None
+    # Like reltuples above, the row count recorded by the last ANALYZE. The
+    # nightly ``db.analyze`` job and each archive run refresh it, so it lags
+    # behind by at most a day of inserts.
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [table],
+            )
+        except OperationalError:
+            # No ANALYZE has ever run, so sqlite_stat1 does not exist.
+            return None
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids COUNT(*) over large unfiltered tables."""
+
+    @cached_property
+    def count(self):
+        """Return the estimate for large unfiltered tables, else the exact count."""
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_row_count(self.object_list.model)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AutocompleteListFilter(admin.SimpleListFilter):
+    """Sidebar filter on a foreign key using an autocomplete widget.
+
+    Unlike the default related filter it never loads every related row;
+    the target model's admin must define ``search_fields``. ModelAdmins
+    using it should inherit :class:`AutocompleteFilterMixin` for the media.
+    """
+    template = 'admin/inventory/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # pylint: disable=protected-access
+        field = model._meta.get_field(self.field_name)
+        # Bound to a form field so the selected object's label can be shown.
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+        )
+        self.rendered_widget = form_field.widget.render(
+            self.parameter_name,
+            self.value(),
+            attrs={'data-filter-param': self.parameter_name, 'style': 'width: 100%'},
+        )
+
+    def lookups(self, request, model_admin):
+        """Choices are fetched by the widget, not listed up front."""
+        return ()
+
+    def has_output(self):
+        """Always show the filter, even though it has no fixed choices."""
+        return True
+
+    def queryset(self, request, queryset):
+        """Filter by the selected related object."""
+        if self.value():
+            return queryset.filter(**{f'{self.field_name}__pk': self.value()})
+        return queryset
+
+
+class SupplierAutocompleteFilter(AutocompleteListFilter):
+    """Filter parts by supplier."""
+    title = 'supplier'
+    parameter_name = 'supplier'
+    field_name = 'supplier'
+
+
+class PartAutocompleteFilter(AutocompleteListFilter):
+    """Filter sales by part."""
+    title = 'part'
+    parameter_name = 'part'
+    field_name = 'part'
+
+
+class AutocompleteFilterMixin:
+    """Add the autocomplete widget's scripts to the changelist page."""
+
+    @property
+    def media(self):
+        """Include Select2 and the admin autocomplete scripts."""
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, type) and issubclass(list_filter, AutocompleteListFilter):
+                # pylint: disable=protected-access
+                field = self.model._meta.get_field(list_filter.field_name)
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+class ScalableChangeListMixin:
+    """Changelist settings for tables that grow without bound."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StockStatusListFilter(admin.SimpleListFilter):
+    """Filter parts by stock status (in stock, low stock, out of stock)."""
+    title = 'stock status'
+    parameter_name = 'stock'
+
+    def lookups(self, request, model_admin):
+        """Return the available stock statuses."""
+        return (
+            ('in', 'In stock'),
+            ('low', 'Low stock'),
+            ('out', 'Out of stock'),
+        )
+
+    def queryset(self, request, queryset):
+        """Filter the parts by the selected stock status."""
+        if self.value() == 'in':
+            return queryset.filter(quantity__gt=F('minimum_stock'))
+        if self.value() == 'low':
+            return queryset.filter(quantity__lte=F('minimum_stock'), quantity__gt=0)
+        if self.value() == 'out':
+            return queryset.filter(quantity__lte=0)
+        return queryset
+
+
+class BulkUpdateActionForm(ActionForm):
+    """Action bar inputs for the bulk part actions."""
+    value = forms.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        help_text='Percent for prices, units for stock and quantity.',
+    )
+    new_supplier = forms.ModelChoiceField(
+        queryset=Supplier.objects.all(),
+        required=False,
+        widget=AutocompleteSelect(
+            SparePart._meta.get_field('supplier'),  # pylint: disable=protected-access
+            admin.site,
+        ),
+    )
+
+
+# SUPPLIER ADMIN
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    """Admin configuration for Supplier; also backs the supplier autocomplete."""
+    list_display = ('name', 'email', 'phone', 'created_at')
+    search_fields = ('name', 'email')
+    ordering = ('name',)
+    list_per_page = 25
+
+
+# CATEGORY ADMIN
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    """Admin configuration for Category; the counters are maintained, not edited."""
+    list_display = ('name', 'part_count', 'low_stock_count', 'stock_value')
+    search_fields = ('name',)
+    readonly_fields = ('part_count', 'low_stock_count', 'stock_value')
+    ordering = ('name',)
+    list_per_page = 25
 
 
 # SPARE PARTS ADMIN
 @admin.register(SparePart)
-class SparePartAdmin(admin.ModelAdmin):
+class SparePartAdmin(AutocompleteFilterMixin, ScalableChangeListMixin, admin.ModelAdmin):
     """Admin configuration for SparePart with advanced search and filters."""
     list_display = (
         'part_name',
@@ -16,21 +224,43 @@ class SparePartAdmin(admin.ModelAdmin):
         'stock_status_badge',
         'price',
         'supplier',
+        'abc_class',
     )
     list_filter = (
         'category',
-        'supplier',
-        ('quantity', admin.EmptyFieldListFilter),
+        SupplierAutocompleteFilter,
+        StockStatusListFilter,
+        'abc_class',
     )
     search_fields = (
+        'part_number',
         'part_name',
         'description',
-        'category',
-        'supplier',
+        'category__name',
+        'supplier__name',
+    )
+    readonly_fields = (
+        'stock_status_badge',
+        'suggested_minimum_stock',
+        'suggested_reorder_quantity',
+        'forecast_daily_demand',
+        'forecast_at',
+        'abc_class',
+        'annual_revenue',
+        'annual_units',
     )
-    readonly_fields = ('stock_status_badge',)
     ordering = ('quantity',)  # Default: lowest stock first
     list_per_page = 25
+    list_select_related = ('supplier', 'category')
+    action_form = BulkUpdateActionForm
+    actions = (
+        'adjust_price',
+        'set_minimum_stock',
+        'reassign_supplier',
+        'adjust_quantity',
+        'apply_forecast',
+        'archive_selected',
+    )
 
     fieldsets = (
         ('Basic Information', {
@@ -40,6 +270,15 @@ class SparePartAdmin(admin.ModelAdmin):
             'fields': ('quantity', 'minimum_stock', 'reorder_quantity',
                       'stock_status_badge')
         }),
+        ('Demand Forecast', {
+            'fields': ('suggested_minimum_stock', 'suggested_reorder_quantity',
+                      'forecast_daily_demand', 'forecast_at'),
+            'classes': ('collapse',),
+        }),
+        ('ABC Classification', {
+            'fields': ('abc_class', 'annual_revenue', 'annual_units'),
+            'classes': ('collapse',),
+        }),
         ('Pricing', {
             'fields': ('price',)
         }),
@@ -74,15 +313,95 @@ class SparePartAdmin(admin.ModelAdmin):
 
     stock_status_badge.short_description = 'Stock Status'
 
-    def get_queryset(self, request):
-        """Optimize queryset with select_related."""
-        queryset = super().get_queryset(request)
-        return queryset.select_related('supplier')
+    # Stock levels are whole units; "7.9" is rejected rather than truncated.
+    whole_number_fields = {
+        'set_minimum_stock': forms.IntegerField(min_value=0),
+        'adjust_quantity': forms.IntegerField(),
+    }
+
+    def _run_bulk_operation(self, request, queryset, operation):
+        """Apply a bulk operation with the value entered in the action bar."""
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(request, 'Invalid value.', messages.ERROR)
+            return
+        if operation == 'reassign_supplier':
+            value = form.cleaned_data['new_supplier']
+        else:
+            value = form.cleaned_data['value']
+            if value is None:
+                self.message_user(request, 'Enter a value first.', messages.ERROR)
+                return
+            if operation in self.whole_number_fields:
+                try:
+                    value = self.whole_number_fields[operation].clean(value)
+                except forms.ValidationError as exc:
+                    self.message_user(request, ' '.join(exc.messages), messages.ERROR)
+                    return
+        try:
+            updated = bulk.apply_operation(queryset, operation, value)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        self.message_user(request, f"{updated} part(s) updated.")
+
+    @admin.action(description='Adjust price by percent')
+    def adjust_price(self, request, queryset):
+        """Multiply prices by (1 + value / 100) in one UPDATE."""
+        self._run_bulk_operation(request, queryset, 'adjust_price')
+
+    @admin.action(description='Set minimum stock')
+    def set_minimum_stock(self, request, queryset):
+        """Set minimum stock to the entered value in one UPDATE."""
+        self._run_bulk_operation(request, queryset, 'set_minimum_stock')
+
+    @admin.action(description='Reassign supplier')
+    def reassign_supplier(self, request, queryset):
+        """Move the parts to the chosen supplier in one UPDATE."""
+        self._run_bulk_operation(request, queryset, 'reassign_supplier')
+
+    @admin.action(description='Adjust quantity by')
+    def adjust_quantity(self, request, queryset):
+        """Add the entered value to every quantity in one UPDATE."""
+        self._run_bulk_operation(request, queryset, 'adjust_quantity')
+
+    @admin.action(description='Apply forecast reorder suggestions')
+    def apply_forecast(self, request, queryset):
+        """Copy suggested minimum stock and reorder quantity in one UPDATE."""
+        updated = forecast.apply_suggestions(queryset)
+        self.message_user(request, f"{updated} part(s) updated.")
+
+    @admin.action(description='Archive selected parts and their sales')
+    def archive_selected(self, request, queryset):
+        """Move the parts and their sales into the archive tables."""
+        parts, sales = archive.archive_parts(queryset)
+        self.message_user(request, f"{parts} part(s) and {sales} sale(s) archived.")
+
+    def get_deleted_objects(self, objs, request):
+        """Summarize a delete without letting the collector load every sale."""
+        parts = list(objs)
+        sales = Sale.objects.filter(part__in=parts).count()
+        perms_needed = set() if self.has_delete_permission(request) else {'spare part'}
+        return (
+            [str(part) for part in parts],
+            {'spare parts': len(parts), 'sales (kept in revenue rollups)': sales},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        """Delete through the set-based path in ``inventory.archive``."""
+        archive.delete_parts(SparePart.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        """Delete through the set-based path in ``inventory.archive``."""
+        archive.delete_parts(queryset)
 
 
 # USER PROFILE ADMIN
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     """Admin configuration for UserProfile with advanced search and filters."""
     list_display = (
         'get_username',
@@ -105,6 +424,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('user', 'role_badge')
     ordering = ('user__username',)
     list_per_page = 25
+    list_select_related = ('user',)
 
     fieldsets = (
         ('User Information', {
@@ -169,7 +489,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 # SALE ADMIN
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(AutocompleteFilterMixin, ScalableChangeListMixin, admin.ModelAdmin):
     """Admin configuration for Sale with advanced search and filters."""
     list_display = (
         'get_sale_id',
@@ -180,8 +500,7 @@ class SaleAdmin(admin.ModelAdmin):
     )
     list_filter = (
         'part__category',
-        'part',
-        ('quantity_sold', admin.EmptyFieldListFilter),
+        PartAutocompleteFilter,
     )
     search_fields = (
         'part__part_name',
@@ -193,6 +512,8 @@ class SaleAdmin(admin.ModelAdmin):
     )
     ordering = ('-id',)  # Latest sales first
     list_per_page = 25
+    list_select_related = ('part',)
+    date_hierarchy = 'sale_date'
 
     fieldsets = (
         ('Sale Information', {
@@ -235,7 +556,145 @@ class SaleAdmin(admin.ModelAdmin):
         """Only admins can edit sales."""
         return request.user.is_staff
 
-    def get_queryset(self, request):
-        """Optimize queryset with select_related."""
-        queryset = super().get_queryset(request)
-        return queryset.select_related('part')
+    def delete_model(self, request, obj):
+        """Delete the sale and drop the cached supplier scorecard."""
+        super().delete_model(request, obj)
+        scorecard.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        """Delete the sales and drop the cached supplier scorecard."""
+        super().delete_queryset(request, queryset)
+        scorecard.invalidate()
+
+
+# PURCHASE ORDER ADMIN
+class PurchaseOrderLineInline(admin.TabularInline):
+    """Order lines, edited with a raw id so parts are never listed in full."""
+    model = PurchaseOrderLine
+    raw_id_fields = ('part',)
+    readonly_fields = ('quantity_received',)
+    extra = 0
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    """Admin configuration for supplier purchase orders."""
+    list_display = ('__str__', 'supplier', 'status', 'created_at', 'received_at')
+    list_filter = ('status', SupplierAutocompleteFilter)
+    ordering = ('-created_at',)
+    list_per_page = 25
+    list_select_related = ('supplier',)
+    readonly_fields = ('status', 'created_by', 'created_at', 'received_at')
+    inlines = (PurchaseOrderLineInline,)
+    actions = ('receive_orders', 'cancel_orders')
+
+    def _each_order(self, request, queryset, operation, verb):
+        """Apply ``operation`` to each selected order, reporting failures."""
+        done = 0
+        for order in queryset:
+            try:
+                operation(order)
+            except ValueError as exc:
+                self.message_user(request, str(exc), messages.WARNING)
+            else:
+                done += 1
+        self.message_user(request, f"{done} order(s) {verb}.")
+
+    @admin.action(description='Receive everything outstanding')
+    def receive_orders(self, request, queryset):
+        """Add each order's outstanding quantities to stock."""
+        self._each_order(request, queryset, purchasing.receive_order, 'received')
+
+    @admin.action(description='Cancel selected orders')
+    def cancel_orders(self, request, queryset):
+        """Cancel the selected open orders."""
+        self._each_order(request, queryset, purchasing.cancel_order, 'cancelled')
+
+
+# EMAIL OUTBOX ADMIN
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Read-only view of queued and failed outbox emails."""
+    list_display = (
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'created_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    ordering = ('-created_at',)
+    list_per_page = 25
+    readonly_fields = (
+        'subject',
+        'from_email',
+        'recipients',
+        'attempts',
+        'last_error',
+        'created_at',
+        'sent_at',
+    )
+    fields = readonly_fields + ('status', 'next_attempt_at')
+    actions = ('retry_now',)
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        """Reset selected emails so the worker picks them up immediately.
+
+        The attempt count starts over, otherwise a message that had already
+        failed ``OUTBOX_MAX_ATTEMPTS`` times would be given up on again
+        after a single failure.
+        """
+        updated = queryset.filter(
+            status__in=(OutboxEmail.STATUS_PENDING, OutboxEmail.STATUS_FAILED),
+        ).update(
+            status=OutboxEmail.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        outbox.schedule_delivery()
+        self.message_user(request, f"{updated} email(s) rescheduled.")
+
+    def has_add_permission(self, request):
+        """Emails are only queued by the application."""
+        return False
+
+
+# BACKGROUND JOB ADMIN
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Read-only view of background jobs and their outcomes."""
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    ordering = ('-id',)
+    list_per_page = 25
+    readonly_fields = (
+        'name',
+        'payload',
+        'priority',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'locked_until',
+        'worker_id',
+        'result',
+        'error',
+        'created_at',
+        'started_at',
+        'finished_at',
+    )
+
+    def has_add_permission(self, request):
+        """Jobs are only queued by the application."""
+        return False
@@ -0,0 +1,151 @@
+"""Low-stock alerts driven by threshold crossings.
+
+Writes that move a part into a worse stock state (in -> low, low -> out or
+in -> out) record a :class:`~inventory.models.StockAlertEvent`. Nothing
+scans the parts table: the work done is proportional to the number of
+crossings. The first pending event schedules an ``alerts.send_digests``
+job ``STOCK_ALERT_DIGEST_INTERVAL`` seconds out, which folds every pending
+event into one digest email per recipient and queues them in the outbox.
+"""
+# pylint: disable=no-member
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import (
+    STOCK_IN,
+    STOCK_LOW,
+    STOCK_OUT,
+    Job,
+    StockAlertEvent,
+)
+from .outbox import enqueue_email
+
+DIGEST_JOB = "alerts.send_digests"
+
+_SEVERITY = {STOCK_IN: 0, STOCK_LOW: 1, STOCK_OUT: 2}
+_LABELS = {STOCK_IN: "in stock", STOCK_LOW: "LOW", STOCK_OUT: "OUT"}
+
+
+def is_crossing(previous_state, new_state):
+    """Return True if moving between the two states should raise an alert."""
+    if previous_state is None:
+        return False
+    return _SEVERITY[new_state] > _SEVERITY[previous_state]
+
+
+def record_crossing(part, previous_state):
+    """Record an alert event if ``part`` crossed into a worse state."""
+    new_state = part.stock_state
+    if not is_crossing(previous_state, new_state):
+        return None
+    event = StockAlertEvent.objects.create(
+        part=part,
+        previous_state=previous_state,
+        new_state=new_state,
+        quantity=part.quantity,
+        minimum_stock=part.minimum_stock,
+    )
+    schedule_digest()
+    return event
+
+
+def record_crossings(rows):
+    """Record events for many crossings at once.
+
+    ``rows`` holds ``(part_id, previous_state, new_state, quantity,
+    minimum_stock)`` tuples, as produced by set-based updates that never
+    load the parts themselves. Non-crossings are skipped.
+    """
+    events = [
+        StockAlertEvent(
+            part_id=part_id,
+            previous_state=previous_state,
+            new_state=new_state,
+            quantity=quantity,
+            minimum_stock=minimum_stock,
+        )
+        for part_id, previous_state, new_state, quantity, minimum_stock in rows
+        if is_crossing(previous_state, new_state)
+    ]
+    if events:
+        StockAlertEvent.objects.bulk_create(events, batch_size=500)
+        schedule_digest()
+    return len(events)
+
+
+def schedule_digest():
+    """Queue the digest job unless one is already waiting to run."""
+    if Job.objects.filter(name=DIGEST_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    interval = getattr(settings, "STOCK_ALERT_DIGEST_INTERVAL", 900)
+    return enqueue(
+        DIGEST_JOB,
+        run_at=timezone.now() + timedelta(seconds=interval),
+    )
+
+
+def alert_recipients():
+    """Return the addresses that receive low-stock digests."""
+    configured = getattr(settings, "STOCK_ALERT_RECIPIENTS", None)
+    if configured:
+        return list(configured)
+    return list(
+        User.objects.filter(is_active=True, is_staff=True)
+        .exclude(email="")
+        .order_by("email")
+        .values_list("email", flat=True)
+        .distinct()
+    )
+
+
+def send_digests(now=None):
+    """Queue one digest email per recipient covering all pending events.
+
+    Returns the number of digests queued.
+    """
+    now = now or timezone.now()
+    pending = StockAlertEvent.objects.filter(digested_at__isnull=True)
+    events = list(
+        pending.filter(created_at__lte=now)
+        .select_related("part")
+        .order_by("created_at", "id")
+    )
+    if not events:
+        return 0
+
+    # Several crossings of one part collapse into its worst state.
+    worst = {}
+    for event in events:
+        current = worst.get(event.part_id)
+        if current is None or _SEVERITY[event.new_state] >= _SEVERITY[current.new_state]:
+            worst[event.part_id] = event
+
+    lines = [
+        f"- {event.part.part_number} {event.part.part_name}: "
+        f"{_LABELS[event.new_state]} "
+        f"(qty {event.quantity}, minimum {event.minimum_stock})"
+        for event in sorted(
+            worst.values(),
+            key=lambda e: (-_SEVERITY[e.new_state], e.part.part_number),
+        )
+    ]
+    subject = f"PartsTrack stock alert: {len(worst)} part(s) need attention"
+    body = (
+        "The following parts dropped below their minimum stock:\n\n"
+        + "\n".join(lines)
+        + "\n\nSee the purchase list to reorder."
+    )
+
+    recipients = alert_recipients()
+    for recipient in recipients:
+        enqueue_email(subject, body, [recipient])
+
+    pending.filter(
+        pk__lte=max(event.pk for event in events),
+        created_at__lte=now,
+    ).update(digested_at=now)
+    return len(recipients)
@@ -13,3 +13,9 @@ class InventoryConfig(AppConfig):
         admin.site.site_header = "PartsTrack Administration"
         admin.site.site_title = "PartsTrack Admin Portal"
         admin.site.index_title = "Welcome to PartsTrack Admin Dashboard"
+
+        # Register background job handlers and model signal receivers.
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals, slow_queries, tasks  # noqa: F401
+
+        slow_queries.install()
@@ -0,0 +1,300 @@
+"""Set-based archiving and deletion of parts with long sales histories.
+
+Deleting a part through the ORM cascades to its sales, and Django's
+collector loads every one of them into Python first. The functions here
+move rows with ``INSERT ... SELECT`` and ``DELETE`` statements instead,
+in chunks of ``ARCHIVE_CHUNK_SIZE`` sales per transaction, so each lock is
+short and memory use stays flat.
+
+Sales that leave the ``Sale`` table, whether archived or deleted, are
+first folded into :class:`~inventory.models.SaleRollup` monthly per-part
+totals. :func:`sales_totals` adds those rollups back, so revenue and sales
+counts stay the same after archiving.
+
+:func:`archive_old_sales` runs monthly as the ``archive.old_sales`` job and
+moves sales older than ``SALE_ARCHIVE_HORIZON_MONTHS`` whole months into
+``ArchivedSale``, keeping the hot table bounded. :func:`sales_history`
+serves the rare full-history report as a ``UNION ALL`` of both tables.
+"""
+# pylint: disable=protected-access
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from . import categories, ledger, scorecard
+from .jobs import enqueue
+from .models import (
+    ArchivedSale,
+    ArchivedSparePart,
+    Job,
+    Sale,
+    SaleRollup,
+    SparePart,
+    StockMovement,
+)
+from .sql import analyze, insert_select
+
+ARCHIVE_JOB = "archive.old_sales"
+
+ARCHIVED_SALE_FIELDS = [
+    "sale_number",
+    "part_id",
+    "quantity_sold",
+    "total_price",
+    "employee_id",
+    "sale_date",
+    "notes",
+]
+# The archive keeps the category's name; it is selected as an annotation,
+# after the model fields.
+ARCHIVED_PART_FIELDS = [
+    "part_number",
+    "part_name",
+    "quantity",
+    "minimum_stock",
+    "price",
+    "supplier_id",
+    "location",
+    "description",
+    "created_at",
+]
+
+
+def _chunk_size(chunk_size):
+    return chunk_size or getattr(settings, "ARCHIVE_CHUNK_SIZE", 5000)
+
+
+def _rollup(sales):
+    """Add ``sales`` to the monthly per-part rollups in a few queries."""
+    totals = {
+        (row["period"], row["part_id"]): row
+        for row in sales.order_by()
+        .annotate(period=TruncMonth("sale_date", output_field=DateField()))
+        .values("period", "part_id")
+        .annotate(
+            sale_count=Count("pk"),
+            quantity=Sum("quantity_sold"),
+            revenue=Sum("total_price"),
+        )
+    }
+    if not totals:
+        return
+    existing = SaleRollup.objects.select_for_update().filter(
+        period__in={period for period, _ in totals},
+        part_id__in={part_id for _, part_id in totals},
+    )
+    changed = []
+    for rollup in existing:
+        row = totals.pop((rollup.period, rollup.part_id), None)
+        if row is not None:
+            rollup.sale_count += row["sale_count"]
+            rollup.quantity_sold += row["quantity"]
+            rollup.revenue += row["revenue"]
+            changed.append(rollup)
+    SaleRollup.objects.bulk_update(
+        changed,
+        ["sale_count", "quantity_sold", "revenue"],
+        batch_size=500,
+    )
+    SaleRollup.objects.bulk_create(
+        [
+            SaleRollup(
+                period=period,
+                part_id=part_id,
+                sale_count=row["sale_count"],
+                quantity_sold=row["quantity"],
+                revenue=row["revenue"],
+            )
+            for (period, part_id), row in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+def _chunks(sales, chunk_size):
+    """Yield consecutive id-range slices of ``sales`` of at most ``chunk_size``."""
+    last_id = 0
+    while True:
+        remaining = sales.filter(pk__gt=last_id).order_by("pk")
+        upper = list(remaining.values_list("pk", flat=True)[chunk_size - 1:chunk_size])
+        if upper:
+            yield remaining.filter(pk__lte=upper[0])
+            last_id = upper[0]
+        else:
+            yield remaining
+            return
+
+
+def move_sales(sales, archive=True, chunk_size=None):
+    """Roll up, optionally archive, then delete ``sales`` chunk by chunk.
+
+    Returns the number of sales removed from the ``Sale`` table.
+    """
+    moved = 0
+    for chunk in _chunks(sales, _chunk_size(chunk_size)):
+        with transaction.atomic():
+            _rollup(chunk)
+            if archive:
+                insert_select(
+                    ArchivedSale,
+                    ["original_id", *ARCHIVED_SALE_FIELDS, "period", "archived_at"],
+                    chunk.order_by()
+                    .annotate(
+                        period_value=TruncMonth("sale_date", output_field=DateField()),
+                        archived_at_value=Value(timezone.now()),
+                    )
+                    .values_list(
+                        "pk",
+                        *ARCHIVED_SALE_FIELDS,
+                        "period_value",
+                        "archived_at_value",
+                    ),
+                )
+            moved += chunk.order_by()._raw_delete(chunk.db)
+    if moved:
+        scorecard.invalidate()
+    return moved
+
+
+def _remove_parts(parts, archive, chunk_size):
+    rows = list(parts.values_list("pk", "category_id"))
+    part_ids = [pk for pk, _ in rows]
+    sales = move_sales(
+        Sale.objects.filter(part_id__in=part_ids),
+        archive=archive,
+        chunk_size=chunk_size,
+    )
+    with transaction.atomic():
+        live = SparePart.objects.filter(pk__in=part_ids)
+        if archive:
+            insert_select(
+                ArchivedSparePart,
+                ["original_id", *ARCHIVED_PART_FIELDS, "category", "archived_at"],
+                live.order_by()
+                .annotate(
+                    category_value=Coalesce(F("category__name"), Value("")),
+                    archived_at_value=Value(timezone.now()),
+                )
+                .values_list(
+                    "pk",
+                    *ARCHIVED_PART_FIELDS,
+                    "category_value",
+                    "archived_at_value",
+                ),
+            )
+            # Archived parts keep their stock history, ending at zero.
+            ledger.record_update(live, 0, StockMovement.REASON_REMOVED)
+        else:
+            ledger.forget(part_ids)
+        # The sales are gone, so the collector only has alert events left.
+        live.delete()
+        categories.refresh({category_id for _, category_id in rows if category_id})
+        scorecard.invalidate()
+    return len(part_ids), sales
+
+
+def archive_parts(parts, chunk_size=None):
+    """Move ``parts`` and their sales into the archive tables.
+
+    Returns ``(parts_archived, sales_archived)``.
+    """
+    return _remove_parts(parts, archive=True, chunk_size=chunk_size)
+
+
+def delete_parts(parts, chunk_size=None):
+    """Delete ``parts`` and their sales without loading the sales.
+
+    Sales are rolled up first, so revenue totals are unchanged. Returns
+    ``(parts_deleted, sales_deleted)``.
+    """
+    return _remove_parts(parts, archive=False, chunk_size=chunk_size)
+
+
+def sales_totals():
+    """Return ``(sale_count, revenue)`` over live sales plus rollups."""
+    live = Sale.objects.aggregate(
+        count=Count("pk"),
+        revenue=Coalesce(Sum("total_price"), Value(0), output_field=DecimalField()),
+    )
+    rolled = SaleRollup.objects.aggregate(
+        count=Coalesce(Sum("sale_count"), Value(0)),
+        revenue=Coalesce(Sum("revenue"), Value(0), output_field=DecimalField()),
+    )
+    return live["count"] + rolled["count"], live["revenue"] + rolled["revenue"]
+
+
+def _month_start(value, months_back=0):
+    """Return midnight on the first day of the month ``months_back`` before ``value``."""
+    value = timezone.localtime(value)
+    index = value.year * 12 + value.month - 1 - months_back
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1))
+
+
+def archive_cutoff(now=None, months=None):
+    """Return the instant before which sales are archived."""
+    if months is None:
+        months = settings.SALE_ARCHIVE_HORIZON_MONTHS
+    return _month_start(now or timezone.now(), months)
+
+
+def archive_old_sales(now=None, months=None, chunk_size=None):
+    """Archive every sale older than the horizon; return how many moved."""
+    cutoff = archive_cutoff(now, months)
+    moved = move_sales(
+        Sale.objects.filter(sale_date__lt=cutoff),
+        archive=True,
+        chunk_size=chunk_size,
+    )
+    if moved:
+        # The admin shows these statistics as its row-count estimate.
+        analyze(Sale)
+    return moved
+
+
+def schedule_archival(now=None):
+    """Queue the archival job for the start of next month, once.
+
+    Only queued jobs count as pending, so the running job can schedule
+    its successor.
+    """
+    now = now or timezone.now()
+    if Job.objects.filter(name=ARCHIVE_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    return enqueue(ARCHIVE_JOB, run_at=_month_start(now, -1))
+
+
+HISTORY_FIELDS = [
+    "sale_number",
+    "part_id",
+    "quantity_sold",
+    "total_price",
+    "employee_id",
+    "sale_date",
+]
+
+
+def sales_history(part_id=None, since=None, until=None):
+    """Return live and archived sales as one ``UNION ALL`` of dicts.
+
+    ``since`` and ``until`` are aware datetimes. Each row has
+    :data:`HISTORY_FIELDS` plus ``archived``. Archived rows are also
+    filtered by ``period`` so the indexed column limits the scan.
+    """
+    live = Sale.objects.all()
+    old = ArchivedSale.objects.all()
+    if part_id is not None:
+        live = live.filter(part_id=part_id)
+        old = old.filter(part_id=part_id)
+    if since is not None:
+        live = live.filter(sale_date__gte=since)
+        old = old.filter(period__gte=_month_start(since).date(), sale_date__gte=since)
+    if until is not None:
+        live = live.filter(sale_date__lt=until)
+        old = old.filter(period__lte=until.date(), sale_date__lt=until)
+    live = live.order_by().annotate(archived=Value(False)).values(*HISTORY_FIELDS, "archived")
+    old = old.order_by().annotate(archived=Value(True)).values(*HISTORY_FIELDS, "archived")
+    return old.union(live, all=True).order_by("sale_date")
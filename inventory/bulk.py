@@ -0,0 +1,132 @@
+"""Set-based bulk updates of spare parts.
+
+Every operation is a single ``UPDATE`` over a queryset; parts are never
+loaded into Python. ``update()`` skips ``save()`` and its signals, so the
+derived data is kept consistent here instead: ``updated_at`` is set
+explicitly, and when stock fields change, one annotated ``SELECT`` finds
+the rows whose stock state worsens so that
+:func:`inventory.alerts.record_crossings` can record their alerts, and
+quantity changes are appended to the stock ledger with one
+``INSERT ... SELECT`` (:func:`inventory.ledger.record_update`). The
+counters of the categories involved are recomputed afterwards, and the
+cached supplier scorecard is invalidated on commit.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from . import alerts, categories, ledger, scorecard
+from .models import STOCK_IN, STOCK_LOW, STOCK_OUT, StockMovement
+
+STOCK_FIELDS = {"quantity", "minimum_stock"}
+_STATES = {0: STOCK_IN, 1: STOCK_LOW, 2: STOCK_OUT}
+
+
+def _severity(quantity, minimum_stock):
+    """Return a SQL expression ranking the stock state of the named columns."""
+    return Case(
+        When(**{f"{quantity}__lte": 0}, then=Value(2)),
+        When(**{f"{quantity}__lte": F(minimum_stock)}, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _crossings(queryset, updates):
+    """Return ``record_crossings`` rows for parts the update moves to a worse state."""
+    rows = (
+        queryset.order_by()
+        .annotate(
+            new_quantity=updates.get("quantity", F("quantity")),
+            new_minimum=updates.get("minimum_stock", F("minimum_stock")),
+        )
+        .annotate(
+            old_severity=_severity("quantity", "minimum_stock"),
+            new_severity=_severity("new_quantity", "new_minimum"),
+        )
+        .filter(new_severity__gt=F("old_severity"))
+        .values_list(
+            "pk",
+            "old_severity",
+            "new_severity",
+            "new_quantity",
+            "new_minimum",
+        )
+    )
+    return [
+        (pk, _STATES[old], _STATES[new], quantity, minimum)
+        for pk, old, new, quantity, minimum in rows
+    ]
+
+
+def update_parts(queryset, reason=StockMovement.REASON_ADJUSTMENT, note="", **updates):
+    """Apply ``updates`` to every part in ``queryset`` with one UPDATE.
+
+    ``reason`` and ``note`` label the ledger movements of a quantity
+    change. Returns the number of parts updated.
+    """
+    with transaction.atomic():
+        crossings = _crossings(queryset, updates) if STOCK_FIELDS & updates.keys() else []
+        recount = (
+            categories.touched(queryset, updates)
+            if categories.COUNTER_FIELDS & updates.keys()
+            else set()
+        )
+        if "quantity" in updates:
+            ledger.record_update(queryset, updates["quantity"], reason, note)
+        count = queryset.order_by().update(updated_at=timezone.now(), **updates)
+        alerts.record_crossings(crossings)
+        categories.refresh(recount)
+        scorecard.invalidate()
+    return count
+
+
+def adjust_price(queryset, percent):
+    """Change prices by ``percent`` (e.g. ``10`` or ``-5``), rounded to cents."""
+    factor = 1 + Decimal(percent) / 100
+    if factor < 0:
+        raise ValueError("A price cannot drop by more than 100%.")
+    return update_parts(
+        queryset,
+        price=Round(
+            F("price") * Value(factor),
+            2,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+def set_minimum_stock(queryset, minimum_stock):
+    """Set the minimum stock of every part to ``minimum_stock``."""
+    if minimum_stock < 0:
+        raise ValueError("Minimum stock cannot be negative.")
+    return update_parts(queryset, minimum_stock=Value(int(minimum_stock)))
+
+
+def reassign_supplier(queryset, supplier):
+    """Move every part to ``supplier`` (``None`` clears it)."""
+    return update_parts(queryset, supplier=supplier)
+
+
+def adjust_quantity(queryset, delta):
+    """Add ``delta`` to every quantity, never going below zero."""
+    return update_parts(
+        queryset,
+        quantity=Greatest(F("quantity") + Value(int(delta)), Value(0)),
+    )
+
+
+OPERATIONS = {
+    "adjust_price": adjust_price,
+    "set_minimum_stock": set_minimum_stock,
+    "reassign_supplier": reassign_supplier,
+    "adjust_quantity": adjust_quantity,
+}
+
+
+def apply_operation(queryset, operation, value):
+    """Run the operation named ``operation`` with ``value`` over ``queryset``."""
+    return OPERATIONS[operation](queryset, value)
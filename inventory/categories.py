@@ -0,0 +1,139 @@
+"""Part categories and their denormalized counters.
+
+Each :class:`~inventory.models.Category` carries ``part_count``,
+``low_stock_count`` and ``stock_value``. Category menus and facet counts
+therefore read one row per category instead of scanning the catalog.
+The counters are kept current on every write path:
+
+* A single save goes through the ``post_save`` signal to
+  :func:`record_save`. It applies the difference between what the part
+  counted for when it was loaded and what it counts for now, as ``F()``
+  increments. Saves of different parts therefore never lose each other's
+  changes, but two saves of the same part from the same loaded state both
+  apply their difference and leave the counters off until the next
+  refresh. A part saved without a loaded state (a hand-built instance or
+  a deferred load) has its previous category read by :func:`record_previous`
+  on ``pre_save``, and only that category and the new one are refreshed.
+* Set-based writes (bulk updates, archiving, data generation) call
+  :func:`refresh` for the categories they touched. It recomputes their
+  counters with one ``UPDATE`` of correlated subqueries over the
+  ``category_id`` index.
+
+``manage.py refresh_categories`` recomputes every category, for example
+after rows were changed outside the application.
+"""
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Category, SparePart
+
+COUNTER_FIELDS = {"category", "quantity", "minimum_stock", "price"}
+
+
+def normalize_name(name):
+    """Return ``name`` with surrounding and repeated whitespace removed."""
+    return " ".join((name or "").split())
+
+
+def get_or_create_named(name):
+    """Return the category called ``name`` (ignoring case), creating it if needed.
+
+    Returns ``None`` for a blank name.
+    """
+    name = normalize_name(name)
+    if not name:
+        return None
+    category = Category.objects.filter(name__iexact=name).first()
+    return category or Category.objects.create(name=name)
+
+
+def touched(parts, updates=None):
+    """Return the ids of the categories an update of ``parts`` can change."""
+    ids = set(parts.order_by().values_list("category_id", flat=True).distinct())
+    new = (updates or {}).get("category")
+    if new is not None:
+        ids.add(getattr(new, "pk", new))
+    ids.discard(None)
+    return ids
+
+
+def refresh(category_ids=None):
+    """Recompute the counters of ``category_ids`` (default: every category)."""
+    categories = Category.objects.all()
+    if category_ids is not None:
+        if not category_ids:
+            return 0
+        categories = categories.filter(pk__in=category_ids)
+    parts = SparePart.objects.filter(category=OuterRef("pk")).order_by().values("category")
+    return categories.update(
+        part_count=Coalesce(Subquery(parts.annotate(total=Count("pk")).values("total")), 0),
+        low_stock_count=Coalesce(
+            Subquery(
+                parts.filter(quantity__lte=F("minimum_stock"))
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        ),
+        stock_value=Coalesce(
+            Subquery(parts.annotate(total=Sum(F("quantity") * F("price"))).values("total")),
+            Value(0),
+            output_field=DecimalField(max_digits=16, decimal_places=2),
+        ),
+    )
+
+
+def record_previous(instance):
+    """Remember the stored category of a part saved without a loaded state.
+
+    This has to run before the save: by ``post_save`` the row already holds
+    the new category.
+    """
+    if instance.pk is None or hasattr(instance, "loaded_category_stats"):
+        return
+    instance.previous_category_id = (
+        SparePart.objects.filter(pk=instance.pk).values_list("category_id", flat=True).first()
+    )
+
+
+def record_save(instance, created):
+    """Move a saved part's contribution to its category's counters."""
+    new = instance.category_stats
+    old = None if created else getattr(instance, "loaded_category_stats", None)
+    previous = getattr(instance, "previous_category_id", None)
+    instance.loaded_category_stats = new
+    instance.previous_category_id = None
+    if old is None and not created:
+        # Saved without a loaded state: its contribution to the counters is
+        # unknown, so recompute the previous and the new category.
+        refresh({previous, new[0]} - {None})
+    elif old is None:
+        _increment(new[0], 1, new[1], new[2])
+    elif old[0] == new[0]:
+        _increment(new[0], 0, new[1] - old[1], new[2] - old[2])
+    else:
+        _increment(old[0], -1, -old[1], -old[2])
+        _increment(new[0], 1, new[1], new[2])
+
+
+def _increment(category_id, parts, low_stock, value):
+    if category_id is None or not (parts or low_stock or value):
+        return
+    Category.objects.filter(pk=category_id).update(
+        part_count=F("part_count") + parts,
+        low_stock_count=F("low_stock_count") + low_stock,
+        stock_value=F("stock_value") + value,
+    )
+
+
+def facets():
+    """Return the categories that have parts, with their counters, by name."""
+    return Category.objects.filter(part_count__gt=0).order_by("name")
@@ -0,0 +1,145 @@
+"""ABC (Pareto) classification of parts by annual revenue and units.
+
+The ``abc.classify`` job runs nightly at ``ABC_RUN_HOUR``. One
+``GROUP BY part_id`` over the last ``ABC_WINDOW_DAYS`` days of sales gives
+each part's revenue and units. NumPy ranks them by value and takes
+cumulative shares of the total:
+
+* A: the parts making up the first ``ABC_A_SHARE`` of the total;
+* B: the parts after them, up to ``ABC_B_SHARE``;
+* C: the rest, including parts without sales.
+
+Each part is ranked twice, by revenue and by units, and keeps the better
+class. A cheap part that sells in volume therefore stays an A. The
+classes and totals are written to ``abc_class``, ``annual_revenue`` and
+``annual_units`` in two steps: one ``UPDATE`` resets the previously
+classified parts to C, then batched ``executemany`` UPDATEs write the parts
+that sold.
+
+Only the live ``Sale`` table is read; the default
+``SALE_ARCHIVE_HORIZON_MONTHS`` keeps a full year of sales there.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import ABC_A, ABC_B, ABC_C, Job, Sale, SparePart
+from .sql import update_rows
+
+ABC_JOB = "abc.classify"
+CLASSES = (ABC_A, ABC_B, ABC_C)
+
+
+def cumulative_classes(values, a_share, b_share):
+    """Return each value's class index (0 = A, 1 = B, 2 = C) by cumulative share.
+
+    The value that crosses a threshold still belongs to the class before
+    it, so a single dominant part is always an A. Zero values are C.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    classes = np.full(len(values), 2, dtype=np.int8)
+    total = values.sum()
+    if total <= 0:
+        return classes
+    order = np.argsort(-values, kind="stable")
+    ranked = values[order]
+    before = (np.cumsum(ranked) - ranked) / total
+    classes[order] = np.where(before < a_share, 0, np.where(before < b_share, 1, 2))
+    classes[values <= 0] = 2
+    return classes
+
+
+def load_annual_sales(end, days):
+    """Return ``(part_ids, revenue, units)`` for parts sold in the window.
+
+    ``revenue`` is a list of ``Decimal`` totals, kept exact for storage;
+    ``part_ids`` and ``units`` are arrays.
+    """
+    rows = list(
+        Sale.objects.filter(sale_date__gte=end - timedelta(days=days), sale_date__lt=end)
+        .order_by()
+        .values_list("part_id")
+        .annotate(revenue=Sum("total_price"), units=Sum("quantity_sold"))
+    )
+    part_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    units = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+    return part_ids, [row[1] for row in rows], units
+
+
+def classify_parts(now=None, days=None):
+    """Classify every part and return the number in each class."""
+    now = now or timezone.now()
+    days = days or getattr(settings, "ABC_WINDOW_DAYS", 365)
+    a_share = getattr(settings, "ABC_A_SHARE", 0.8)
+    b_share = getattr(settings, "ABC_B_SHARE", 0.95)
+
+    part_ids, revenue, units = load_annual_sales(now, days)
+    best = np.minimum(
+        cumulative_classes([float(value) for value in revenue], a_share, b_share),
+        cumulative_classes(units, a_share, b_share),
+    )
+    rows = list(
+        zip(
+            (CLASSES[index] for index in best.tolist()),
+            revenue,
+            units.tolist(),
+            part_ids.tolist(),
+        )
+    )
+    with transaction.atomic():
+        SparePart.objects.exclude(abc_class=ABC_C, annual_units=0).update(
+            abc_class=ABC_C,
+            annual_revenue=0,
+            annual_units=0,
+        )
+        update_rows(SparePart, ["abc_class", "annual_revenue", "annual_units"], rows)
+    return class_counts(SparePart.objects.all())
+
+
+def class_counts(parts):
+    """Return ``{"A": n, "B": n, "C": n}`` for ``parts`` in one query."""
+    counts = dict.fromkeys(CLASSES, 0)
+    for abc_class, count in (
+        parts.order_by().values_list("abc_class").annotate(count=Count("pk"))
+    ):
+        if abc_class:
+            counts[abc_class] = count
+    return counts
+
+
+def priority():
+    """Return an expression ordering A before B before C before unclassified."""
+    return Case(
+        *(When(abc_class=name, then=Value(index)) for index, name in enumerate(CLASSES)),
+        default=Value(len(CLASSES)),
+        output_field=IntegerField(),
+    )
+
+
+def filter_class(parts, value):
+    """Filter ``parts`` by a class from a query string; unknown values are ignored."""
+    value = (value or "").upper()
+    return parts.filter(abc_class=value) if value in CLASSES else parts
+
+
+def next_run(now):
+    """Return the next ``ABC_RUN_HOUR`` o'clock local time after ``now``."""
+    hour = getattr(settings, "ABC_RUN_HOUR", 2)
+    day = timezone.localdate(now)
+    run = timezone.make_aware(datetime(day.year, day.month, day.day, hour))
+    if run <= now:
+        day += timedelta(days=1)
+        run = timezone.make_aware(datetime(day.year, day.month, day.day, hour))
+    return run
+
+
+def schedule_classification(now=None):
+    """Queue tonight's classification job unless one is waiting."""
+    if Job.objects.filter(name=ABC_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    return enqueue(ABC_JOB, run_at=next_run(now or timezone.now()))
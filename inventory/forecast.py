@@ -0,0 +1,224 @@
+"""Vectorized demand forecasting for reorder points and quantities.
+
+:func:`forecast_demand` reads the last ``FORECAST_HISTORY_DAYS`` days of
+sales, grouped per part and day in SQL, into NumPy arrays and computes each
+part's mean daily demand and its variability in one pass over those rows:
+``np.bincount`` sums the weighted quantities per part, so there is no
+Python loop over parts and no dense parts-by-days matrix. Two smoothing
+methods are available:
+
+* ``ewma``: exponentially weighted, with ``FORECAST_SMOOTHING`` as alpha.
+  Recent days count most. This is the default.
+* ``sma``: a plain moving average over the window.
+
+A part's window never starts before the part was created, so new parts are
+not diluted by days they did not exist. The results are written to the
+``suggested_*`` fields with batched ``executemany`` updates:
+
+* reorder point = demand over the lead time plus ``z`` standard deviations,
+  for the ``FORECAST_SERVICE_LEVEL`` service level;
+* reorder quantity = demand over ``FORECAST_REVIEW_DAYS``.
+
+:func:`apply_suggestions` copies them into ``minimum_stock`` and
+``reorder_quantity`` for the parts a user picks.
+"""
+from datetime import datetime, timedelta
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import bulk
+from .jobs import enqueue
+from .models import Job, Sale, SparePart
+from .sql import update_rows
+
+FORECAST_JOB = "forecast.demand"
+METHODS = ("ewma", "sma")
+WRITE_BATCH_SIZE = 5000
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime(day.year, day.month, day.day))
+
+
+def window_end(now):
+    """Return local midnight today: only complete days are forecast from."""
+    return _midnight(timezone.localdate(now))
+
+
+def load_daily_sales(end, days, parts=None):
+    """Return ``(part_ids, days_ago, quantities)`` arrays of daily sales.
+
+    One element per part and day with sales in the ``days`` days before
+    ``end``; ``days_ago`` is 0 for the last of them. Each day is one
+    ``GROUP BY part_id`` over a ``sale_date`` index range, which avoids
+    per-row date functions (slow Python callbacks on SQLite). ``parts``
+    optionally restricts the sales to a queryset of parts.
+    """
+    sales = Sale.objects.all()
+    if parts is not None:
+        sales = sales.filter(part__in=parts.order_by().values("pk"))
+    part_ids, days_ago, quantities = [], [], []
+    last_day = timezone.localdate(end) - timedelta(days=1)
+    for offset in range(days):
+        day = last_day - timedelta(days=offset)
+        rows = (
+            sales.filter(
+                sale_date__gte=_midnight(day),
+                sale_date__lt=_midnight(day + timedelta(days=1)),
+            )
+            .order_by()
+            .values_list("part_id")
+            .annotate(quantity=Sum("quantity_sold"))
+        )
+        for part_id, quantity in rows:
+            part_ids.append(part_id)
+            quantities.append(quantity)
+        days_ago.extend([offset] * (len(part_ids) - len(days_ago)))
+    return (
+        np.array(part_ids, dtype=np.int64),
+        np.array(days_ago, dtype=np.int64),
+        np.array(quantities, dtype=np.float64),
+    )
+
+
+def load_history(end, days, parts=None):
+    """Load the sales history of ``parts`` (default: all) as arrays.
+
+    Returns ``(part_ids, positions, days_ago, quantities, observed_days)``:
+    the parts' sorted ids, each daily sales row's index into them, and each
+    part's window length. A window never starts before the part was
+    created, unless back-dated sales say otherwise.
+    """
+    parts = SparePart.objects.all() if parts is None else parts
+    rows = list(parts.order_by("pk").values_list("pk", "created_at"))
+    part_ids = np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows))
+    created = np.fromiter(
+        (created_at.timestamp() for _, created_at in rows),
+        dtype=np.float64,
+        count=len(rows),
+    )
+    observed_days = np.clip(np.ceil((end.timestamp() - created) / 86400), 1, days)
+
+    sale_parts, days_ago, quantities = load_daily_sales(end, days, parts)
+    positions = np.searchsorted(part_ids, sale_parts)
+    np.maximum.at(observed_days, positions, days_ago + 1)
+    return part_ids, positions, days_ago, quantities, observed_days
+
+
+def demand_statistics(positions, days_ago, quantities, observed_days, method, alpha):
+    """Return ``(mean, std)`` daily demand per part.
+
+    ``positions`` maps each sales row to its part's index and
+    ``observed_days`` holds each part's window length in days. Days
+    without sales count as zero demand.
+    """
+    size = len(observed_days)
+    if method == "ewma":
+        weights = alpha * (1 - alpha) ** days_ago
+        total_weight = 1 - (1 - alpha) ** observed_days
+    elif method == "sma":
+        weights = np.ones_like(quantities)
+        total_weight = observed_days.astype(np.float64)
+    else:
+        raise ValueError(f"Unknown forecast method {method!r}.")
+    first = np.bincount(positions, weights=weights * quantities, minlength=size)
+    second = np.bincount(positions, weights=weights * quantities ** 2, minlength=size)
+    mean = first / total_weight
+    variance = np.maximum(second / total_weight - mean ** 2, 0.0)
+    return mean, np.sqrt(variance)
+
+
+def reorder_policy(mean, std, lead_time_days, review_days, service_level):
+    """Return ``(reorder_points, reorder_quantities)`` as integer arrays."""
+    z_score = NormalDist().inv_cdf(service_level)
+    # Rounding first keeps float noise (14.000000001) from adding a unit.
+    reorder_points = np.ceil(np.round(
+        mean * lead_time_days + z_score * std * np.sqrt(lead_time_days), 6
+    ))
+    reorder_quantities = np.ceil(np.round(mean * review_days, 6))
+    return reorder_points.astype(np.int64), reorder_quantities.astype(np.int64)
+
+
+def _write_suggestions(part_ids, reorder_points, reorder_quantities, demand, now):
+    """Store the suggestions with batched ``executemany`` UPDATEs."""
+    stamp = connection.ops.adapt_datetimefield_value(now)
+    update_rows(
+        SparePart,
+        [
+            "suggested_minimum_stock",
+            "suggested_reorder_quantity",
+            "forecast_daily_demand",
+            "forecast_at",
+        ],
+        list(
+            zip(
+                reorder_points.tolist(),
+                reorder_quantities.tolist(),
+                np.round(demand, 4).tolist(),
+                [stamp] * len(part_ids),
+                part_ids.tolist(),
+            )
+        ),
+        WRITE_BATCH_SIZE,
+    )
+
+
+def forecast_demand(now=None, method=None, days=None):
+    """Forecast demand for every part and store the suggested policy.
+
+    Returns the number of parts updated.
+    """
+    now = now or timezone.now()
+    method = method or getattr(settings, "FORECAST_METHOD", "ewma")
+    days = days or getattr(settings, "FORECAST_HISTORY_DAYS", 180)
+    part_ids, positions, days_ago, quantities, observed_days = load_history(
+        window_end(now), days,
+    )
+    if not part_ids.size:
+        return 0
+
+    mean, std = demand_statistics(
+        positions,
+        days_ago,
+        quantities,
+        observed_days,
+        method,
+        getattr(settings, "FORECAST_SMOOTHING", 0.1),
+    )
+    reorder_points, reorder_quantities = reorder_policy(
+        mean,
+        std,
+        getattr(settings, "FORECAST_LEAD_TIME_DAYS", 7),
+        getattr(settings, "FORECAST_REVIEW_DAYS", 30),
+        getattr(settings, "FORECAST_SERVICE_LEVEL", 0.95),
+    )
+    _write_suggestions(part_ids, reorder_points, reorder_quantities, mean, now)
+    return len(part_ids)
+
+
+def apply_suggestions(queryset):
+    """Copy the suggested policy into ``minimum_stock`` and ``reorder_quantity``.
+
+    Parts without a forecast are left alone. Returns the number updated.
+    """
+    return bulk.update_parts(
+        queryset.filter(suggested_minimum_stock__isnull=False),
+        minimum_stock=F("suggested_minimum_stock"),
+        reorder_quantity=F("suggested_reorder_quantity"),
+    )
+
+
+def schedule_forecast(now=None):
+    """Queue the forecast job one interval out unless one is waiting."""
+    if Job.objects.filter(name=FORECAST_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    interval = getattr(settings, "FORECAST_INTERVAL", 86400)
+    return enqueue(
+        FORECAST_JOB,
+        run_at=(now or timezone.now()) + timedelta(seconds=interval),
+    )
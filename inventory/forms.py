@@ -1,7 +1,7 @@
 """Forms for the inventory app."""
 from django import forms
 from django.contrib.auth.models import User
-from .models import SparePart, Supplier
+from .models import Category, SparePart, Supplier
 
 
 class SparePartForm(forms.ModelForm):
@@ -32,10 +32,9 @@ class SparePartForm(forms.ModelForm):
                     "placeholder": "Part Name",
                 },
             ),
-            "category": forms.TextInput(
+            "category": forms.Select(
                 attrs={
-                    "class": "form-control",
-                    "placeholder": "Category",
+                    "class": "form-select",
                 },
             ),
             "quantity": forms.NumberInput(
@@ -157,3 +156,126 @@ class EmployeeForm(forms.Form):
                 "Email already exists. Please use a different email.",
             )
         return email
+
+
+class BulkPartUpdateForm(forms.Form):
+    """Select parts by category and/or supplier and apply one bulk change."""
+
+    OPERATION_CHOICES = [
+        ("adjust_price", "Adjust price by percent"),
+        ("set_minimum_stock", "Set minimum stock"),
+        ("reassign_supplier", "Reassign supplier"),
+        ("adjust_quantity", "Adjust quantity by"),
+    ]
+
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.order_by("name"),
+        required=False,
+        empty_label="Any category",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    supplier = forms.ModelChoiceField(
+        queryset=Supplier.objects.order_by("name"),
+        required=False,
+        empty_label="Any supplier",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    operation = forms.ChoiceField(
+        choices=OPERATION_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    value = forms.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Value"},
+        ),
+    )
+    new_supplier = forms.ModelChoiceField(
+        queryset=Supplier.objects.order_by("name"),
+        required=False,
+        empty_label="No supplier",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    apply_to_all = forms.BooleanField(
+        required=False,
+        label="Apply to all parts",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def clean(self):
+        """Require a part filter (or explicit confirmation) and a valid value.
+
+        Every operation except reassigning suppliers needs a value.
+        """
+        cleaned_data = super().clean()
+        if not (
+            cleaned_data.get("category")
+            or cleaned_data.get("supplier")
+            or cleaned_data.get("apply_to_all")
+        ):
+            self.add_error(
+                "apply_to_all",
+                "Choose a category or supplier, or confirm the change applies to all parts.",
+            )
+        operation = cleaned_data.get("operation")
+        value = cleaned_data.get("value")
+        if operation and operation != "reassign_supplier":
+            if value is None:
+                self.add_error("value", "Enter a value for this operation.")
+            elif operation == "adjust_price" and value < -100:
+                self.add_error("value", "A price cannot drop by more than 100%.")
+            elif operation == "set_minimum_stock" and value < 0:
+                self.add_error("value", "Minimum stock cannot be negative.")
+            elif operation != "adjust_price" and value != int(value):
+                self.add_error("value", "Enter a whole number.")
+        return cleaned_data
+
+
+class SafetyStockSimulationForm(forms.Form):
+    """Choose the parts and candidate minimum stocks to simulate."""
+
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.order_by("name"),
+        required=False,
+        empty_label="Any category",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    supplier = forms.ModelChoiceField(
+        queryset=Supplier.objects.order_by("name"),
+        required=False,
+        empty_label="Any supplier",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    candidates = forms.CharField(
+        required=False,
+        widget=forms.TextInput(
+            attrs={"class": "form-control", "placeholder": "e.g. 5, 10, 20"},
+        ),
+    )
+    runs = forms.IntegerField(
+        required=False,
+        min_value=10,
+        max_value=2000,
+        widget=forms.NumberInput(attrs={"class": "form-control", "placeholder": "200"}),
+    )
+    horizon = forms.IntegerField(
+        required=False,
+        min_value=7,
+        max_value=365,
+        widget=forms.NumberInput(attrs={"class": "form-control", "placeholder": "90"}),
+    )
+
+    def clean_candidates(self):
+        """Parse the comma-separated candidates into a list of integers."""
+        value = self.cleaned_data["candidates"]
+        if not value.strip():
+            return None
+        try:
+            candidates = [int(item) for item in value.split(",") if item.strip()]
+        except ValueError as exc:
+            raise forms.ValidationError("Enter whole numbers separated by commas.") from exc
+        if any(candidate < 0 for candidate in candidates):
+            raise forms.ValidationError("Minimum stock cannot be negative.")
+        return candidates
@@ -0,0 +1,161 @@
+"""Stock-level history series, downsampled for charts.
+
+:func:`stock_series` rebuilds a part's quantity over time from the stock
+ledger: the level at the start comes from :func:`inventory.ledger.stock_at`,
+and a cumulative sum of the movements after it gives every later level.
+Years of history can hold hundreds of thousands of points, so
+:func:`downsample` reduces the series to a fixed number of points before it
+is sent to the browser. Both reductions work on numpy arrays:
+
+* ``minmax`` splits the time range into equal buckets and keeps the lowest
+  and highest level in each, so stock-outs and peaks always survive. It is
+  fully vectorized and the default.
+* ``lttb`` (Largest-Triangle-Three-Buckets) keeps the point of each bucket
+  that best preserves the visual shape. It loops once per output point,
+  with the work inside each bucket vectorized.
+"""
+import numpy as np
+from django.db.models import FloatField, Func
+
+from . import ledger
+from .models import StockMovement
+
+METHODS = ("minmax", "lttb")
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+class Epoch(Func):
+    """Seconds since the Unix epoch of a datetime column, as a float."""
+
+    output_field = FloatField()
+    template = "UNIX_TIMESTAMP(%(expressions)s)"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        """SQLite stores UTC text; ``julianday`` parses it into days."""
+        return self.as_sql(
+            compiler,
+            connection,
+            template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        """PostgreSQL extracts the epoch directly."""
+        return self.as_sql(
+            compiler,
+            connection,
+            template="EXTRACT(EPOCH FROM %(expressions)s)",
+            **extra_context,
+        )
+
+
+def stock_series(part_id, start, end):
+    """Return ``(timestamps, quantities)`` for a part between two instants.
+
+    Timestamps are float POSIX seconds. The series starts with the level
+    at ``start``, has one point per movement, and ends with the level at
+    ``end``. Only the window's movements are read, as a range of the
+    ``(part_id, created_at)`` index, and the database converts their
+    times to epoch seconds so no ``datetime`` is built per row.
+    """
+    rows = (
+        StockMovement.objects.filter(
+            part_id=part_id,
+            created_at__gt=start,
+            created_at__lte=end,
+        )
+        .order_by("created_at", "pk")
+        .annotate(epoch=Epoch("created_at"))
+        .values_list("epoch", "delta")
+    )
+    movements = np.fromiter(rows, dtype=[("epoch", np.float64), ("delta", np.int64)])
+    opening = ledger.stock_at(part_id, start)
+    timestamps = np.concatenate(
+        ([start.timestamp()], movements["epoch"], [end.timestamp()])
+    )
+    levels = opening + np.cumsum(movements["delta"])
+    quantities = np.concatenate(([opening], levels, levels[-1:] if len(levels) else [opening]))
+    return timestamps, quantities
+
+
+def minmax(x, y, points):
+    """Return the indices of the min and max of ``y`` in ``points // 2`` time buckets.
+
+    The first and last points are always kept. Indices come back sorted.
+    """
+    size = len(x)
+    if size <= points:
+        return np.arange(size)
+    if points < 4:
+        return np.array([0, size - 1])
+    buckets = (points - 2) // 2
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, buckets - 1)
+    # Sorting by (bucket, value) puts each bucket's min first and max last.
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    first = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    last = np.r_[first[1:] - 1, size - 1]
+    keep = np.concatenate(([0, size - 1], order[first], order[last]))
+    return np.unique(keep)
+
+
+def lttb(x, y, points):
+    """Return the indices chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Indices come back sorted.
+    """
+    size = len(x)
+    if size <= points or points < 3:
+        return np.arange(size)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # ``points - 2`` buckets over the interior points, each at least one wide.
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sum_x = np.r_[0.0, np.cumsum(x)]
+    sum_y = np.r_[0.0, np.cumsum(y)]
+    width = ends - starts
+    mean_x = (sum_x[ends] - sum_x[starts]) / width
+    mean_y = (sum_y[ends] - sum_y[starts]) / width
+    # Each bucket is scored against the average of the bucket after it.
+    next_x = np.r_[mean_x[1:], x[-1]]
+    next_y = np.r_[mean_y[1:], y[-1]]
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    anchor = 0
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        area = np.abs(
+            (x[anchor] - next_x[index]) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (next_y[index] - y[anchor])
+        )
+        anchor = start + int(np.argmax(area))
+        selected[index + 1] = anchor
+    return selected
+
+
+def downsample(x, y, points, method="minmax"):
+    """Return ``(x, y)`` reduced to at most ``points`` points with ``method``."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}.")
+    chosen = (minmax if method == "minmax" else lttb)(x, y, points)
+    return x[chosen], y[chosen]
+
+
+def part_history(part_id, start, end, points=DEFAULT_POINTS, method="minmax"):
+    """Return the downsampled stock series of a part as a JSON-ready dict.
+
+    Timestamps are milliseconds since the epoch, as charting libraries
+    expect for a linear time axis.
+    """
+    timestamps, quantities = stock_series(part_id, start, end)
+    total = len(timestamps)
+    timestamps, quantities = downsample(timestamps, quantities, points, method)
+    return {
+        "timestamps": np.rint(timestamps * 1000).astype(np.int64).tolist(),
+        "quantities": quantities.tolist(),
+        "total_points": total,
+        "method": method,
+    }
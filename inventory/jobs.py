@@ -0,0 +1,198 @@
+"""Lightweight database-backed background jobs.
+
+Work is registered with the :func:`job` decorator, queued with
+:func:`enqueue` and executed by ``manage.py run_worker``. Jobs are stored
+in the regular database, so no broker is needed:
+
+* workers claim the highest-priority due job with a conditional UPDATE, so
+  several threads or processes can share one SQLite file;
+* a claimed job is leased until ``locked_until`` (its visibility timeout);
+  if the worker dies, another worker reclaims it once the lease expires;
+* failures are retried with exponential backoff up to ``max_attempts``.
+"""
+# pylint: disable=no-member,broad-except
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+
+_registry = {}
+
+
+class UnknownJobError(LookupError):
+    """Raised when a job name has no registered handler."""
+
+
+def job(name, timeout=DEFAULT_TIMEOUT, max_attempts=3):
+    """Register the decorated function as the handler for job ``name``.
+
+    ``timeout`` is the visibility timeout in seconds: how long a worker may
+    hold the job before it is considered lost and handed to another worker.
+    The handler is called with the job payload as keyword arguments and
+    should return a JSON-serializable result.
+    """
+
+    def decorator(func):
+        _registry[name] = {
+            "func": func,
+            "timeout": timeout,
+            "max_attempts": max_attempts,
+        }
+        return func
+
+    return decorator
+
+
+def get_handler(name):
+    """Return the registry entry for ``name``."""
+    try:
+        return _registry[name]
+    except KeyError as exc:
+        raise UnknownJobError(f"No job registered as {name!r}") from exc
+
+
+def enqueue(name, payload=None, priority=0, run_at=None):
+    """Queue job ``name`` and return the created :class:`Job`."""
+    handler = get_handler(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=handler["max_attempts"],
+    )
+
+
+def retry_delay(attempts):
+    """Return the backoff delay before retrying after ``attempts`` failures."""
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def claim_next(worker_id, now=None):
+    """Atomically lease the next due job to ``worker_id``.
+
+    Returns the claimed :class:`Job`, or ``None`` when nothing is due.
+    """
+    now = now or timezone.now()
+    due = Q(status=Job.STATUS_QUEUED, run_at__lte=now) | Q(
+        status=Job.STATUS_RUNNING,
+        locked_until__lt=now,
+    )
+    while True:
+        candidates = list(
+            Job.objects.filter(due).order_by("-priority", "run_at", "id")[:10]
+        )
+        if not candidates:
+            return None
+
+        for candidate in candidates:
+            unchanged = Job.objects.filter(
+                pk=candidate.pk,
+                status=candidate.status,
+                attempts=candidate.attempts,
+            )
+            if candidate.attempts >= candidate.max_attempts:
+                # Its last worker died holding the lease with no retries left.
+                unchanged.update(
+                    status=Job.STATUS_FAILED,
+                    error="Visibility timeout expired on final attempt.",
+                    finished_at=now,
+                )
+                continue
+
+            try:
+                timeout = get_handler(candidate.name)["timeout"]
+            except UnknownJobError:
+                timeout = DEFAULT_TIMEOUT
+            claimed = unchanged.update(
+                status=Job.STATUS_RUNNING,
+                attempts=F("attempts") + 1,
+                locked_until=now + timedelta(seconds=timeout),
+                worker_id=worker_id,
+                started_at=now,
+            )
+            if claimed:
+                candidate.refresh_from_db()
+                return candidate
+        # Every candidate was taken by another worker; look again.
+
+
+def run_job(claimed):
+    """Execute a claimed job and record its outcome."""
+    owned = Job.objects.filter(
+        pk=claimed.pk,
+        status=Job.STATUS_RUNNING,
+        worker_id=claimed.worker_id,
+        attempts=claimed.attempts,
+    )
+    try:
+        result = get_handler(claimed.name)["func"](**claimed.payload)
+    except Exception as exc:
+        now = timezone.now()
+        error = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        if claimed.attempts >= claimed.max_attempts:
+            owned.update(status=Job.STATUS_FAILED, error=error, finished_at=now)
+        else:
+            owned.update(
+                status=Job.STATUS_QUEUED,
+                error=error,
+                run_at=now + retry_delay(claimed.attempts),
+                locked_until=None,
+            )
+        logger.warning("Job %s (%s) failed: %s", claimed.pk, claimed.name, exc)
+        return False
+
+    owned.update(
+        status=Job.STATUS_SUCCEEDED,
+        result=result,
+        error="",
+        locked_until=None,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def make_worker_id(index=0):
+    """Return a worker identifier unique to this host, process and thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def work(worker_id, poll_interval=1.0, burst=False, stop_event=None,
+         manage_connections=False):
+    """Claim and run jobs until stopped; return the number processed.
+
+    With ``burst`` the loop exits as soon as no job is due, which is what
+    tests and cron-style invocations want. Long-running worker threads and
+    processes pass ``manage_connections`` so stale database connections are
+    recycled between jobs and closed on exit.
+    """
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            if manage_connections:
+                close_old_connections()
+            claimed = claim_next(worker_id)
+            if claimed is None:
+                if burst:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            run_job(claimed)
+            processed += 1
+    finally:
+        if manage_connections:
+            connection.close()
+    return processed
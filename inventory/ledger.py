@@ -0,0 +1,182 @@
+"""Append-only stock movement ledger with periodic snapshots.
+
+Every change to ``SparePart.quantity`` appends a
+:class:`~inventory.models.StockMovement`. Single saves are recorded by the
+``post_save`` signal. Set-based writes call :func:`record_update` before
+their ``UPDATE``, which writes all their movements with one
+``INSERT ... SELECT``.
+
+The ``ledger.snapshot`` job runs every ``STOCK_SNAPSHOT_INTERVAL`` seconds
+and stores a :class:`~inventory.models.StockSnapshot` for each part that
+moved since the previous run. :func:`stock_at` then answers "what was the
+stock at X" from the nearest snapshot plus the movements between it and X,
+so it never reads more than one interval of the ledger.
+
+A snapshot records the id of the part's last movement included in its
+quantity, and both are read by the same statement. Movements are matched
+to snapshots by id rather than by timestamp, so a movement committed
+after a snapshot is never lost, even if its ``created_at`` is earlier,
+and one already in the snapshot is never added again.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Job, SparePart, StockMovement, StockSnapshot
+from .sql import insert_select
+
+SNAPSHOT_JOB = "ledger.snapshot"
+
+MOVEMENT_COLUMNS = ["part_id", "delta", "reason", "note", "created_at"]
+
+
+def record(part_id, delta, reason, note=""):
+    """Append one movement; a zero ``delta`` records nothing."""
+    if not delta:
+        return None
+    return StockMovement.objects.create(
+        part_id=part_id,
+        delta=delta,
+        reason=reason,
+        note=note,
+    )
+
+
+def record_save(part, created):
+    """Append the movement for a part just saved through the ORM.
+
+    The reason defaults to an edit; callers can set ``part.stock_reason``
+    before saving to record a receipt or adjustment instead.
+    """
+    if not isinstance(part.quantity, int):
+        # Saved with an F() expression: the new value is only in the database.
+        return None
+    if created:
+        return record(part.pk, part.quantity, StockMovement.REASON_INITIAL)
+    previous = getattr(part, "loaded_quantity", part.quantity)
+    reason = getattr(part, "stock_reason", StockMovement.REASON_EDIT)
+    return record(part.pk, part.quantity - previous, reason)
+
+
+def _insert_movements(parts, delta, reason, note):
+    """Insert one movement of ``delta`` per part in ``parts`` where it is non-zero."""
+    rows = (
+        parts.order_by()
+        .annotate(delta_value=delta)
+        .exclude(delta_value=0)
+        .annotate(
+            reason_value=Value(reason),
+            note_value=Value(note),
+            created_at_value=Value(timezone.now()),
+        )
+        .values_list(
+            "pk",
+            "delta_value",
+            "reason_value",
+            "note_value",
+            "created_at_value",
+        )
+    )
+    return insert_select(StockMovement, MOVEMENT_COLUMNS, rows)
+
+
+def record_update(parts, quantity, reason=StockMovement.REASON_ADJUSTMENT, note=""):
+    """Record the movements of setting ``quantity`` on every part in ``parts``.
+
+    Call this in the same transaction as the ``UPDATE`` and before it:
+    ``quantity`` is evaluated against the current rows. Returns the number
+    of movements written.
+    """
+    if not hasattr(quantity, "resolve_expression"):
+        quantity = Value(int(quantity))
+    return _insert_movements(parts, quantity - F("quantity"), reason, note)
+
+
+def record_initial(parts):
+    """Record the starting stock of parts created with ``bulk_create``."""
+    return _insert_movements(parts, F("quantity"), StockMovement.REASON_INITIAL, "")
+
+
+def forget(part_ids):
+    """Delete the movements and snapshots of parts that were deleted."""
+    StockMovement.objects.filter(part_id__in=part_ids).delete()
+    StockSnapshot.objects.filter(part_id__in=part_ids).delete()
+
+
+def take_snapshots(now=None):
+    """Snapshot every live part that moved since its last snapshot.
+
+    ``now`` labels the snapshots. Returns the number of snapshots written.
+    """
+    now = now or timezone.now()
+    last_movement = (
+        StockMovement.objects.filter(part_id=OuterRef("pk")).order_by("-pk").values("pk")[:1]
+    )
+    watermark = (
+        StockSnapshot.objects.filter(part_id=OuterRef("pk"))
+        .order_by("-movement_id")
+        .values("movement_id")[:1]
+    )
+    # One INSERT ... SELECT reads each quantity and its last movement id
+    # from the same database snapshot. Annotations are selected after the
+    # model fields, in the order they were added.
+    parts = (
+        SparePart.objects.order_by()
+        .annotate(
+            movement_value=Subquery(last_movement),
+            watermark=Coalesce(Subquery(watermark), Value(0)),
+        )
+        .filter(movement_value__gt=F("watermark"))
+        .annotate(taken_at_value=Value(now))
+        .values_list("pk", "quantity", "movement_value", "taken_at_value")
+    )
+    with transaction.atomic():
+        return insert_select(
+            StockSnapshot,
+            ["part_id", "quantity", "movement_id", "taken_at"],
+            parts,
+        )
+
+
+def schedule_snapshots(now=None):
+    """Queue the snapshot job one interval out unless one is waiting."""
+    if Job.objects.filter(name=SNAPSHOT_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    interval = getattr(settings, "STOCK_SNAPSHOT_INTERVAL", 86400)
+    return enqueue(
+        SNAPSHOT_JOB,
+        run_at=(now or timezone.now()) + timedelta(seconds=interval),
+    )
+
+
+def _total(movements):
+    return movements.aggregate(total=Sum("delta"))["total"] or 0
+
+
+def stock_at(part_id, when):
+    """Return the quantity of part ``part_id`` at the instant ``when``.
+
+    Starts from the latest snapshot at or before ``when`` and adds the
+    movements since. Before the first snapshot it works back from the next
+    one, or from the live quantity if the part was never snapshotted.
+    Archived parts end at zero through their ``removed`` movement.
+    """
+    movements = StockMovement.objects.filter(part_id=part_id)
+    snapshots = StockSnapshot.objects.filter(part_id=part_id)
+    before = snapshots.filter(taken_at__lte=when).order_by("-taken_at").first()
+    if before is not None:
+        return before.quantity + _total(
+            movements.filter(pk__gt=before.movement_id, created_at__lte=when)
+        )
+    after = snapshots.filter(taken_at__gt=when).order_by("taken_at").first()
+    if after is not None:
+        return after.quantity - _total(
+            movements.filter(pk__lte=after.movement_id, created_at__gt=when)
+        )
+    current = SparePart.objects.filter(pk=part_id).values_list("quantity", flat=True).first()
+    return (current or 0) - _total(movements.filter(created_at__gt=when))
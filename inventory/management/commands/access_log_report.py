@@ -0,0 +1,76 @@
+"""Summarize the JSON access log per endpoint."""
+import glob
+import json
+import statistics
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark import percentile
+
+
+class Command(BaseCommand):
+    """Print latency percentiles, error counts and query counts per endpoint."""
+
+    help = "Print per-endpoint latency percentiles from the access log."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Log file to read (defaults to ACCESS_LOG_FILE and its rotations).",
+        )
+        parser.add_argument("--role", help="Only count requests made with this role.")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of endpoints to print, slowest p95 first.",
+        )
+
+    def handle(self, *args, **options):
+        base = options["file"] or settings.ACCESS_LOG_FILE
+        files = sorted(glob.glob(base + "*"))
+        if not files:
+            raise CommandError(f"No access log found at {base}.")
+
+        endpoints = defaultdict(
+            lambda: {"latencies": [], "queries": [], "errors": 0, "bytes": 0}
+        )
+        for path in files:
+            with open(path, encoding="utf-8") as log_file:
+                for line in log_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if options["role"] and record.get("role") != options["role"]:
+                        continue
+                    name = record.get("url_name") or record["path"]
+                    endpoint = endpoints[f"{record['method']} {name}"]
+                    endpoint["latencies"].append(record["latency_ms"])
+                    if record.get("queries") is not None:
+                        endpoint["queries"].append(record["queries"])
+                    if record["status"] >= 500:
+                        endpoint["errors"] += 1
+                    endpoint["bytes"] += record.get("bytes") or 0
+        if not endpoints:
+            raise CommandError("No matching requests in the access log.")
+
+        ranked = sorted(
+            endpoints.items(),
+            key=lambda item: -percentile(item[1]["latencies"], 95),
+        )
+        for name, endpoint in ranked[:options["limit"]]:
+            latencies = endpoint["latencies"]
+            queries = endpoint["queries"]
+            self.stdout.write(
+                f"{name:40} n={len(latencies):<7}"
+                f" p50={statistics.median(latencies):>8.2f}ms"
+                f" p95={percentile(latencies, 95):>8.2f}ms"
+                f" p99={percentile(latencies, 99):>8.2f}ms"
+                f" queries={statistics.mean(queries) if queries else 0:.1f}"
+                f" avg_bytes={endpoint['bytes'] // len(latencies)}"
+                f" errors={endpoint['errors']}"
+            )
@@ -0,0 +1,88 @@
+"""Move sales older than the archive horizon out of the live table."""
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.archive import (
+    HISTORY_FIELDS,
+    archive_cutoff,
+    archive_old_sales,
+    sales_history,
+    schedule_archival,
+)
+from inventory.models import Sale
+
+
+class Command(BaseCommand):
+    """Archive old sales now, schedule the monthly job, or export full history."""
+
+    help = (
+        "Archive sales older than SALE_ARCHIVE_HORIZON_MONTHS whole months, "
+        "or export live and archived sales together as CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            help="Override SALE_ARCHIVE_HORIZON_MONTHS for this run.",
+        )
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many sales would be archived.",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue the monthly archive job instead of archiving now.",
+        )
+        parser.add_argument(
+            "--export-history",
+            action="store_true",
+            help="Write live and archived sales as CSV to stdout.",
+        )
+        parser.add_argument("--part", type=int, help="Limit the export to a part id.")
+        parser.add_argument("--since", help="Export sales on or after YYYY-MM-DD.")
+        parser.add_argument("--until", help="Export sales before YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        if options["export_history"]:
+            self._export(options)
+            return
+        if options["schedule"]:
+            job = schedule_archival()
+            self.stdout.write(
+                f"Queued job {job.pk} for {job.run_at:%Y-%m-%d}."
+                if job
+                else "An archive job is already queued."
+            )
+            return
+
+        cutoff = archive_cutoff(months=options["months"])
+        if options["dry_run"]:
+            count = Sale.objects.filter(sale_date__lt=cutoff).count()
+            self.stdout.write(f"{count} sale(s) before {cutoff:%Y-%m-%d} would be archived.")
+            return
+        moved = archive_old_sales(months=options["months"], chunk_size=options["chunk_size"])
+        self.stdout.write(f"Archived {moved} sale(s) before {cutoff:%Y-%m-%d}.")
+
+    def _export(self, options):
+        bounds = {}
+        for name in ("since", "until"):
+            if options[name]:
+                day = parse_date(options[name])
+                if day is None:
+                    raise CommandError(f"--{name} must be YYYY-MM-DD.")
+                bounds[name] = timezone.make_aware(
+                    datetime(day.year, day.month, day.day)
+                )
+        writer = csv.writer(self.stdout)
+        writer.writerow([*HISTORY_FIELDS, "archived"])
+        rows = sales_history(part_id=options["part"], **bounds)
+        for row in rows.iterator():
+            writer.writerow([row[field] for field in HISTORY_FIELDS] + [row["archived"]])
@@ -0,0 +1,244 @@
+"""Benchmark every inventory URL at several dataset sizes."""
+import json
+import logging
+import os
+import statistics
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from inventory import urls as inventory_urls
+from inventory.models import Sale, SparePart, Supplier, UserProfile
+
+SIZES = {
+    "tiny": {"suppliers": 10, "parts": 100, "sales": 1000},
+    "small": {"suppliers": 50, "parts": 1000, "sales": 20000},
+    "medium": {"suppliers": 500, "parts": 20000, "sales": 200000},
+    "large": {"suppliers": 5000, "parts": 500000, "sales": 10000000},
+}
+
+# Views that change state on GET or end the session are not benchmarked.
+SKIPPED = {"logout"}
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "baseline.json")
+
+
+def percentile(samples, pct):
+    """Return the ``pct`` percentile of ``samples`` (nearest-rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """Measure latency percentiles and query counts per URL and dataset size.
+
+    Runs against a throwaway test database, so the real database is never
+    touched. Results are compared with a committed JSON baseline: a URL
+    regresses when it runs more queries than the baseline, or when its p95
+    latency exceeds the baseline by more than ``--tolerance`` (and by at
+    least ``--min-delta-ms``, so timer noise on fast pages is ignored).
+    """
+
+    help = "Benchmark inventory URLs at several data sizes against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="tiny,small",
+            help=f"Comma-separated dataset sizes from: {', '.join(SIZES)}.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20,
+            help="Timed requests per URL (after one warm-up request).",
+        )
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Write the results as the new baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed fractional p95 slowdown before flagging a regression.",
+        )
+        parser.add_argument(
+            "--min-delta-ms",
+            type=float,
+            default=5.0,
+            help="Ignore p95 slowdowns smaller than this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options["sizes"].split(",") if size.strip()]
+        unknown = set(sizes) - set(SIZES)
+        if unknown:
+            raise CommandError(f"Unknown size(s): {', '.join(sorted(unknown))}")
+
+        # One JSON line per request would drown the report.
+        logging.getLogger("inventory.requests").setLevel(logging.WARNING)
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            results = {
+                size: self._run_size(size, options["requests"]) for size in sizes
+            }
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        if options["update_baseline"]:
+            baseline = self._load(options["baseline"])
+            baseline.update(results)
+            os.makedirs(os.path.dirname(options["baseline"]), exist_ok=True)
+            with open(options["baseline"], "w", encoding="utf-8") as handle:
+                json.dump(baseline, handle, indent=2, sort_keys=True)
+                handle.write("\n")
+            self.stdout.write(f"Baseline written to {options['baseline']}.")
+            return
+
+        regressions = self._compare(
+            results,
+            self._load(options["baseline"]),
+            options["tolerance"],
+            options["min_delta_ms"],
+        )
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark regression(s).")
+
+    def _run_size(self, size, repeat):
+        """Load dataset ``size`` and time every URL against it."""
+        Sale.objects.all().delete()
+        SparePart.objects.all().delete()
+        Supplier.objects.all().delete()
+        User.objects.all().delete()
+
+        admin = User.objects.create_user("bench_admin", password="x", is_staff=True)
+        employee = User.objects.create_user("bench_employee", password="x")
+        UserProfile.objects.create(user=admin, role="admin")
+        UserProfile.objects.create(user=employee, role="employee")
+        spec = SIZES[size]
+        started = time.perf_counter()
+        call_command(
+            "generate_data",
+            suppliers=spec["suppliers"],
+            parts=spec["parts"],
+            sales=spec["sales"],
+            stdout=StringIO(),
+        )
+        self.stdout.write(
+            f"\n== {size}: {spec} (generated in {time.perf_counter() - started:.1f}s)"
+        )
+
+        clients = {
+            "admin": Client(raise_request_exception=False),
+            "employee": Client(raise_request_exception=False),
+        }
+        clients["admin"].force_login(admin)
+        clients["employee"].force_login(employee)
+        kwargs_for = {
+            "pk": SparePart.objects.order_by("id").values_list("id", flat=True).first(),
+            "user_id": employee.id,
+            "supplier_id": Supplier.objects.order_by("id")
+            .values_list("id", flat=True)
+            .first(),
+            "uidb64": urlsafe_base64_encode(force_bytes(employee.pk)),
+            "token": default_token_generator.make_token(employee),
+        }
+
+        results = {}
+        for pattern in inventory_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED:
+                continue
+            url = reverse(
+                pattern.name,
+                kwargs={
+                    name: kwargs_for[name]
+                    for name in pattern.pattern.converters
+                },
+            )
+            role = "employee" if pattern.name.startswith("employee_") else "admin"
+            client = clients[role]
+
+            response = client.get(url)
+            if response.status_code == 405:
+                continue
+            if response.status_code >= 500:
+                self.stdout.write(f"{pattern.name:28} {role:8} skipped: HTTP 500")
+                continue
+            latencies = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    client.get(url)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            results[pattern.name] = {
+                "role": role,
+                "status": response.status_code,
+                "queries": len(queries) // repeat,
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+            self.stdout.write(
+                f"{pattern.name:28} {role:8} q={results[pattern.name]['queries']:<4}"
+                f" p50={results[pattern.name]['p50_ms']:>8.2f}ms"
+                f" p95={results[pattern.name]['p95_ms']:>8.2f}ms"
+                f" p99={results[pattern.name]['p99_ms']:>8.2f}ms"
+            )
+        return results
+
+    @staticmethod
+    def _load(path):
+        """Return the baseline stored at ``path`` (empty if missing)."""
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _compare(self, results, baseline, tolerance, min_delta_ms):
+        """Print regressions against ``baseline`` and return them."""
+        regressions = []
+        for size, urls in results.items():
+            for name, current in urls.items():
+                previous = baseline.get(size, {}).get(name)
+                if previous is None:
+                    continue
+                if current["queries"] > previous["queries"]:
+                    regressions.append(
+                        f"{size}/{name}: queries {previous['queries']} -> "
+                        f"{current['queries']}"
+                    )
+                slower_by = current["p95_ms"] - previous["p95_ms"]
+                if (
+                    current["p95_ms"] > previous["p95_ms"] * (1 + tolerance)
+                    and slower_by > min_delta_ms
+                ):
+                    regressions.append(
+                        f"{size}/{name}: p95 {previous['p95_ms']}ms -> "
+                        f"{current['p95_ms']}ms"
+                    )
+        if regressions:
+            self.stdout.write("\nRegressions:")
+            for regression in regressions:
+                self.stdout.write(f"  {regression}")
+        else:
+            self.stdout.write("\nNo regressions against the baseline.")
+        return regressions
@@ -0,0 +1,43 @@
+"""Classify parts A, B or C by their share of annual revenue and units."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.classification import classify_parts, schedule_classification
+
+
+class Command(BaseCommand):
+    """Run the ABC classification now or queue the nightly job."""
+
+    help = (
+        "Rank parts by revenue and units sold over ABC_WINDOW_DAYS and store "
+        "their A/B/C class."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Days of sales to rank by (default ABC_WINDOW_DAYS).",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue the nightly classification job instead of running now.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            job = schedule_classification()
+            self.stdout.write(
+                f"Queued job {job.pk} for {job.run_at:%Y-%m-%d %H:%M}."
+                if job
+                else "A classification job is already queued."
+            )
+            return
+        started = time.perf_counter()
+        counts = classify_parts(days=options["days"])
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(
+            f"Classified parts ({summary}) in {time.perf_counter() - started:.1f}s."
+        )
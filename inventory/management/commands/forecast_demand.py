@@ -0,0 +1,57 @@
+"""Forecast per-part demand and suggest reorder points and quantities."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.forecast import (
+    METHODS,
+    apply_suggestions,
+    forecast_demand,
+    schedule_forecast,
+)
+from inventory.models import SparePart
+
+
+class Command(BaseCommand):
+    """Run the demand forecast now, apply it, or queue the periodic job."""
+
+    help = (
+        "Forecast daily demand for every part from recent sales and store "
+        "suggested reorder points and reorder quantities."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--method", choices=METHODS)
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Days of sales history to use (default FORECAST_HISTORY_DAYS).",
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Also copy the suggestions into minimum_stock and reorder_quantity.",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue the periodic forecast job instead of running now.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            job = schedule_forecast()
+            self.stdout.write(
+                f"Queued job {job.pk} for {job.run_at:%Y-%m-%d %H:%M}."
+                if job
+                else "A forecast job is already queued."
+            )
+            return
+        started = time.perf_counter()
+        count = forecast_demand(method=options["method"], days=options["days"])
+        self.stdout.write(
+            f"Forecast {count} part(s) in {time.perf_counter() - started:.1f}s."
+        )
+        if options["apply"]:
+            applied = apply_suggestions(SparePart.objects.all())
+            self.stdout.write(f"Applied suggestions to {applied} part(s).")
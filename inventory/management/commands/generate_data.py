@@ -0,0 +1,171 @@
+"""Generate a synthetic inventory dataset for benchmarking."""
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from inventory import categories, ledger, scorecard
+from inventory.models import (
+    Category,
+    PurchaseOrder,
+    Sale,
+    SparePart,
+    StockMovement,
+    StockSnapshot,
+    Supplier,
+)
+from inventory.sql import analyze
+
+CATEGORIES = [
+    "Brakes", "Engine", "Electrical", "Filters", "Suspension", "Exhaust",
+    "Cooling", "Transmission", "Steering", "Lighting", "Body", "Interior",
+]
+
+
+@contextmanager
+def explicit_sale_dates():
+    """Let bulk_create keep the sale_date we set instead of "now"."""
+    field = Sale._meta.get_field("sale_date")  # pylint: disable=protected-access
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    """Bulk-insert suppliers, parts and sales with realistic distributions."""
+
+    help = "Generate synthetic suppliers, parts and sales with bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suppliers", type=int, default=50)
+        parser.add_argument("--parts", type=int, default=1000)
+        parser.add_argument("--sales", type=int, default=20000)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=730,
+            help="Spread sales over this many days before today.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete existing suppliers, parts and sales first.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        if options["clear"]:
+            PurchaseOrder.objects.all().delete()
+            Sale.objects.all().delete()
+            SparePart.objects.all().delete()
+            StockMovement.objects.all().delete()
+            StockSnapshot.objects.all().delete()
+            Supplier.objects.all().delete()
+
+        with transaction.atomic():
+            Supplier.objects.bulk_create(
+                (
+                    Supplier(
+                        name=f"Supplier {index:05d}",
+                        email=f"orders{index}@supplier.example",
+                    )
+                    for index in range(options["suppliers"])
+                ),
+                batch_size=batch_size,
+            )
+        supplier_ids = list(Supplier.objects.values_list("id", flat=True))
+        self.stdout.write(f"{len(supplier_ids)} suppliers")
+        Category.objects.bulk_create(
+            (Category(name=name) for name in CATEGORIES),
+            ignore_conflicts=True,
+        )
+        ids = dict(Category.objects.filter(name__in=CATEGORIES).values_list("name", "id"))
+        category_ids = [ids[name] for name in CATEGORIES]
+
+        offset = SparePart.objects.count()
+        last_id = SparePart.objects.aggregate(last=Max("pk"))["last"] or 0
+        for start in range(0, options["parts"], batch_size):
+            stop = min(start + batch_size, options["parts"])
+            with transaction.atomic():
+                SparePart.objects.bulk_create(
+                    [
+                        self._make_part(rng, offset + index, supplier_ids, category_ids)
+                        for index in range(start, stop)
+                    ],
+                    batch_size=batch_size,
+                )
+        with transaction.atomic():
+            ledger.record_initial(SparePart.objects.filter(pk__gt=last_id))
+            categories.refresh()
+        parts = list(SparePart.objects.values_list("id", "price"))
+        self.stdout.write(f"{len(parts)} parts")
+
+        # Demand is heavily skewed: a few fast movers account for most sales.
+        cum_weights = list(
+            itertools.accumulate(1.0 / (rank + 1) ** 0.8 for rank in range(len(parts)))
+        )
+        employee_ids = list(User.objects.values_list("id", flat=True)) or [None]
+        now = timezone.now()
+        horizon = options["days"] * 86400
+        sale_offset = Sale.objects.count()
+        with explicit_sale_dates():
+            for start in range(0, options["sales"], batch_size):
+                stop = min(start + batch_size, options["sales"])
+                chosen = rng.choices(parts, cum_weights=cum_weights, k=stop - start)
+                sales = []
+                for index, (part_id, price) in zip(range(start, stop), chosen):
+                    quantity = rng.choice((1, 1, 1, 2, 2, 3, 4, 5, 10))
+                    sales.append(
+                        Sale(
+                            sale_number=f"S{sale_offset + index:09d}",
+                            part_id=part_id,
+                            quantity_sold=quantity,
+                            total_price=price * quantity,
+                            employee_id=rng.choice(employee_ids),
+                            sale_date=now - timedelta(seconds=rng.randrange(horizon)),
+                        )
+                    )
+                with transaction.atomic():
+                    Sale.objects.bulk_create(sales, batch_size=batch_size)
+        self.stdout.write(f"{options['sales']} sales")
+        scorecard.invalidate()
+        # Fresh statistics let the admin estimate these tables' sizes.
+        analyze(SparePart, Sale)
+        self.stdout.write(f"Done in {time.perf_counter() - started:.1f}s.")
+
+    @staticmethod
+    def _make_part(rng, index, supplier_ids, category_ids):
+        """Return an unsaved part; about 15% low and 3% out of stock."""
+        minimum_stock = rng.choice((2, 5, 10, 20))
+        roll = rng.random()
+        if roll < 0.03:
+            quantity = 0
+        elif roll < 0.18:
+            quantity = rng.randint(1, minimum_stock)
+        else:
+            quantity = rng.randint(minimum_stock + 1, minimum_stock * 20)
+        return SparePart(
+            part_number=f"PN-{index:07d}",
+            part_name=f"Part {index}",
+            category_id=rng.choice(category_ids),
+            quantity=quantity,
+            minimum_stock=minimum_stock,
+            price=Decimal(rng.randint(100, 50000)) / 100,
+            supplier_id=rng.choice(supplier_ids) if supplier_ids else None,
+            location=f"A{rng.randint(1, 40):02d}-{rng.randint(1, 12):02d}",
+        )
@@ -0,0 +1,51 @@
+"""Generate supplier purchase orders for every low-stock part."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from inventory.models import PurchaseOrderLine, SparePart
+from inventory.purchasing import generate_orders, suggested_lines
+
+
+class Command(BaseCommand):
+    """Create one purchase order per supplier, or preview what would be ordered."""
+
+    help = (
+        "Order every low-stock part up to its target stock, net of open "
+        "orders, with one purchase order per supplier."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", help="Only parts in this category.")
+        parser.add_argument("--supplier", type=int, help="Only parts from this supplier id.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many parts and units would be ordered.",
+        )
+
+    def handle(self, *args, **options):
+        parts = SparePart.objects.all()
+        if options["category"]:
+            parts = parts.filter(category__name=options["category"])
+        if options["supplier"]:
+            parts = parts.filter(supplier_id=options["supplier"])
+
+        if options["dry_run"]:
+            totals = suggested_lines(parts).aggregate(
+                parts=Count("pk"),
+                units=Sum("order_quantity"),
+            )
+            self.stdout.write(
+                f"{totals['parts']} part(s), {totals['units'] or 0} unit(s) would be ordered."
+            )
+            return
+
+        started = time.perf_counter()
+        orders = generate_orders(parts)
+        lines = PurchaseOrderLine.objects.filter(order__in=orders).count() if orders else 0
+        self.stdout.write(
+            f"Created {len(orders)} purchase order(s) with {lines} line(s) "
+            f"in {time.perf_counter() - started:.1f}s."
+        )
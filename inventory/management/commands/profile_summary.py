@@ -0,0 +1,58 @@
+"""Summarize request profiles written by ProfilingMiddleware."""
+import glob
+import os
+import pstats
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Merge sampled cProfile files and print the hottest functions."""
+
+    help = "Print the hottest functions across sampled request profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=None,
+            help="Directory holding .prof files (defaults to PROFILING_DIR).",
+        )
+        parser.add_argument(
+            "--url-name",
+            default=None,
+            help="Only include profiles of this URL name.",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("cumulative", "tottime", "ncalls"),
+            default="tottime",
+            help="Sort key for the function table.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="Number of functions to print.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or settings.PROFILING_DIR
+        pattern = f"{options['url_name']}-*.prof" if options["url_name"] else "*.prof"
+        files = sorted(glob.glob(os.path.join(directory, pattern)))
+        if not files:
+            raise CommandError(f"No profiles matching {pattern} in {directory}.")
+
+        samples = Counter(
+            os.path.basename(path).rsplit("-", 1)[0] for path in files
+        )
+        self.stdout.write(f"{len(files)} profile(s):")
+        for url_name, count in samples.most_common():
+            self.stdout.write(f"  {url_name}: {count}")
+        self.stdout.write("")
+
+        stats = pstats.Stats(files[0], stream=self.stdout)
+        for path in files[1:]:
+            stats.add(path)
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
@@ -0,0 +1,23 @@
+"""Recompute every category's part, low-stock and stock-value counters."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.categories import refresh
+
+
+class Command(BaseCommand):
+    """Rebuild the denormalized category counters from the parts table."""
+
+    help = (
+        "Recompute part_count, low_stock_count and stock_value for every "
+        "category, e.g. after parts were changed outside the application."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh()
+        self.stdout.write(
+            f"Refreshed {count} categor{'y' if count == 1 else 'ies'} "
+            f"in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,165 @@
+"""Replay captured traffic against a running server."""
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.traffic import load_capture
+
+from .benchmark import percentile
+
+# Captures hold no request bodies, so only these can be replayed faithfully.
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as responses instead of following them."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):  # pylint: disable=too-many-arguments
+        return None
+
+
+class _Replayer:
+    """Send captured requests and collect ``(key, status, latency_ms)``."""
+
+    def __init__(self, base_url, sessions, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.sessions = sessions
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(_NoRedirect)
+        self.results = []
+        self.results_lock = threading.Lock()
+
+    def send(self, record):
+        """Issue one captured request and store ``(key, status, latency_ms)``."""
+        url = self.base_url + record["path"]
+        if record.get("query"):
+            url += "?" + record["query"]
+        request = urllib.request.Request(url, method=record["method"])
+        session_id = self.sessions.get(record.get("role"))
+        if session_id:
+            request.add_header(
+                "Cookie",
+                f"{settings.SESSION_COOKIE_NAME}={session_id}",
+            )
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except (urllib.error.URLError, OSError):
+            status = None
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self.results_lock:
+            self.results.append(
+                (f"{record['method']} {record['path']}", status, latency_ms)
+            )
+
+
+class Command(BaseCommand):
+    """Re-issue a traffic capture with the original pacing, optionally sped up.
+
+    Requests are sent from a pool of ``--concurrency`` threads. Each one is
+    dispatched at its captured offset from the first request divided by
+    ``--speedup`` (``0`` sends as fast as the pool allows). Captured roles
+    are mapped to sessions with ``--session admin=<sessionid>``; requests
+    for a role without a session are sent anonymously. Only GET and HEAD
+    requests are replayed.
+    """
+
+    help = "Replay a JSONL traffic capture and report throughput and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=settings.TRAFFIC_CAPTURE_FILE)
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--speedup",
+            type=float,
+            default=1.0,
+            help="Replay this many times faster than captured; 0 for no pacing.",
+        )
+        parser.add_argument(
+            "--session",
+            action="append",
+            default=[],
+            metavar="ROLE=SESSIONID",
+            help="Session cookie to send for requests captured with ROLE.",
+        )
+        parser.add_argument("--limit", type=int, help="Replay at most this many.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        if options["speedup"] < 0:
+            raise CommandError("--speedup cannot be negative.")
+        sessions = {}
+        for value in options["session"]:
+            role, sep, session_id = value.partition("=")
+            if not sep or not session_id:
+                raise CommandError(f"Expected ROLE=SESSIONID, got {value!r}.")
+            sessions[role] = session_id
+
+        try:
+            records = load_capture(options["file"])
+        except FileNotFoundError as exc:
+            raise CommandError(f"No capture file at {options['file']}.") from exc
+        replayable = [r for r in records if r["method"] in SAFE_METHODS]
+        skipped = len(records) - len(replayable)
+        if options["limit"] is not None:
+            replayable = replayable[: options["limit"]]
+        if not replayable:
+            raise CommandError("Nothing to replay.")
+
+        replayer = _Replayer(options["base_url"], sessions, options["timeout"])
+        speedup = options["speedup"]
+        first_ts = replayable[0]["ts"]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for record in replayable:
+                if speedup:
+                    delay = (record["ts"] - first_ts) / speedup
+                    wait = started + delay - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                pool.submit(replayer.send, record)
+        elapsed = time.perf_counter() - started
+
+        self._report(replayer.results, elapsed, skipped, options["top"])
+
+    def _report(self, results, elapsed, skipped, top):
+        """Print overall and per-endpoint throughput and latency percentiles."""
+        latencies = [latency for _, _, latency in results]
+        errors = sum(1 for _, status, _ in results if status is None or status >= 500)
+        self.stdout.write(
+            f"{len(results)} requests in {elapsed:.2f}s "
+            f"({len(results) / elapsed if elapsed else 0:.1f} req/s), "
+            f"{errors} errors, {skipped} skipped (unsafe methods)"
+        )
+        self.stdout.write(self._percentiles("all", latencies))
+
+        by_endpoint = defaultdict(list)
+        for key, _, latency in results:
+            by_endpoint[key].append(latency)
+        ranked = sorted(by_endpoint.items(), key=lambda item: -len(item[1]))
+        for key, samples in ranked[:top]:
+            self.stdout.write(self._percentiles(key, samples))
+
+    @staticmethod
+    def _percentiles(label, samples):
+        return (
+            f"{label:40} n={len(samples):<6}"
+            f" p50={statistics.median(samples):>8.2f}ms"
+            f" p95={percentile(samples, 95):>8.2f}ms"
+            f" p99={percentile(samples, 99):>8.2f}ms"
+        )
@@ -0,0 +1,118 @@
+"""Run background job workers."""
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from inventory.jobs import make_worker_id, work
+from inventory.tasks import schedule_recurring
+
+
+def _process_main(index, poll_interval, burst):
+    """Entry point for a worker process."""
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    work(
+        make_worker_id(index),
+        poll_interval=poll_interval,
+        burst=burst,
+        stop_event=stop_event,
+        manage_connections=True,
+    )
+
+
+class Command(BaseCommand):
+    """Process queued jobs with a pool of worker threads or processes."""
+
+    help = "Run background job workers against the application database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of concurrent workers.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=("threads", "processes"),
+            default="threads",
+            help="Run workers as threads (default) or separate processes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        poll_interval = options["poll_interval"]
+        burst = options["burst"]
+
+        scheduled = schedule_recurring()
+        if scheduled:
+            self.stdout.write(f"Scheduled {', '.join(scheduled)}.")
+
+        if workers == 1 and options["mode"] == "threads":
+            processed = work(
+                make_worker_id(),
+                poll_interval=poll_interval,
+                burst=burst,
+            )
+            self.stdout.write(f"Processed {processed} job(s).")
+            return
+
+        if options["mode"] == "processes":
+            # Forked children must not share the parent's SQLite handle.
+            connections.close_all()
+            pool = [
+                multiprocessing.Process(
+                    target=_process_main,
+                    args=(index, poll_interval, burst),
+                    daemon=True,
+                )
+                for index in range(workers)
+            ]
+        else:
+            stop_event = threading.Event()
+            pool = [
+                threading.Thread(
+                    target=work,
+                    args=(make_worker_id(index),),
+                    kwargs={
+                        "poll_interval": poll_interval,
+                        "burst": burst,
+                        "stop_event": stop_event,
+                        "manage_connections": True,
+                    },
+                    daemon=True,
+                )
+                for index in range(workers)
+            ]
+
+        for worker in pool:
+            worker.start()
+        self.stdout.write(f"Started {workers} worker {options['mode']}.")
+        try:
+            for worker in pool:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+            if options["mode"] == "processes":
+                for worker in pool:
+                    worker.terminate()
+            else:
+                stop_event.set()
+            for worker in pool:
+                worker.join()
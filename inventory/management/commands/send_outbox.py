@@ -0,0 +1,44 @@
+"""Deliver queued emails from the outbox."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.outbox import send_pending
+
+
+class Command(BaseCommand):
+    """Send pending outbox emails in batches, optionally in a loop."""
+
+    help = "Send pending outbox emails over a single SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of emails sent per connection.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10.0,
+            help="Seconds to sleep between polls when --loop is set.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            sent, failed = send_pending(batch_size=batch_size)
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+            if sent + failed == batch_size:
+                # A full batch suggests more mail is already due.
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
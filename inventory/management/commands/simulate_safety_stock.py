@@ -0,0 +1,129 @@
+"""Simulate candidate minimum stocks against resampled historical demand."""
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.jobs import enqueue
+from inventory.simulation import SIMULATION_JOB, run_simulation, select_parts
+
+
+def parse_candidates(value):
+    """Parse a comma-separated list of candidate minimum stocks."""
+    if not value:
+        return None
+    try:
+        candidates = [int(item) for item in value.split(",") if item.strip()]
+    except ValueError as exc:
+        raise CommandError("--candidates must be comma-separated integers.") from exc
+    if any(candidate < 0 for candidate in candidates):
+        raise CommandError("--candidates cannot be negative.")
+    return candidates
+
+
+class Command(BaseCommand):
+    """Report service level and holding cost per part and category."""
+
+    help = (
+        "Monte Carlo simulation of stock-outs and holding cost under candidate "
+        "minimum_stock values, using resampled sales history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", default="")
+        parser.add_argument("--supplier", type=int, help="Supplier id.")
+        parser.add_argument(
+            "--candidates",
+            help="Comma-separated minimum stocks to try for every part.",
+        )
+        parser.add_argument("--runs", type=int, help="Default SIMULATION_RUNS.")
+        parser.add_argument("--horizon", type=int, help="Days per run.")
+        parser.add_argument("--workers", type=int, help="Processes to use.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Parts to print, lowest current service level first.",
+        )
+        parser.add_argument("--csv", help="Also write every part and candidate here.")
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Run as a background job instead, viewable on the simulation page.",
+        )
+
+    def handle(self, *args, **options):
+        candidates = parse_candidates(options["candidates"])
+        if options["queue"]:
+            job = enqueue(
+                SIMULATION_JOB,
+                {
+                    "category": options["category"],
+                    "supplier_id": options["supplier"],
+                    "candidates": candidates,
+                    "runs": options["runs"],
+                    "horizon": options["horizon"],
+                },
+            )
+            self.stdout.write(f"Queued job {job.pk}.")
+            return
+
+        started = time.perf_counter()
+        report = run_simulation(
+            select_parts(options["category"], options["supplier"]),
+            candidates=candidates,
+            runs=options["runs"],
+            horizon=options["horizon"],
+            workers=options["workers"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            f"Simulated {len(report['parts'])} part(s), {report['runs']} runs of "
+            f"{report['horizon_days']} days, in {time.perf_counter() - started:.1f}s. "
+            f"Target service level {report['target_service_level']:.0%}."
+        )
+        self.stdout.write(
+            "\nCategory              parts"
+            "  service now -> recommended  holding now -> recommended"
+        )
+        for row in report["categories"]:
+            self.stdout.write(
+                f"{row['category'][:20]:20} {row['parts']:>6}"
+                f"  {row['current_service_level']:>10.1%}"
+                f" -> {row['recommended_service_level']:<11.1%}"
+                f"  {row['current_holding_cost']:>11.2f}"
+                f" -> {row['recommended_holding_cost']:.2f}"
+            )
+        self.stdout.write("\nPart                  min  service   recommended min  service")
+        for part in report["parts"][:options["limit"]]:
+            self.stdout.write(
+                f"{part['part_number'][:20]:20} {part['current']['minimum_stock']:>4}"
+                f"  {part['current']['service_level']:>7.1%}"
+                f"   {part['recommended']['minimum_stock']:>15}"
+                f"  {part['recommended']['service_level']:>7.1%}"
+            )
+        if options["csv"]:
+            self._write_csv(options["csv"], report)
+
+    @staticmethod
+    def _write_csv(path, report):
+        with open(path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow([
+                "part_number", "category", "daily_demand", "minimum_stock",
+                "service_level", "stockout_rate", "holding_cost", "current", "recommended",
+            ])
+            for part in report["parts"]:
+                for row in part["candidates"]:
+                    writer.writerow([
+                        part["part_number"],
+                        part["category"],
+                        part["daily_demand"],
+                        row["minimum_stock"],
+                        row["service_level"],
+                        row["stockout_rate"],
+                        row["holding_cost"],
+                        row == part["current"],
+                        row == part["recommended"],
+                    ])
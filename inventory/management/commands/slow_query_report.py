@@ -0,0 +1,71 @@
+"""Rank logged slow queries by total time."""
+import glob
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Aggregate the slow-query log by query shape."""
+
+    help = "Rank slow query shapes from the slow-query log by total time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Log file to read (defaults to SLOW_QUERY_LOG_FILE and its rotations).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of shapes to print.",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Print the captured query plan under each shape.",
+        )
+
+    def handle(self, *args, **options):
+        base = options["file"] or settings.SLOW_QUERY_LOG_FILE
+        files = sorted(glob.glob(base + "*"))
+        if not files:
+            raise CommandError(f"No slow-query log found at {base}.")
+
+        shapes = defaultdict(
+            lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "views": set()}
+        )
+        for path in files:
+            with open(path, encoding="utf-8") as log_file:
+                for line in log_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    shape = shapes[record["shape"]]
+                    shape["count"] += 1
+                    shape["total_ms"] += record["duration_ms"]
+                    shape["max_ms"] = max(shape["max_ms"], record["duration_ms"])
+                    shape["sql"] = record["sql"]
+                    if record.get("view"):
+                        shape["views"].add(record["view"])
+                    if record.get("plan"):
+                        shape["plan"] = record["plan"]
+
+        ranked = sorted(shapes.items(), key=lambda item: -item[1]["total_ms"])
+        for shape_id, shape in ranked[:options["limit"]]:
+            self.stdout.write(
+                f"{shape_id}  total={shape['total_ms']:.1f}ms  "
+                f"count={shape['count']}  "
+                f"mean={shape['total_ms'] / shape['count']:.1f}ms  "
+                f"max={shape['max_ms']:.1f}ms"
+            )
+            self.stdout.write(f"    views: {', '.join(sorted(shape['views'])) or '-'}")
+            self.stdout.write(f"    {shape['sql'][:300]}")
+            if options["plans"]:
+                for row in shape.get("plan", []):
+                    self.stdout.write(f"      plan: {row}")
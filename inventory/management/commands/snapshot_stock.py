@@ -0,0 +1,48 @@
+"""Snapshot stock levels, schedule the snapshot job, or look up past stock."""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from inventory.ledger import schedule_snapshots, stock_at, take_snapshots
+
+
+class Command(BaseCommand):
+    """Write stock snapshots now, queue the periodic job, or query the ledger."""
+
+    help = (
+        "Snapshot the stock of every part that moved since the last snapshot, "
+        "or print a part's stock at a past instant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue the periodic snapshot job instead of snapshotting now.",
+        )
+        parser.add_argument("--part", type=int, help="Part id to look up.")
+        parser.add_argument(
+            "--at",
+            help="Print the stock of --part at this ISO date and time.",
+        )
+
+    def handle(self, *args, **options):
+        if options["at"]:
+            if options["part"] is None:
+                raise CommandError("--at needs --part.")
+            when = parse_datetime(options["at"])
+            if when is None:
+                raise CommandError("--at must be an ISO date and time.")
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+            self.stdout.write(str(stock_at(options["part"], when)))
+            return
+        if options["schedule"]:
+            job = schedule_snapshots()
+            self.stdout.write(
+                f"Queued job {job.pk} for {job.run_at:%Y-%m-%d %H:%M}."
+                if job
+                else "A snapshot job is already queued."
+            )
+            return
+        self.stdout.write(f"Wrote {take_snapshots()} snapshot(s).")
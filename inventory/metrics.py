@@ -0,0 +1,119 @@
+"""Prometheus metrics for the inventory app.
+
+Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` is set by ``gunicorn.conf.py``
+before any worker starts. ``prometheus_client`` then keeps every worker's
+counters and histograms in mmap-backed files in that directory, and
+:func:`render_latest` merges them, so one scrape of ``/metrics`` covers the
+whole server rather than whichever worker answered it. Without the
+variable (``runserver``, tests) metrics live in the process registry.
+"""
+# pylint: disable=no-member
+import os
+
+from django.db.models import Count
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .models import Job, OutboxEmail, StockAlertEvent
+
+REQUEST_LATENCY = Histogram(
+    "partstrack_request_latency_seconds",
+    "Request latency by URL name.",
+    ["url_name", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    "partstrack_requests",
+    "Requests served by URL name and status code.",
+    ["url_name", "method", "status"],
+)
+DB_QUERIES = Histogram(
+    "partstrack_db_queries_per_request",
+    "Database queries executed per request by URL name.",
+    ["url_name"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+CACHE_LOOKUPS = Counter(
+    "partstrack_cache_lookups",
+    "Application cache lookups by cache key prefix and result.",
+    ["cache", "result"],
+)
+
+
+def record_cache_lookup(cache_name, hit):
+    """Count an application cache lookup as a hit or a miss."""
+    CACHE_LOOKUPS.labels(cache=cache_name, result="hit" if hit else "miss").inc()
+
+
+class QueueDepthCollector:
+    """Report background queue depths, read from the database at scrape time."""
+
+    @staticmethod
+    def _family():
+        return GaugeMetricFamily(
+            "partstrack_queue_depth",
+            "Items waiting in background queues.",
+            labels=["queue", "status"],
+        )
+
+    def describe(self):
+        """Describe the metric without querying (avoids DB access on import)."""
+        return [self._family()]
+
+    def collect(self):
+        """Yield gauges for the outbox, job queue and pending stock alerts."""
+        depth = self._family()
+        for status, count in _count_by_status(
+            Job,
+            (Job.STATUS_QUEUED, Job.STATUS_RUNNING),
+        ):
+            depth.add_metric(["jobs", status], count)
+        for status, count in _count_by_status(
+            OutboxEmail,
+            (
+                OutboxEmail.STATUS_PENDING,
+                OutboxEmail.STATUS_SENDING,
+                OutboxEmail.STATUS_FAILED,
+            ),
+        ):
+            depth.add_metric(["outbox", status], count)
+        depth.add_metric(
+            ["stock_alerts", "pending"],
+            StockAlertEvent.objects.filter(digested_at__isnull=True).count(),
+        )
+        yield depth
+
+
+def _count_by_status(model, statuses):
+    """Return ``(status, count)`` pairs for ``statuses``, including zeros."""
+    counts = dict(
+        model.objects.filter(status__in=statuses)
+        .values("status")
+        .annotate(total=Count("pk"))
+        .values_list("status", "total")
+        .order_by()
+    )
+    return [(status, counts.get(status, 0)) for status in statuses]
+
+
+_queue_collector = QueueDepthCollector()
+REGISTRY.register(_queue_collector)
+
+
+def render_latest():
+    """Return ``(body, content_type)`` for a scrape of all workers' metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_queue_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
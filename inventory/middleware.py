@@ -0,0 +1,505 @@
+"""Request middleware for the inventory app.
+
+Every middleware here supports both sync and async requests, so under
+ASGI the async API views are not pushed through a sync thread. Work that
+can touch the database, such as resolving ``request.user``, is moved to
+a worker thread on the async path.
+"""
+# pylint: disable=too-few-public-methods
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+from django.utils import timezone
+
+from . import metrics, traffic
+
+logger = logging.getLogger("inventory.requests")
+access_logger = logging.getLogger("inventory.access")
+
+_current_stats = contextvars.ContextVar("inventory_query_stats", default=None)
+_current_view = contextvars.ContextVar("inventory_current_view", default=None)
+_template_timer_installed = False
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a view runs more queries than budgeted."""
+
+
+class QueryStats:
+    """Per-request SQL counters, installed as a database execute wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.count += 1
+            # Django passes parameters separately, so identical SQL text is
+            # the same query shape: repeats usually mean an N+1 loop.
+            self.shapes[sql] += 1
+
+    def duplicates(self, threshold=None):
+        """Return ``{sql: count}`` for shapes repeated ``threshold`` times or more."""
+        if threshold is None:
+            threshold = getattr(settings, "QUERY_DUPLICATE_THRESHOLD", 3)
+        return {
+            sql: count for sql, count in self.shapes.items() if count >= threshold
+        }
+
+    def server_timing(self):
+        """Format the stats as a ``Server-Timing`` header value."""
+        return ", ".join(
+            [
+                f'db;dur={self.sql_time * 1000:.1f};desc="{self.count} queries"',
+                f"tpl;dur={self.template_time * 1000:.1f}",
+                f"total;dur={self.total_time * 1000:.1f}",
+            ]
+        )
+
+
+def _install_template_timer():
+    """Wrap Django template rendering so its time is charged to the request."""
+    global _template_timer_installed  # pylint: disable=global-statement
+    if _template_timer_installed:
+        return
+    original_render = django_backend.Template.render
+
+    def timed_render(self, context=None, request=None):
+        stats = _current_stats.get()
+        if stats is None:
+            return original_render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+    django_backend.Template.render = timed_render
+    _template_timer_installed = True
+
+
+def count_queries(execute, sql, params, many, context):
+    """Execute wrapper charging each query to the current request's stats.
+
+    Installed on every connection rather than on the request thread's one:
+    async views run their ORM calls on worker threads with connections of
+    their own, and the context variable follows them there.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _add_query_counter(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Attach :func:`count_queries` to a newly opened connection."""
+    # Inserted at the front, as in ``slow_queries``: execute_wrapper()
+    # context managers active while the connection opens pop the last one.
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+def _install_query_counter():
+    """Count queries on open connections and every connection opened later."""
+    connection_created.connect(
+        _add_query_counter, dispatch_uid="inventory.middleware.count_queries"
+    )
+    for db_connection in connections.all(initialized_only=True):
+        _add_query_counter(None, db_connection)
+
+
+def current_view_name():
+    """Return the dotted view name of the request being served, if any."""
+    return _current_view.get()
+
+
+def query_budget(url_name):
+    """Return the query budget for ``url_name``, or None if unlimited."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    return budgets.get(url_name, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+
+
+class QueryInstrumentationMiddleware:
+    """Record query count, SQL time, template time and duplicate queries.
+
+    The numbers are attached to the request as ``request.query_stats``,
+    returned in a ``Server-Timing`` header and logged as one JSON line on
+    the ``inventory.requests`` logger. With ``QUERY_BUDGET_STRICT`` enabled
+    (as in tests) a view exceeding its budget in ``QUERY_BUDGETS`` raises
+    :class:`QueryBudgetExceeded` instead of only logging a warning.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _install_template_timer()
+        _install_query_counter()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, tokens, start = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._end(tokens)
+        return self._finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, tokens, start = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._end(tokens)
+        return self._finish(request, response, stats, start)
+
+    @staticmethod
+    def _begin(request):
+        stats = QueryStats()
+        request.query_stats = stats
+        tokens = (_current_stats.set(stats), _current_view.set(None))
+        return stats, tokens, time.perf_counter()
+
+    @staticmethod
+    def _end(tokens):
+        _current_stats.reset(tokens[0])
+        _current_view.reset(tokens[1])
+
+    @staticmethod
+    def _finish(request, response, stats, start):
+        stats.total_time = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.url_name if match else None
+        duplicates = stats.duplicates()
+
+        response["Server-Timing"] = stats.server_timing()
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "url_name": url_name,
+                    "status": response.status_code,
+                    "queries": stats.count,
+                    "sql_ms": round(stats.sql_time * 1000, 2),
+                    "template_ms": round(stats.template_time * 1000, 2),
+                    "total_ms": round(stats.total_time * 1000, 2),
+                    "duplicates": [
+                        {"sql": sql, "count": count}
+                        for sql, count in duplicates.items()
+                    ],
+                }
+            )
+        )
+
+        budget = query_budget(url_name)
+        if budget is not None and stats.count > budget:
+            message = (
+                f"{url_name} ran {stats.count} queries (budget {budget}); "
+                f"repeated: {list(duplicates.values())}"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # pylint: disable=unused-argument
+        """Make the dotted path of the resolved view available to query loggers."""
+        _current_view.set(f"{view_func.__module__}.{view_func.__qualname__}")
+
+
+async def _request_role(request):
+    """Return :func:`traffic.request_role` for an async request.
+
+    ``request.user`` may still be a lazy object that loads the session and
+    user from the database; unless the view already resolved it (which
+    ``AuthenticationMiddleware`` caches as ``request._cached_user``), it
+    is resolved in a worker thread.
+    """
+    user = getattr(request, "user", None)
+    if user is None or hasattr(request, "_cached_user"):
+        return traffic.request_role(user)
+    return await sync_to_async(traffic.request_role)(user)
+
+
+class AccessLogMiddleware:
+    """Write one JSON line per request to the ``inventory.access`` logger.
+
+    Records carry the caller role, URL name, status, latency, query count
+    and response size. The logger's handler is the non-blocking
+    :class:`inventory.access_log.AsyncAccessLogHandler`, so requests never
+    wait on disk. Installed first so the latency covers every other
+    middleware; ``manage.py access_log_report`` summarizes the log.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not access_logger.isEnabledFor(logging.INFO):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        role = traffic.request_role(getattr(request, "user", None))
+        self._log(request, response, role, latency_ms)
+        return response
+
+    async def __acall__(self, request):
+        if not access_logger.isEnabledFor(logging.INFO):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._log(request, response, await _request_role(request), latency_ms)
+        return response
+
+    @staticmethod
+    def _log(request, response, role, latency_ms):
+        match = getattr(request, "resolver_match", None)
+        stats = getattr(request, "query_stats", None)
+        access_logger.info(
+            json.dumps(
+                {
+                    "ts": timezone.now().isoformat(),
+                    "method": request.method,
+                    "path": request.path,
+                    "url_name": match.url_name if match else None,
+                    "role": role,
+                    "status": response.status_code,
+                    "latency_ms": round(latency_ms, 2),
+                    "queries": stats.count if stats is not None else None,
+                    "bytes": None if response.streaming else len(response.content),
+                },
+                separators=(",", ":"),
+            )
+        )
+
+
+class MetricsMiddleware:
+    """Record Prometheus request latency, status and query-count metrics.
+
+    Installed before :class:`QueryInstrumentationMiddleware` so the query
+    count it collected is complete by the time this middleware reads it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _observe(request, response, elapsed):
+        match = getattr(request, "resolver_match", None)
+        url_name = (match.url_name if match else None) or "unresolved"
+        metrics.REQUEST_LATENCY.labels(url_name, request.method).observe(elapsed)
+        metrics.REQUESTS.labels(
+            url_name,
+            request.method,
+            str(response.status_code),
+        ).inc()
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            metrics.DB_QUERIES.labels(url_name).observe(stats.count)
+
+
+class ProfilingMiddleware:
+    """Run a sample of requests under cProfile and save the stats.
+
+    Off unless ``PROFILING_SAMPLE_RATE`` is above zero or a staff user sends
+    the ``PROFILING_HEADER`` header. Each profiled request writes
+    ``<url_name>-<timestamp>.prof`` into ``PROFILING_DIR``; summarize them
+    with ``manage.py profile_summary``. Must run after authentication so
+    the header can be restricted to staff. An async request is profiled on
+    the event loop thread only; ORM calls it hands to worker threads are
+    not in the profile.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # cProfile cannot profile two threads at once, so sample one at a time.
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def requests_profile(request):
+        """Return True if the request carries the ``PROFILING_HEADER`` header."""
+        header = getattr(settings, "PROFILING_HEADER", "X-Profile-Request")
+        return bool(request.headers.get(header))
+
+    def should_profile(self, request):
+        """Return True if this request is selected for profiling."""
+        if self.requests_profile(request):
+            user = getattr(request, "user", None)
+            return bool(user and user.is_staff)
+        rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_profile(request) or not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            self._lock.release()
+        self._save(request, profiler)
+        return response
+
+    async def __acall__(self, request):
+        if self.requests_profile(request):
+            # Only the header check needs the (lazily loaded) user.
+            selected = await sync_to_async(self.should_profile)(request)
+        else:
+            selected = self.should_profile(request)
+        if not selected or not self._lock.acquire(blocking=False):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            self._lock.release()
+        await sync_to_async(self._save)(request, profiler)
+        return response
+
+    @staticmethod
+    def _save(request, profiler):
+        match = getattr(request, "resolver_match", None)
+        url_name = (match.url_name if match else None) or "unresolved"
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{url_name}-{timezone.now():%Y%m%dT%H%M%S%f}.prof"
+        profiler.dump_stats(os.path.join(directory, filename))
+
+
+class TrafficCaptureMiddleware:
+    """Append a sanitized record of each request to a JSONL capture file.
+
+    Off unless ``TRAFFIC_CAPTURE_ENABLED`` is set. Records hold the method,
+    path, query string (with sensitive values redacted), caller role,
+    status and duration, never bodies, cookies or headers. Writes are
+    buffered by :class:`inventory.traffic.TrafficRecorder`. Replay a
+    capture with ``manage.py replay_traffic``. Must run after
+    authentication so the role is known.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, "TRAFFIC_CAPTURE_ENABLED", False):
+            return self.get_response(request)
+
+        started_at = time.time()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        role = traffic.request_role(getattr(request, "user", None))
+        self._record(request, response, role, started_at, duration_ms)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, "TRAFFIC_CAPTURE_ENABLED", False):
+            return await self.get_response(request)
+
+        started_at = time.time()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        role = await _request_role(request)
+        self._record(request, response, role, started_at, duration_ms)
+        return response
+
+    @staticmethod
+    def _record(request, response, role, started_at, duration_ms):
+        recorder = traffic.get_recorder(
+            settings.TRAFFIC_CAPTURE_FILE,
+            getattr(settings, "TRAFFIC_CAPTURE_BUFFER_SIZE", 100),
+            getattr(settings, "TRAFFIC_CAPTURE_FLUSH_INTERVAL", 5.0),
+        )
+        recorder.record(
+            {
+                "ts": round(started_at, 6),
+                "method": request.method,
+                "path": request.path,
+                "query": traffic.sanitize_query(request.GET),
+                "role": role,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2),
+            }
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlertEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_state', models.CharField(choices=[('in', 'In stock'), ('low', 'Low stock'), ('out', 'Out of stock')], max_length=3)),
+                ('new_state', models.CharField(choices=[('in', 'In stock'), ('low', 'Low stock'), ('out', 'Out of stock')], max_length=3)),
+                ('quantity', models.IntegerField()),
+                ('minimum_stock', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('digested_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.sparepart')),
+            ],
+        ),
+    ]
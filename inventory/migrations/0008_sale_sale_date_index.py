@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_stockalertevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_sale_sale_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.IntegerField(unique=True)),
+                ('sale_number', models.CharField(db_index=True, max_length=100)),
+                ('part_id', models.IntegerField(db_index=True)),
+                ('quantity_sold', models.IntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('employee_id', models.IntegerField(blank=True, null=True)),
+                ('sale_date', models.DateTimeField(db_index=True)),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSparePart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.IntegerField(unique=True)),
+                ('part_number', models.CharField(db_index=True, max_length=100)),
+                ('part_name', models.CharField(max_length=200)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('minimum_stock', models.IntegerField(default=10)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('supplier_id', models.IntegerField(blank=True, null=True)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SaleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('part_id', models.IntegerField()),
+                ('sale_count', models.IntegerField(default=0)),
+                ('quantity_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='salerollup',
+            constraint=models.UniqueConstraint(fields=('period', 'part_id'), name='salerollup_period_part_uniq'),
+        ),
+    ]
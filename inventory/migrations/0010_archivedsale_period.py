@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-19 03:10
+
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def fill_period(apps, schema_editor):
+    """Set the period of sales archived before the column existed."""
+    ArchivedSale = apps.get_model("inventory", "ArchivedSale")
+    ArchivedSale.objects.update(
+        period=TruncMonth("sale_date", output_field=models.DateField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsale',
+            name='period',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(fill_period, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedsale',
+            name='period',
+            field=models.DateField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_archivedsale_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_id', models.IntegerField()),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Initial stock'), ('receipt', 'Receipt'), ('sale', 'Sale'), ('adjustment', 'Adjustment'), ('edit', 'Edit'), ('removed', 'Removed')], max_length=12)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_id', models.IntegerField()),
+                ('quantity', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('part_id', 'taken_at'), name='stocksnapshot_part_time_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['part_id', 'created_at'], name='movement_part_time_idx'),
+        ),
+    ]
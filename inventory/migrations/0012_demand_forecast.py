@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-19 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sparepart',
+            name='forecast_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='forecast_daily_demand',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='reorder_quantity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='suggested_minimum_stock',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='suggested_reorder_quantity',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
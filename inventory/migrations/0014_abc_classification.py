@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-19 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_purchase_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sparepart',
+            name='abc_class',
+            field=models.CharField(blank=True, choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], db_index=True, max_length=1),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='annual_revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='annual_units',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_abc_classification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['part', 'sale_date'], name='sale_part_date_idx'),
+        ),
+    ]
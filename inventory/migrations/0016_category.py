@@ -0,0 +1,100 @@
+# Generated by Django 4.2.25 on 2026-10-19 04:05
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def create_categories(apps, schema_editor):
+    """Turn the distinct category strings into categories and link the parts.
+
+    Names differing only in case or whitespace become one category, named
+    after their most common spelling.
+    """
+    Category = apps.get_model("inventory", "Category")
+    SparePart = apps.get_model("inventory", "SparePart")
+    spellings = defaultdict(Counter)
+    for raw, count in (
+        SparePart.objects.order_by().values_list("category").annotate(count=Count("pk"))
+    ):
+        name = " ".join((raw or "").split())
+        if name:
+            spellings[name.lower()][raw] += count
+    for variants in spellings.values():
+        canonical = " ".join(variants.most_common(1)[0][0].split())
+        category = Category.objects.create(name=canonical)
+        SparePart.objects.filter(category__in=list(variants)).update(category_ref=category)
+
+    parts = SparePart.objects.filter(category_ref=OuterRef("pk")).order_by().values("category_ref")
+    Category.objects.update(
+        part_count=Coalesce(Subquery(parts.annotate(total=Count("pk")).values("total")), 0),
+        low_stock_count=Coalesce(
+            Subquery(
+                parts.filter(quantity__lte=F("minimum_stock"))
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        ),
+        stock_value=Coalesce(
+            Subquery(parts.annotate(total=Sum(F("quantity") * F("price"))).values("total")),
+            Value(0),
+            output_field=models.DecimalField(max_digits=16, decimal_places=2),
+        ),
+    )
+
+
+def restore_names(apps, schema_editor):
+    """Copy category names back into the text column."""
+    Category = apps.get_model("inventory", "Category")
+    SparePart = apps.get_model("inventory", "SparePart")
+    for category in Category.objects.all():
+        SparePart.objects.filter(category_ref=category).update(category=category.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_sale_part_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('part_count', models.IntegerField(default=0)),
+                ('low_stock_count', models.IntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sparepart',
+            name='category_ref',
+            field=models.ForeignKey(null=True, blank=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.category'),
+        ),
+        migrations.RunPython(create_categories, restore_names),
+        migrations.RemoveField(
+            model_name='sparepart',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='sparepart',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='sparepart',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='parts', to='inventory.category'),
+        ),
+    ]
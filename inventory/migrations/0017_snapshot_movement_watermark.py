@@ -0,0 +1,44 @@
+# Generated by Django 4.2.25 on 2026-10-19 04:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def set_watermarks(apps, schema_editor):
+    """Point existing snapshots at the last movement stamped before them."""
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    StockSnapshot = apps.get_model("inventory", "StockSnapshot")
+    last = (
+        StockMovement.objects.filter(
+            part_id=OuterRef("part_id"),
+            created_at__lte=OuterRef("taken_at"),
+        )
+        .order_by("-pk")
+        .values("pk")[:1]
+    )
+    StockSnapshot.objects.update(movement_id=Coalesce(Subquery(last), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='movement_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['part_id', 'id'], name='movement_part_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['part_id', 'movement_id'], name='snapshot_part_movement_idx'),
+        ),
+        migrations.RunPython(set_watermarks, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 # pylint: disable=invalid-str-returned
 """Database models for the inventory app."""
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 ROLE_CHOICES = [
@@ -8,6 +11,24 @@ ROLE_CHOICES = [
     ("employee", "Employee"),
 ]
 
+STOCK_IN = "in"
+STOCK_LOW = "low"
+STOCK_OUT = "out"
+STOCK_STATE_CHOICES = [
+    (STOCK_IN, "In stock"),
+    (STOCK_LOW, "Low stock"),
+    (STOCK_OUT, "Out of stock"),
+]
+
+ABC_A = "A"
+ABC_B = "B"
+ABC_C = "C"
+ABC_CHOICES = [
+    (ABC_A, "A"),
+    (ABC_B, "B"),
+    (ABC_C, "C"),
+]
+
 
 class UserProfile(models.Model):
     """Extended profile information for a user."""
@@ -36,13 +57,52 @@ class Supplier(models.Model):
         return self.name
 
 
+class Category(models.Model):
+    """A part category with counters maintained by ``inventory.categories``."""
+    name = models.CharField(max_length=100, unique=True)
+    part_count = models.IntegerField(default=0)
+    low_stock_count = models.IntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Metadata for Category."""
+        ordering = ["name"]
+        verbose_name_plural = "categories"
+
+    def __str__(self):
+        """Return category name."""
+        return self.name
+
+
 class SparePart(models.Model):
     """Represents a spare part in inventory."""
     part_number = models.CharField(max_length=100, unique=True)
     part_name = models.CharField(max_length=200)
-    category = models.CharField(max_length=100, blank=True)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="parts",
+    )
     quantity = models.IntegerField(default=0)
     minimum_stock = models.IntegerField(default=10)
+    reorder_quantity = models.IntegerField(default=0)
+    # Written by the forecast.demand job; see inventory.forecast.
+    suggested_minimum_stock = models.IntegerField(null=True, blank=True)
+    suggested_reorder_quantity = models.IntegerField(null=True, blank=True)
+    forecast_daily_demand = models.FloatField(null=True, blank=True)
+    forecast_at = models.DateTimeField(null=True, blank=True)
+    # Written by the abc.classify job; see inventory.classification.
+    abc_class = models.CharField(
+        max_length=1,
+        choices=ABC_CHOICES,
+        blank=True,
+        db_index=True,
+    )
+    annual_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    annual_units = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     supplier = models.ForeignKey(
         Supplier,
@@ -55,11 +115,51 @@ class SparePart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        """Save the part and its ``post_save`` bookkeeping in one transaction.
+
+        The ledger movement must commit together with the quantity it
+        explains, or a stock snapshot could see one without the other.
+        """
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stock as loaded, to detect crossings and movements."""
+        instance = super().from_db(db, field_names, values)
+        if "quantity" in field_names:
+            instance.loaded_quantity = instance.quantity
+        if "quantity" in field_names and "minimum_stock" in field_names:
+            instance.loaded_stock_state = instance.stock_state
+        # What the part last added to its category's counters.
+        if {"category_id", "quantity", "minimum_stock", "price"} <= set(field_names):
+            instance.loaded_category_stats = instance.category_stats
+        return instance
+
     @property
     def is_low_stock(self):
         """Return True if quantity is at or below minimum stock."""
         return self.quantity <= self.minimum_stock
 
+    @property
+    def stock_state(self):
+        """Return STOCK_OUT, STOCK_LOW or STOCK_IN for the current quantity."""
+        if self.quantity <= 0:
+            return STOCK_OUT
+        if self.quantity <= self.minimum_stock:
+            return STOCK_LOW
+        return STOCK_IN
+
+    @property
+    def category_stats(self):
+        """Return ``(category_id, low_stock, stock_value)`` for the counters."""
+        return (
+            self.category_id,
+            int(self.is_low_stock),
+            self.quantity * Decimal(str(self.price)),
+        )
+
     def __str__(self):
         """Return a readable representation of the spare part."""
         return f"{self.part_number} - {self.part_name}"
@@ -72,9 +172,363 @@ class Sale(models.Model):
     quantity_sold = models.IntegerField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     employee = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    sale_date = models.DateTimeField(auto_now_add=True)
+    sale_date = models.DateTimeField(auto_now_add=True, db_index=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        """Metadata for Sale."""
+        indexes = [
+            # Per-part recency probes: dead-stock NOT EXISTS and last sale.
+            models.Index(
+                fields=["part", "sale_date"],
+                name="sale_part_date_idx",
+            ),
+        ]
+
     def __str__(self):
         """Return a readable representation of the sale."""
         return f"Sale {self.sale_number}"
+
+
+class OutboxEmail(models.Model):
+    """An email queued for delivery by the ``send_outbox`` worker."""
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """Metadata for OutboxEmail."""
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="outbox_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return a readable representation of the queued email."""
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class Job(models.Model):
+    """A unit of background work executed by the ``run_worker`` command."""
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    worker_id = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """Metadata for Job."""
+        indexes = [
+            models.Index(
+                fields=["status", "-priority", "run_at"],
+                name="job_claim_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return a readable representation of the job."""
+        return f"Job {self.pk} {self.name} ({self.status})"
+
+
+class StockAlertEvent(models.Model):
+    """A part crossing into a worse stock state, awaiting a digest email."""
+    part = models.ForeignKey(SparePart, on_delete=models.CASCADE)
+    previous_state = models.CharField(max_length=3, choices=STOCK_STATE_CHOICES)
+    new_state = models.CharField(max_length=3, choices=STOCK_STATE_CHOICES)
+    quantity = models.IntegerField()
+    minimum_stock = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    digested_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        """Return a readable representation of the alert event."""
+        return f"{self.part_id}: {self.previous_state} -> {self.new_state}"
+
+
+class ArchivedSparePart(models.Model):
+    """A spare part moved out of the live tables by ``inventory.archive``."""
+    original_id = models.IntegerField(unique=True)
+    part_number = models.CharField(max_length=100, db_index=True)
+    part_name = models.CharField(max_length=200)
+    category = models.CharField(max_length=100, blank=True)
+    quantity = models.IntegerField(default=0)
+    minimum_stock = models.IntegerField(default=10)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    supplier_id = models.IntegerField(null=True, blank=True)
+    location = models.CharField(max_length=100, blank=True)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """Return a readable representation of the archived part."""
+        return f"{self.part_number} - {self.part_name} (archived)"
+
+
+class ArchivedSale(models.Model):
+    """A sale moved out of the live ``Sale`` table by ``inventory.archive``.
+
+    Sales older than ``SALE_ARCHIVE_HORIZON_MONTHS`` are moved here each
+    month, keeping ``Sale`` bounded; ``period`` partitions the rows.
+
+    ``part_id`` and ``employee_id`` are plain integers: the part may itself
+    be archived, and archived rows must survive deletes elsewhere.
+    """
+    original_id = models.IntegerField(unique=True)
+    sale_number = models.CharField(max_length=100, db_index=True)
+    part_id = models.IntegerField(db_index=True)
+    quantity_sold = models.IntegerField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    employee_id = models.IntegerField(null=True, blank=True)
+    sale_date = models.DateTimeField(db_index=True)
+    notes = models.TextField(blank=True)
+    # First day of the sale's month: archived rows are written and purged
+    # a month at a time, and history queries prune by it.
+    period = models.DateField(db_index=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """Return a readable representation of the archived sale."""
+        return f"Sale {self.sale_number} (archived)"
+
+
+class SaleRollup(models.Model):
+    """Monthly per-part totals of sales no longer in the ``Sale`` table.
+
+    Revenue and volume totals add these rows to the live ``Sale``
+    aggregates, so archiving or bulk-deleting sales never changes them.
+    """
+    period = models.DateField()
+    part_id = models.IntegerField()
+    sale_count = models.IntegerField(default=0)
+    quantity_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        """Metadata for SaleRollup."""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "part_id"],
+                name="salerollup_period_part_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        """Return a readable representation of the rollup row."""
+        return f"{self.period:%Y-%m} part {self.part_id}: {self.revenue}"
+
+
+class StockMovement(models.Model):
+    """One change to a part's quantity, appended by ``inventory.ledger``.
+
+    Rows are never updated. ``part_id`` is a plain integer so the history
+    of archived parts survives; deleting a part deletes its ledger.
+    """
+    REASON_INITIAL = "initial"
+    REASON_RECEIPT = "receipt"
+    REASON_SALE = "sale"
+    REASON_ADJUSTMENT = "adjustment"
+    REASON_EDIT = "edit"
+    REASON_REMOVED = "removed"
+    REASON_CHOICES = [
+        (REASON_INITIAL, "Initial stock"),
+        (REASON_RECEIPT, "Receipt"),
+        (REASON_SALE, "Sale"),
+        (REASON_ADJUSTMENT, "Adjustment"),
+        (REASON_EDIT, "Edit"),
+        (REASON_REMOVED, "Removed"),
+    ]
+
+    part_id = models.IntegerField()
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=12, choices=REASON_CHOICES)
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        """Metadata for StockMovement."""
+        indexes = [
+            models.Index(
+                fields=["part_id", "created_at"],
+                name="movement_part_time_idx",
+            ),
+            models.Index(
+                fields=["part_id", "id"],
+                name="movement_part_id_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return a readable representation of the movement."""
+        return f"{self.part_id}: {self.delta:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """A part's quantity at ``taken_at``, compacting the ledger before it.
+
+    Point-in-time stock is the nearest snapshot plus the movements between
+    it and the requested instant, so no query replays the whole ledger.
+    """
+    part_id = models.IntegerField()
+    quantity = models.IntegerField()
+    taken_at = models.DateTimeField()
+    # The part's last StockMovement counted in ``quantity``.
+    movement_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        """Metadata for StockSnapshot."""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["part_id", "taken_at"],
+                name="stocksnapshot_part_time_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["part_id", "movement_id"],
+                name="snapshot_part_movement_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return a readable representation of the snapshot."""
+        return f"{self.part_id} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.quantity}"
+
+
+class PurchaseOrder(models.Model):
+    """An order for low-stock parts from one supplier.
+
+    Orders are generated in bulk by ``inventory.purchasing``, one per
+    supplier; parts without a supplier share an order with none.
+    """
+    STATUS_OPEN = "open"
+    STATUS_PARTIAL = "partial"
+    STATUS_RECEIVED = "received"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (STATUS_OPEN, "Open"),
+        (STATUS_PARTIAL, "Partially received"),
+        (STATUS_RECEIVED, "Received"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+    # Lines on these orders count as stock on order.
+    OPEN_STATUSES = (STATUS_OPEN, STATUS_PARTIAL)
+
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_OPEN,
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """Metadata for PurchaseOrder."""
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"],
+                name="po_status_time_idx",
+            ),
+        ]
+
+    @property
+    def number(self):
+        """Return the order's display number, e.g. ``PO-000042``."""
+        return f"PO-{self.pk:06d}"
+
+    def __str__(self):
+        """Return a readable representation of the purchase order."""
+        return f"{self.number} ({self.status})"
+
+
+class PurchaseOrderLine(models.Model):
+    """One part on a purchase order and how much of it has arrived."""
+    order = models.ForeignKey(
+        PurchaseOrder,
+        on_delete=models.CASCADE,
+        related_name="lines",
+    )
+    part = models.ForeignKey(SparePart, on_delete=models.CASCADE)
+    quantity_ordered = models.IntegerField()
+    quantity_received = models.IntegerField(default=0)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        """Metadata for PurchaseOrderLine."""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "part"],
+                name="po_line_order_part_uniq",
+            ),
+        ]
+
+    @property
+    def outstanding(self):
+        """Return the quantity still to be received."""
+        return self.quantity_ordered - self.quantity_received
+
+    def __str__(self):
+        """Return a readable representation of the order line."""
+        return f"{self.order_id}: {self.quantity_ordered} x part {self.part_id}"
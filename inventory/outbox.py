@@ -0,0 +1,191 @@
+"""Database-backed email outbox.
+
+Views enqueue messages with :func:`enqueue_email` and return immediately;
+the ``outbox.send_pending`` background job (or the ``send_outbox``
+management command) delivers them in batches over a single reused
+connection, retrying failures with exponential backoff. Queuing an email
+schedules the job, and each run schedules the next one for the earliest
+email still pending.
+
+A run first claims its batch with a conditional UPDATE that marks the
+rows as sending under its own ``claimed_by`` token and leases them until
+``locked_until``. Overlapping runs (a second job, a job re-leased after
+its timeout, or ``manage.py send_outbox``) therefore never send the same
+email twice. Rows left sending by a run that died are claimed again
+once their lease expires.
+"""
+# pylint: disable=no-member,broad-except
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Job, OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+SEND_JOB = "outbox.send_pending"
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """Queue an email for background delivery and return the outbox row."""
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+    schedule_delivery(email.next_attempt_at)
+    return email
+
+
+def schedule_delivery(run_at=None, wait_for_running=True):
+    """Make sure a delivery job is queued for the earliest pending email.
+
+    ``run_at`` defaults to the earliest ``next_attempt_at`` of the pending
+    emails; nothing is queued when there are none. A queued job due later
+    than that is brought forward instead of queuing a second one. Nothing
+    is queued while a delivery job is running either, since it schedules
+    the next run when it finishes; that job itself passes
+    ``wait_for_running=False``.
+    """
+    if run_at is None:
+        run_at = (
+            OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING)
+            .order_by("next_attempt_at")
+            .values_list("next_attempt_at", flat=True)
+            .first()
+        )
+        if run_at is None:
+            return None
+    if wait_for_running and Job.objects.filter(
+        name=SEND_JOB, status=Job.STATUS_RUNNING,
+    ).exists():
+        return None
+    queued = Job.objects.filter(name=SEND_JOB, status=Job.STATUS_QUEUED)
+    if queued.exists():
+        queued.filter(run_at__gt=run_at).update(run_at=run_at)
+        return None
+    return enqueue(SEND_JOB, run_at=run_at)
+
+
+def retry_delay(attempts):
+    """Return the backoff delay before retrying after ``attempts`` failures."""
+    base = getattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 60)
+    cap = getattr(settings, "OUTBOX_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def send_pending(batch_size=50, now=None):
+    """Deliver up to ``batch_size`` due emails over one connection.
+
+    Returns a ``(sent, failed)`` tuple. Messages that fail are rescheduled
+    with exponential backoff until ``OUTBOX_MAX_ATTEMPTS`` is reached, after
+    which they are marked as failed and left for inspection in the admin.
+    """
+    now = now or timezone.now()
+    max_attempts = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5)
+    batch = claim_batch(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        # The server is unreachable; count it against every message so a
+        # permanently broken configuration eventually stops retrying.
+        for email in batch:
+            _record_failure(email, exc, now, max_attempts)
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email,
+                email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                _record_failure(email, exc, now, max_attempts)
+                failed += 1
+                continue
+            email.status = OutboxEmail.STATUS_SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ""
+            email.locked_until = None
+            email.save(
+                update_fields=["status", "attempts", "sent_at", "last_error", "locked_until"],
+            )
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
+
+
+def claim_batch(batch_size, now):
+    """Lease up to ``batch_size`` due emails to this run and return them.
+
+    The candidates are marked as sending with one conditional UPDATE that
+    only matches rows still due, so a row another run claimed in between
+    is skipped. Only the rows carrying this run's token are returned.
+    """
+    due = Q(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=OutboxEmail.STATUS_SENDING,
+        locked_until__lt=now,
+    )
+    candidates = list(
+        OutboxEmail.objects.filter(due)
+        .order_by("next_attempt_at", "id")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    lease = timedelta(seconds=getattr(settings, "OUTBOX_LEASE_SECONDS", 600))
+    claimed = OutboxEmail.objects.filter(due, pk__in=candidates).update(
+        status=OutboxEmail.STATUS_SENDING,
+        locked_until=now + lease,
+        claimed_by=token,
+    )
+    if not claimed:
+        return []
+    return list(
+        OutboxEmail.objects.filter(
+            status=OutboxEmail.STATUS_SENDING,
+            claimed_by=token,
+        ).order_by("next_attempt_at", "id")
+    )
+
+
+def _record_failure(email, exc, now, max_attempts):
+    """Reschedule ``email`` after a failed attempt, or give up on it."""
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    email.locked_until = None
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.STATUS_FAILED
+    else:
+        email.status = OutboxEmail.STATUS_PENDING
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    email.save(
+        update_fields=["attempts", "last_error", "status", "next_attempt_at", "locked_until"],
+    )
+    logger.warning(
+        "Outbox email %s failed (attempt %s): %s",
+        email.pk,
+        email.attempts,
+        email.last_error,
+    )
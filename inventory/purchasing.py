@@ -0,0 +1,230 @@
+"""Supplier-grouped purchase orders for low-stock parts.
+
+:func:`generate_orders` turns every low-stock part into a
+:class:`~inventory.models.PurchaseOrderLine` on one new
+:class:`~inventory.models.PurchaseOrder` per supplier. The quantities come
+from one annotated query over the parts and are written with a single
+``INSERT ... SELECT``; parts are never loaded into Python. Each part is
+ordered up to its target stock: ``minimum_stock`` plus one reorder
+quantity (``reorder_quantity``, else the forecast's suggestion, else
+``minimum_stock`` again). Stock already on open orders is subtracted, so
+generating twice does not order twice.
+
+:func:`receive_order` books a delivery in one transaction. The stock goes
+up in a single ``UPDATE`` through :func:`inventory.bulk.update_parts`, so
+the ledger records ``receipt`` movements. A second ``UPDATE`` advances the
+order lines.
+"""
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import bulk
+from .models import PurchaseOrder, PurchaseOrderLine, SparePart, StockMovement
+from .sql import insert_select
+
+# The SELECT lists model fields before annotations (in the order they were
+# annotated), whatever order values_list() names them in.
+LINE_COLUMNS = ["part", "unit_price", "quantity_ordered", "order", "quantity_received"]
+
+
+def on_order():
+    """Return an expression for a part's outstanding quantity on open orders."""
+    outstanding = (
+        PurchaseOrderLine.objects.filter(
+            part=OuterRef("pk"),
+            order__status__in=PurchaseOrder.OPEN_STATUSES,
+        )
+        .order_by()
+        .values("part")
+        .annotate(total=Sum(F("quantity_ordered") - F("quantity_received")))
+        .values("total")
+    )
+    return Coalesce(Subquery(outstanding, output_field=IntegerField()), 0)
+
+
+def target_stock():
+    """Return an expression for the stock level a purchase tops a part up to."""
+    order_quantity = Case(
+        When(reorder_quantity__gt=0, then=F("reorder_quantity")),
+        When(suggested_reorder_quantity__gt=0, then=F("suggested_reorder_quantity")),
+        default=F("minimum_stock"),
+    )
+    return Greatest(F("minimum_stock") + order_quantity, Value(1))
+
+
+def with_order_quantities(parts):
+    """Annotate ``parts`` with ``on_order``, ``target_stock`` and ``order_quantity``."""
+    return parts.annotate(on_order=on_order(), target_stock=target_stock()).annotate(
+        order_quantity=F("target_stock") - F("quantity") - F("on_order"),
+    )
+
+
+def low_stock(parts=None):
+    """Return the parts at or below minimum stock, or out of stock."""
+    parts = SparePart.objects.all() if parts is None else parts
+    return parts.filter(Q(quantity__lte=F("minimum_stock")) | Q(quantity__lte=0))
+
+
+def suggested_lines(parts=None):
+    """Return the low-stock parts that need ordering, with ``order_quantity``."""
+    return with_order_quantities(low_stock(parts)).filter(order_quantity__gt=0)
+
+
+def generate_orders(parts=None, user=None):
+    """Create one open order per supplier for every part that needs ordering.
+
+    ``parts`` limits the candidates (default: all parts). Returns the new
+    orders, which is empty when nothing needs ordering.
+    """
+    with transaction.atomic():
+        candidates = suggested_lines(parts).order_by()
+        supplier_ids = list(candidates.values_list("supplier_id", flat=True).distinct())
+        if not supplier_ids:
+            return []
+        now = timezone.now()
+        orders = PurchaseOrder.objects.bulk_create(
+            PurchaseOrder(supplier_id=supplier_id, created_by=user, created_at=now)
+            for supplier_id in supplier_ids
+        )
+        # Each line joins the new order of its part's supplier.
+        order_value = Subquery(
+            PurchaseOrder.objects.filter(
+                pk__in=[order.pk for order in orders],
+                supplier_id=OuterRef("supplier_id"),
+            ).values("pk")[:1]
+        )
+        unassigned = next((order.pk for order in orders if order.supplier_id is None), None)
+        if unassigned is not None:
+            order_value = Coalesce(order_value, Value(unassigned))
+        insert_select(
+            PurchaseOrderLine,
+            LINE_COLUMNS,
+            candidates.annotate(order_value=order_value, received_value=Value(0)).values_list(
+                "pk",
+                "price",
+                "order_quantity",
+                "order_value",
+                "received_value",
+            ),
+        )
+    return orders
+
+
+def with_totals(orders):
+    """Annotate ``orders`` with their line count, value and outstanding units."""
+    return orders.annotate(
+        line_count=Count("lines"),
+        total_value=Coalesce(
+            Sum(F("lines__quantity_ordered") * F("lines__unit_price")),
+            Value(0),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        outstanding=Coalesce(
+            Sum(F("lines__quantity_ordered") - F("lines__quantity_received")),
+            Value(0),
+        ),
+    )
+
+
+def receive_order(order, received=None):
+    """Book a delivery against ``order`` and add it to stock atomically.
+
+    ``received`` maps part ids to the quantities that arrived; by default
+    everything outstanding arrived. Raises ``ValueError`` for a closed
+    order, an unknown part or more than is outstanding. Returns the
+    number of units received.
+    """
+    with transaction.atomic():
+        order = PurchaseOrder.objects.select_for_update().get(pk=order.pk)
+        if order.status not in PurchaseOrder.OPEN_STATUSES:
+            raise ValueError(f"{order.number} is already {order.get_status_display().lower()}.")
+        lines = order.lines.filter(quantity_received__lt=F("quantity_ordered")).annotate(
+            remaining=F("quantity_ordered") - F("quantity_received"),
+        )
+        if received is None:
+            units = _receive_all(order, lines)
+        else:
+            units = _receive(order, lines, received)
+        if not units:
+            return 0
+
+        if lines.exists():
+            order.status = PurchaseOrder.STATUS_PARTIAL
+        else:
+            order.status = PurchaseOrder.STATUS_RECEIVED
+            order.received_at = timezone.now()
+        order.save(update_fields=["status", "received_at"])
+    return units
+
+
+def _receive_all(order, lines):
+    """Receive every outstanding line with a correlated subquery per part."""
+    units = lines.aggregate(total=Sum("remaining"))["total"] or 0
+    if units:
+        remaining = lines.filter(part=OuterRef("pk")).values("remaining")[:1]
+        bulk.update_parts(
+            SparePart.objects.filter(pk__in=lines.values("part")),
+            reason=StockMovement.REASON_RECEIPT,
+            note=f"Received on {order.number}",
+            quantity=F("quantity") + Subquery(remaining, output_field=IntegerField()),
+        )
+        lines.update(quantity_received=F("quantity_ordered"))
+    return units
+
+
+def _receive(order, lines, received):
+    """Receive the quantities in ``received``, validated against ``lines``."""
+    outstanding = dict(lines.values_list("part_id", "remaining"))
+    received = {int(part_id): int(quantity) for part_id, quantity in received.items() if quantity}
+    for part_id, quantity in received.items():
+        if part_id not in outstanding:
+            raise ValueError(f"Part {part_id} has nothing outstanding on {order.number}.")
+        if not 0 < quantity <= outstanding[part_id]:
+            raise ValueError(f"Part {part_id}: receive between 1 and {outstanding[part_id]}.")
+    if not received:
+        return 0
+
+    bulk.update_parts(
+        SparePart.objects.filter(pk__in=received),
+        reason=StockMovement.REASON_RECEIPT,
+        note=f"Received on {order.number}",
+        quantity=F("quantity") + Case(
+            *(When(pk=part_id, then=Value(quantity)) for part_id, quantity in received.items()),
+            default=Value(0),
+        ),
+    )
+    lines.filter(part_id__in=received).update(
+        quantity_received=F("quantity_received") + Case(
+            *(
+                When(part_id=part_id, then=Value(quantity))
+                for part_id, quantity in received.items()
+            ),
+            default=Value(0),
+        ),
+    )
+    return sum(received.values())
+
+
+def cancel_order(order):
+    """Cancel an open order; anything not yet received is no longer on order."""
+    updated = PurchaseOrder.objects.filter(
+        pk=order.pk,
+        status__in=PurchaseOrder.OPEN_STATUSES,
+    ).update(status=PurchaseOrder.STATUS_CANCELLED)
+    if not updated:
+        raise ValueError(f"{order.number} is no longer open.")
+    return updated
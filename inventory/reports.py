@@ -0,0 +1,111 @@
+"""Dead-stock report: parts holding stock that have stopped selling.
+
+:func:`dead_stock` finds parts with stock on hand and no sale in the last
+``days`` days, ranked by the value tied up in them (``quantity * price``).
+"No sale" is a ``NOT EXISTS`` anti-join. Each part costs one probe of
+the ``(part, sale_date)`` index, so the sales table is never scanned or
+grouped. The same index answers :func:`with_last_sale` with one seek per
+row shown.
+
+Sales archived by :mod:`inventory.archive` are not searched, so ``days``
+should stay within ``SALE_ARCHIVE_HORIZON_MONTHS``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import (
+    Count,
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Sale, SparePart
+
+CENT = Decimal("0.01")
+MAX_DAYS = 3650
+CSV_FIELDS = [
+    "part_number",
+    "part_name",
+    "category",
+    "supplier",
+    "quantity",
+    "price",
+    "tied_up_value",
+    "last_sale",
+]
+
+
+def parse_days(value):
+    """Return the report window from a query string value.
+
+    An empty value means ``DEAD_STOCK_DAYS``. Raises ``ValueError`` unless
+    it is a whole number from 1 to :data:`MAX_DAYS`.
+    """
+    if value in (None, ""):
+        return getattr(settings, "DEAD_STOCK_DAYS", 180)
+    days = int(value)
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}.")
+    return days
+
+
+def dead_stock(days, now=None):
+    """Return parts with stock and no sales in ``days`` days, most value first."""
+    since = (now or timezone.now()) - timedelta(days=days)
+    recent = Sale.objects.filter(part=OuterRef("pk"), sale_date__gte=since)
+    return (
+        SparePart.objects.filter(quantity__gt=0)
+        .filter(~Exists(recent))
+        .annotate(
+            tied_up_value=ExpressionWrapper(
+                F("quantity") * F("price"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by("-tied_up_value", "part_number")
+    )
+
+
+def with_last_sale(parts):
+    """Annotate ``parts`` with the date of their latest live sale, if any."""
+    latest = Sale.objects.filter(part=OuterRef("pk")).order_by("-sale_date")
+    return parts.annotate(last_sale=Subquery(latest.values("sale_date")[:1]))
+
+
+def summary(parts):
+    """Return the number of dead parts and their total tied-up value."""
+    totals = parts.order_by().aggregate(
+        parts=Count("pk"),
+        value=Coalesce(
+            Sum("tied_up_value"),
+            Value(0),
+            output_field=DecimalField(max_digits=16, decimal_places=2),
+        ),
+    )
+    # SQLite sums decimals as floats; round back to cents.
+    totals["value"] = Decimal(totals["value"]).quantize(CENT)
+    return totals
+
+
+def as_row(part):
+    """Serialize a report row for the CSV export and JSON API."""
+    return {
+        "id": part.pk,
+        "part_number": part.part_number,
+        "part_name": part.part_name,
+        "category": part.category.name if part.category else "",
+        "supplier": part.supplier.name if part.supplier else None,
+        "quantity": part.quantity,
+        "price": str(part.price),
+        "tied_up_value": str(Decimal(part.tied_up_value).quantize(CENT)),
+        "last_sale": part.last_sale.isoformat() if part.last_sale else None,
+    }
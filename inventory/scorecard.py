@@ -0,0 +1,112 @@
+"""Per-supplier scorecard shown on the suppliers page.
+
+:func:`compute` returns each supplier's part count, low-stock count,
+stock value and sales revenue over the last ``SUPPLIER_SCORECARD_DAYS``
+days, all from one grouped query. The revenue is a correlated subquery
+that reaches the sales through the supplier's parts and the
+``(part, sale_date)`` index, so it never scans the whole sales table.
+
+The query reads the whole catalog, so :func:`scorecard` caches its result.
+Writes to parts or sales call :func:`invalidate`. Single saves do so
+through the ``post_save`` signals, and set-based writes (bulk updates,
+archiving, data generation) call it directly. Invalidation replaces the
+version in the cache key once the transaction commits, so a scorecard
+computed from uncommitted or old data is never read again.
+``SUPPLIER_SCORECARD_TTL`` bounds how long a missed invalidation can
+linger.
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.utils import timezone
+
+from .metrics import record_cache_lookup
+from .models import Sale, Supplier
+
+CACHE_NAME = "supplier_scorecard"
+VERSION_KEY = f"{CACHE_NAME}:version"
+CENT = Decimal("0.01")
+EMPTY = {
+    "part_count": 0,
+    "low_stock_count": 0,
+    "stock_value": Decimal("0.00"),
+    "revenue": Decimal("0.00"),
+}
+
+
+def compute(now=None, days=None):
+    """Return ``{supplier_id: totals}`` for every supplier in one query."""
+    days = days or getattr(settings, "SUPPLIER_SCORECARD_DAYS", 90)
+    since = (now or timezone.now()) - timedelta(days=days)
+    revenue = (
+        Sale.objects.filter(part__supplier=OuterRef("pk"), sale_date__gte=since)
+        .order_by()
+        .values("part__supplier")
+        .annotate(total=Sum("total_price"))
+        .values("total")
+    )
+    money = DecimalField(max_digits=16, decimal_places=2)
+    rows = (
+        Supplier.objects.order_by()
+        .annotate(
+            part_count=Count("sparepart"),
+            low_stock_count=Count(
+                "sparepart",
+                filter=Q(sparepart__quantity__lte=F("sparepart__minimum_stock")),
+            ),
+            stock_value=Sum(
+                F("sparepart__quantity") * F("sparepart__price"),
+                output_field=money,
+            ),
+            revenue=Subquery(revenue, output_field=money),
+        )
+        .values_list("pk", "part_count", "low_stock_count", "stock_value", "revenue")
+    )
+    return {
+        pk: {
+            "part_count": part_count,
+            "low_stock_count": low_stock_count,
+            # SQLite sums decimals as floats; round back to cents.
+            "stock_value": Decimal(stock_value or 0).quantize(CENT),
+            "revenue": Decimal(revenue or 0).quantize(CENT),
+        }
+        for pk, part_count, low_stock_count, stock_value, revenue in rows
+    }
+
+
+def scorecard():
+    """Return the cached :func:`compute` result, computing it on a miss."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = _new_version()
+    key = f"{CACHE_NAME}:{version}"
+    cards = cache.get(key)
+    record_cache_lookup(CACHE_NAME, cards is not None)
+    if cards is None:
+        cards = compute()
+        cache.set(key, cards, getattr(settings, "SUPPLIER_SCORECARD_TTL", 3600))
+    return cards
+
+
+def invalidate():
+    """Drop the cached scorecard once the current transaction commits."""
+    transaction.on_commit(_new_version)
+
+
+def _new_version():
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    return version
@@ -0,0 +1,41 @@
+"""Model signal handlers for the inventory app."""
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from . import categories, ledger, scorecard
+from .alerts import record_crossing
+from .models import Sale, SparePart
+
+
+@receiver(post_save, sender=SparePart)
+def detect_stock_crossing(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Raise a low-stock alert when a saved part crosses a threshold."""
+    if not created:
+        record_crossing(instance, getattr(instance, "loaded_stock_state", None))
+    instance.loaded_stock_state = instance.stock_state
+
+
+@receiver(post_save, sender=SparePart)
+def record_stock_movement(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Append a ledger movement when a save changes the quantity."""
+    ledger.record_save(instance, created)
+    instance.loaded_quantity = instance.quantity
+
+
+@receiver(pre_save, sender=SparePart)
+def remember_previous_category(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Read the stored category of a part saved without a loaded state."""
+    categories.record_previous(instance)
+
+
+@receiver(post_save, sender=SparePart)
+def update_category_counters(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Move the saved part's stock into its category's counters."""
+    categories.record_save(instance, created)
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=SparePart)
+def invalidate_scorecard(sender, **kwargs):  # pylint: disable=unused-argument
+    """Drop the cached supplier scorecard after a part or sale is saved."""
+    scorecard.invalidate()
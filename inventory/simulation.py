@@ -0,0 +1,268 @@
+"""Monte Carlo simulation of reorder policies before they are changed.
+
+For every part, :func:`run_simulation` resamples the part's daily demand
+from the last ``FORECAST_HISTORY_DAYS`` days of sales. It then plays out
+``SIMULATION_RUNS`` futures of ``SIMULATION_HORIZON_DAYS`` days under a
+continuous-review policy: when stock on hand plus stock on order falls to
+the candidate ``minimum_stock``, the part's reorder quantity is ordered and
+arrives ``FORECAST_LEAD_TIME_DAYS`` later. Unmet demand is lost.
+
+:func:`simulate_part` is vectorized per part. It steps through the
+horizon once, with all candidates and runs held as one NumPy array, and
+every candidate sees the same demand draws. Parts are spread over CPU
+cores in chunks with a :class:`~concurrent.futures.ProcessPoolExecutor`.
+The workers only get arrays, never database access. Daemonic processes,
+such as ``run_worker --mode processes`` workers, cannot start a pool, so
+there the chunks run serially.
+
+The report gives each part's service level (share of demand met),
+stock-out rate and holding cost for each candidate, and the smallest
+candidate that reaches ``FORECAST_SERVICE_LEVEL``. Per category, it gives
+the demand-weighted service level and the holding cost under the current
+and the recommended minimums.
+"""
+import math
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .forecast import load_history, window_end
+from .models import SparePart
+
+SIMULATION_JOB = "simulation.safety_stock"
+CANDIDATE_FACTORS = (0, 0.5, 1.5, 2)
+CHUNK_SIZE = 50
+# Parts kept in a stored report, lowest current service level first.
+STORED_PART_LIMIT = 100
+
+
+def simulate_part(history, reorder_points, order_quantity, lead_time, horizon, runs, seed):
+    """Simulate one part under each candidate reorder point.
+
+    ``history`` holds the part's observed daily demand and
+    ``reorder_points`` the candidates. Each run starts with a full cycle
+    of stock (reorder point plus order quantity). Returns
+    ``(service_level, stockout_rate, mean_on_hand)``, one value per
+    candidate.
+    """
+    rng = np.random.default_rng(seed)
+    candidates = np.asarray(reorder_points, dtype=np.float64)[:, None]
+    demand = (
+        rng.choice(history, size=(runs, horizon))
+        if history.size
+        else np.zeros((runs, horizon))
+    )
+    shape = (len(candidates), runs)
+    on_hand = np.broadcast_to(candidates + order_quantity, shape).copy()
+    on_order = np.zeros(shape)
+    # Orders placed on day d arrive on day d + delay; the ring buffer holds them.
+    delay = max(lead_time, 1)
+    pipeline = np.zeros((delay + 1, *shape))
+    served = np.zeros(shape)
+    stockout_days = np.zeros(shape)
+    held = np.zeros(shape)
+    for day in range(horizon):
+        arriving = pipeline[day % (delay + 1)]
+        on_hand += arriving
+        on_order -= arriving
+        arriving[...] = 0
+        wanted = demand[:, day]
+        sold = np.minimum(on_hand, wanted)
+        served += sold
+        stockout_days += sold < wanted
+        on_hand -= sold
+        held += on_hand
+        orders = (on_hand + on_order <= candidates) * order_quantity
+        pipeline[(day + delay) % (delay + 1)] += orders
+        on_order += orders
+
+    total_demand = demand.sum()
+    service_level = (
+        served.sum(axis=1) / total_demand if total_demand else np.ones(len(candidates))
+    )
+    return (
+        service_level,
+        stockout_days.mean(axis=1) / horizon,
+        held.mean(axis=1) / horizon,
+    )
+
+
+def _simulate_chunk(tasks):
+    """Worker entry point: simulate a list of ``(part_id, args)`` tasks."""
+    return [(part_id, simulate_part(*args)) for part_id, args in tasks]
+
+
+def candidate_points(current, suggested, candidates=None):
+    """Return the sorted candidate minimum stocks for one part."""
+    if candidates:
+        return sorted(set(candidates) | {current})
+    base = max(current, suggested or 0, 1)
+    points = {current, *(round(base * factor) for factor in CANDIDATE_FACTORS)}
+    if suggested is not None:
+        points.add(suggested)
+    return sorted(point for point in points if point >= 0)
+
+
+def _run_tasks(tasks, workers):
+    chunks = [tasks[start:start + CHUNK_SIZE] for start in range(0, len(tasks), CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 1 or multiprocessing.current_process().daemon:
+        return [result for chunk in chunks for result in _simulate_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for chunk in pool.map(_simulate_chunk, chunks) for result in chunk]
+
+
+def run_simulation(  # pylint: disable=too-many-arguments,too-many-locals
+    parts=None,
+    candidates=None,
+    runs=None,
+    horizon=None,
+    workers=None,
+    seed=0,
+    now=None,
+):
+    """Simulate ``parts`` (default: all) and return the report as a dict.
+
+    ``candidates`` overrides the per-part candidate minimum stocks, which
+    default to the current and suggested values plus multiples of them.
+    """
+    parts = SparePart.objects.all() if parts is None else parts
+    runs = runs or getattr(settings, "SIMULATION_RUNS", 200)
+    horizon = horizon or getattr(settings, "SIMULATION_HORIZON_DAYS", 90)
+    workers = workers or getattr(settings, "SIMULATION_WORKERS", None) or os.cpu_count()
+    days = getattr(settings, "FORECAST_HISTORY_DAYS", 180)
+    lead_time = getattr(settings, "FORECAST_LEAD_TIME_DAYS", 7)
+    review_days = getattr(settings, "FORECAST_REVIEW_DAYS", 30)
+    target = getattr(settings, "FORECAST_SERVICE_LEVEL", 0.95)
+    holding_rate = getattr(settings, "SIMULATION_HOLDING_RATE", 0.25)
+
+    part_ids, positions, days_ago, quantities, observed_days = load_history(
+        window_end(now or timezone.now()), days, parts,
+    )
+    # Split the sparse sales rows into one dense daily history per part.
+    order = np.argsort(positions, kind="stable")
+    bounds = np.searchsorted(positions[order], np.arange(len(part_ids) + 1))
+
+    # minimum_stock may be negative; such a part reorders as if it were 0,
+    # which is also the lowest candidate point.
+    info = {
+        pk: row
+        for pk, *row in parts.values_list(
+            "pk",
+            "part_number",
+            "category__name",
+            Greatest("minimum_stock", Value(0)),
+            "suggested_minimum_stock",
+            "reorder_quantity",
+            "suggested_reorder_quantity",
+            "price",
+        )
+    }
+    tasks = []
+    for index, part_id in enumerate(part_ids.tolist()):
+        _, _, current, suggested, reorder, suggested_reorder, _ = info[part_id]
+        rows = order[bounds[index]:bounds[index + 1]]
+        history = np.zeros(int(observed_days[index]))
+        history[days_ago[rows]] = quantities[rows]
+        quantity = reorder or suggested_reorder or max(math.ceil(history.mean() * review_days), 1)
+        tasks.append((
+            part_id,
+            (
+                history,
+                candidate_points(current, suggested, candidates),
+                quantity,
+                lead_time,
+                horizon,
+                runs,
+                seed + part_id,
+            ),
+        ))
+
+    results = _run_tasks(tasks, workers)
+    return _build_report(tasks, results, info, target, holding_rate, runs, horizon)
+
+
+def _build_report(tasks, results, info, target, holding_rate, runs, horizon):  # pylint: disable=too-many-arguments,too-many-locals
+    """Assemble the per-part and per-category report from the results."""
+    report_parts = []
+    categories = defaultdict(lambda: defaultdict(float))
+    for (part_id, args), (_, (service, stockouts, on_hand)) in zip(tasks, results):
+        number, category, current, _, _, _, price = info[part_id]
+        unit_cost = float(price) * holding_rate
+        rows = [
+            {
+                "minimum_stock": point,
+                "service_level": round(float(level), 4),
+                "stockout_rate": round(float(rate), 4),
+                "holding_cost": round(float(stock) * unit_cost, 2),
+            }
+            for point, level, rate, stock in zip(args[1], service, stockouts, on_hand)
+        ]
+        meeting = [row for row in rows if row["service_level"] >= target]
+        recommended = meeting[0] if meeting else rows[-1]
+        current_row = next(row for row in rows if row["minimum_stock"] == current)
+        demand = float(args[0].mean()) if args[0].size else 0.0
+        report_parts.append({
+            "part_id": part_id,
+            "part_number": number,
+            "category": category or "",
+            "daily_demand": round(demand, 4),
+            "current": current_row,
+            "recommended": recommended,
+            "candidates": rows,
+        })
+
+        totals = categories[category or "Uncategorized"]
+        totals["parts"] += 1
+        totals["demand"] += demand
+        for key, row in (("current", current_row), ("recommended", recommended)):
+            totals[f"{key}_served"] += demand * row["service_level"]
+            totals[f"{key}_holding_cost"] += row["holding_cost"]
+
+    report_parts.sort(key=lambda part: (part["current"]["service_level"], part["part_number"]))
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "runs": runs,
+        "horizon_days": horizon,
+        "target_service_level": target,
+        "parts": report_parts,
+        "categories": [
+            {
+                "category": name,
+                "parts": int(totals["parts"]),
+                "current_service_level": _weighted(totals, "current"),
+                "recommended_service_level": _weighted(totals, "recommended"),
+                "current_holding_cost": round(totals["current_holding_cost"], 2),
+                "recommended_holding_cost": round(totals["recommended_holding_cost"], 2),
+            }
+            for name, totals in sorted(categories.items())
+        ],
+    }
+
+
+def _weighted(totals, key):
+    """Return the demand-weighted service level of a category."""
+    if not totals["demand"]:
+        return 1.0
+    return round(totals[f"{key}_served"] / totals["demand"], 4)
+
+
+def select_parts(category="", supplier_id=None):
+    """Return the parts to simulate, optionally by category and supplier."""
+    parts = SparePart.objects.all()
+    if category:
+        parts = parts.filter(category__name=category)
+    if supplier_id:
+        parts = parts.filter(supplier_id=supplier_id)
+    return parts
+
+
+def trim(report, limit=STORED_PART_LIMIT):
+    """Return ``report`` with only its ``limit`` worst-served parts."""
+    return {**report, "part_count": len(report["parts"]), "parts": report["parts"][:limit]}
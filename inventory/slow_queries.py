@@ -0,0 +1,102 @@
+"""Slow-query logging with one-off EXPLAIN capture.
+
+:func:`install` adds :func:`log_slow_queries` as an execute wrapper on every
+new database connection. Queries slower than ``SLOW_QUERY_THRESHOLD_MS``
+are logged as JSON lines on the ``inventory.slow_queries`` logger with
+their SQL, parameters, calling view and the project frames of the Python
+stack. The first slow occurrence of each query shape in a process also
+records its ``EXPLAIN QUERY PLAN``. ``manage.py slow_query_report`` ranks
+the logged shapes by total time.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+import traceback
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from .middleware import current_view_name
+
+logger = logging.getLogger("inventory.slow_queries")
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_explained_shapes = set()
+
+
+def query_shape(sql):
+    """Return ``(normalized_sql, shape_id)`` for grouping equivalent queries."""
+    normalized = _IN_LIST.sub("(%s, ...)", sql)
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def _project_stack():
+    """Return ``file:line in function`` entries for frames in this project."""
+    base_dir = str(settings.BASE_DIR)
+    return [
+        f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(("slow_queries.py", "middleware.py"))
+    ]
+
+
+def _explain(db_connection, sql, params):
+    """Return the query plan rows for ``sql``, bypassing execute wrappers."""
+    prefix = "EXPLAIN QUERY PLAN " if db_connection.vendor == "sqlite" else "EXPLAIN "
+    cursor = db_connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        cursor.close()
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper that logs queries slower than the configured threshold."""
+    threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+    if threshold is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= threshold:
+            normalized, shape_id = query_shape(sql)
+            record = {
+                "shape": shape_id,
+                "duration_ms": round(duration_ms, 3),
+                "sql": normalized,
+                "params": [repr(param)[:200] for param in (params or ())][:50]
+                if not many else "<executemany>",
+                "view": current_view_name(),
+                "stack": _project_stack(),
+            }
+            if (
+                shape_id not in _explained_shapes
+                and not many
+                and sql.lstrip().upper().startswith("SELECT")
+            ):
+                _explained_shapes.add(shape_id)
+                record["plan"] = _explain(context["connection"], sql, params)
+            logger.warning(json.dumps(record))
+
+
+def _add_wrapper(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Attach the slow-query wrapper to a newly opened connection."""
+    # Inserted at the front: execute_wrapper() context managers that are
+    # active while the connection opens pop the *last* wrapper on exit.
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
+
+
+def install():
+    """Log slow queries on every database connection opened from now on."""
+    connection_created.connect(_add_wrapper, dispatch_uid="inventory.slow_queries")
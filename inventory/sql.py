@@ -0,0 +1,74 @@
+"""Small SQL helpers for set-based writes the ORM cannot express.
+
+:func:`analyze` refreshes planner statistics; the ``db.analyze`` job runs
+it nightly for the tables whose admin changelists show estimated counts.
+"""
+# pylint: disable=protected-access
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Job
+
+ANALYZE_JOB = "db.analyze"
+
+
+def insert_select(model, columns, queryset):
+    """Run ``INSERT INTO model (columns) <queryset's SELECT>``.
+
+    ``queryset`` must select values in the order of ``columns``, typically
+    with ``values_list``. Returns the number of rows inserted.
+    """
+    sql, params = queryset.query.sql_with_params()
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ", ".join(
+        connection.ops.quote_name(model._meta.get_field(column).column)
+        for column in columns
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table} ({names}) {sql}", params)
+        return cursor.rowcount
+
+
+def update_rows(model, fields, rows, batch_size=5000):
+    """Set ``fields`` per primary key with batched ``executemany`` UPDATEs.
+
+    Each row holds the values of ``fields`` followed by the primary key.
+    Each batch commits in its own transaction. Returns the number of rows.
+    """
+    meta = model._meta
+    quote = connection.ops.quote_name
+    assignments = ", ".join(f"{quote(meta.get_field(name).column)} = %s" for name in fields)
+    sql = f"UPDATE {quote(meta.db_table)} SET {assignments} WHERE {quote(meta.pk.column)} = %s"
+    for start in range(0, len(rows), batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
+
+
+def analyze(*models):
+    """Refresh the planner statistics of the tables of ``models``.
+
+    On SQLite this rewrites their ``sqlite_stat1`` rows, whose row counts
+    :func:`inventory.admin.estimated_row_count` returns as its estimate.
+    """
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+
+def schedule_analyze(now=None):
+    """Queue the next ``ANALYZE_RUN_HOUR`` statistics refresh unless one is waiting."""
+    if Job.objects.filter(name=ANALYZE_JOB, status=Job.STATUS_QUEUED).exists():
+        return None
+    now = now or timezone.now()
+    hour = getattr(settings, "ANALYZE_RUN_HOUR", 3)
+    day = timezone.localdate(now)
+    run = timezone.make_aware(datetime(day.year, day.month, day.day, hour))
+    if run <= now:
+        day += timedelta(days=1)
+        run = timezone.make_aware(datetime(day.year, day.month, day.day, hour))
+    return enqueue(ANALYZE_JOB, run_at=run)
@@ -0,0 +1,64 @@
+// Stock-level history chart backed by /api/parts/<id>/history/.
+// The API downsamples server-side, so a chart never receives more than
+// `points` values however long the history is.
+(function () {
+    const charts = new WeakMap();
+
+    function rangeStart(days) {
+        if (!days) return '';
+        const start = new Date(Date.now() - days * 24 * 60 * 60 * 1000);
+        return start.toISOString().slice(0, 10);
+    }
+
+    window.loadStockHistory = function (canvas, url, options) {
+        options = options || {};
+        const points = options.points || Math.max(Math.floor(canvas.clientWidth || 500), 50);
+        const params = new URLSearchParams({ points: points });
+        const from = rangeStart(options.days);
+        if (from) params.set('from', from);
+
+        return fetch(`${url}?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.error);
+                const series = data.timestamps.map((t, i) => ({ x: t, y: data.quantities[i] }));
+                let chart = charts.get(canvas);
+                if (chart) {
+                    chart.data.datasets[0].data = series;
+                    chart.update('none');
+                    return data;
+                }
+                chart = new Chart(canvas.getContext('2d'), {
+                    type: 'line',
+                    data: {
+                        datasets: [{
+                            label: 'Quantity',
+                            data: series,
+                            stepped: true,
+                            borderColor: '#2196f3',
+                            backgroundColor: 'rgba(33, 150, 243, 0.1)',
+                            fill: true,
+                            pointRadius: 0
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: true,
+                        animation: false,
+                        parsing: false,
+                        plugins: { legend: { display: false } },
+                        scales: {
+                            x: {
+                                type: 'linear',
+                                ticks: { callback: value => new Date(value).toLocaleDateString() }
+                            },
+                            y: { beginAtZero: true }
+                        }
+                    }
+                });
+                charts.set(canvas, chart);
+                return data;
+            })
+            .catch(error => console.error('Error fetching stock history:', error));
+    };
+})();
@@ -0,0 +1,91 @@
+"""Background job handlers for the inventory app.
+
+Handlers are registered with :func:`inventory.jobs.job` when this module is
+imported from ``InventoryConfig.ready``. :func:`schedule_recurring` queues
+the self-rescheduling jobs; ``run_worker`` calls it on startup.
+"""
+from . import alerts, archive, classification, forecast, ledger, outbox, simulation, sql
+from .jobs import job
+from .models import Sale, SparePart, UserProfile
+
+
+def schedule_recurring():
+    """Queue each recurring job unless it is already waiting to run.
+
+    Returns the names of the jobs that were queued.
+    """
+    scheduled = [
+        (archive.ARCHIVE_JOB, archive.schedule_archival()),
+        (ledger.SNAPSHOT_JOB, ledger.schedule_snapshots()),
+        (forecast.FORECAST_JOB, forecast.schedule_forecast()),
+        (classification.ABC_JOB, classification.schedule_classification()),
+        (outbox.SEND_JOB, outbox.schedule_delivery()),
+        (sql.ANALYZE_JOB, sql.schedule_analyze()),
+    ]
+    return [name for name, queued in scheduled if queued is not None]
+
+
+@job(outbox.SEND_JOB, timeout=120)
+def send_outbox_batch(batch_size=50):
+    """Deliver one batch of pending outbox emails, then schedule the next."""
+    sent, failed = outbox.send_pending(batch_size=batch_size)
+    outbox.schedule_delivery(wait_for_running=False)
+    return {"sent": sent, "failed": failed}
+
+
+@job(alerts.DIGEST_JOB, timeout=300)
+def send_stock_alert_digests():
+    """Queue low-stock digest emails for all pending crossing events."""
+    return {"digests": alerts.send_digests()}
+
+
+@job(archive.ARCHIVE_JOB, timeout=3600)
+def archive_old_sales():
+    """Archive sales past the horizon, then schedule next month's run."""
+    moved = archive.archive_old_sales()
+    archive.schedule_archival()
+    return {"archived": moved}
+
+
+@job(sql.ANALYZE_JOB, timeout=1800)
+def refresh_statistics():
+    """Refresh the statistics behind the admin's row estimates, then schedule tomorrow's run."""
+    sql.analyze(SparePart, Sale, UserProfile)
+    sql.schedule_analyze()
+    return {"tables": 3}
+
+
+@job(ledger.SNAPSHOT_JOB, timeout=600)
+def take_stock_snapshots():
+    """Snapshot parts that moved, then schedule the next run."""
+    written = ledger.take_snapshots()
+    ledger.schedule_snapshots()
+    return {"snapshots": written}
+
+
+@job(forecast.FORECAST_JOB, timeout=1800)
+def forecast_demand():
+    """Refresh suggested reorder points, then schedule the next run."""
+    parts = forecast.forecast_demand()
+    forecast.schedule_forecast()
+    return {"parts": parts}
+
+
+@job(classification.ABC_JOB, timeout=1800)
+def classify_parts():
+    """Recompute ABC classes from the last year of sales, then schedule tomorrow's run."""
+    counts = classification.classify_parts()
+    classification.schedule_classification()
+    return counts
+
+
+@job(simulation.SIMULATION_JOB, timeout=3600)
+def simulate_safety_stock(category="", supplier_id=None, candidates=None, runs=None, horizon=None):
+    """Simulate reorder policies for the selected parts; store the report."""
+    report = simulation.run_simulation(
+        simulation.select_parts(category, supplier_id),
+        candidates=candidates,
+        runs=runs,
+        horizon=horizon,
+    )
+    return simulation.trim(report)
@@ -0,0 +1,368 @@
+"""Query-count budgets for every inventory view and admin changelist.
+
+Each budget is checked against a 10-row and a 1,000-row dataset. The
+counts must be identical at both sizes, so a view that starts querying
+once per row (an N+1) fails here before it reaches production. When a
+change legitimately alters a count, update the table below.
+"""
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import (
+    Category,
+    PurchaseOrder,
+    PurchaseOrderLine,
+    Sale,
+    SparePart,
+    Supplier,
+    UserProfile,
+)
+from inventory.sql import analyze
+
+# (role, url name, argument, method, expected queries). The argument names
+# which fixture object supplies the URL's single positional argument.
+VIEW_BUDGETS = [
+    ("admin", "home", None, "get", 2),
+    ("admin", "dashboard", None, "get", 2),
+    ("admin", "admin_dashboard", None, "get", 11),
+    ("admin", "spare_parts_list", None, "get", 6),
+    ("admin", "bulk_update_parts", None, "get", 5),
+    ("admin", "safety_stock_simulation", None, "get", 4),
+    ("admin", "add_part", None, "post", 5),
+    ("admin", "edit_part", "part", "post", 7),
+    ("admin", "delete_part", "deleted_by_admin", "post", 21),
+    ("admin", "employees_list", None, "get", 4),
+    ("admin", "add_employee", None, "get", 2),
+    ("admin", "edit_employee", "employee_user", "get", 4),
+    ("admin", "sales_list", None, "get", 4),
+    ("admin", "add_supplier", None, "get", 2),
+    ("admin", "edit_supplier", "supplier", "get", 3),
+    ("admin", "delete_supplier", "supplier", "get", 3),
+    ("admin", "purchase_list", None, "get", 4),
+    ("admin", "purchase_list", None, "post", 3),
+    ("admin", "purchase_order_detail", "purchase_order", "get", 4),
+    ("admin", "dead_stock_report", None, "get", 4),
+    ("admin", "get_stock_status_data", None, "get", 5),
+    ("admin", "get_top_parts_data", None, "get", 3),
+    ("admin", "get_parts_data", None, "get", 4),
+    ("admin", "get_part_data", "part", "get", 3),
+    ("admin", "get_part_history", "part", "get", 8),
+    ("admin", "get_dead_stock_data", None, "get", 4),
+    ("employee", "dashboard", None, "get", 2),
+    ("employee", "employee_dashboard", None, "get", 9),
+    ("employee", "employee_parts_list", None, "get", 9),
+    ("employee", "employee_add_part", None, "get", 3),
+    ("employee", "employee_add_part", None, "post", 5),
+    ("employee", "employee_edit_part", "part", "get", 4),
+    ("employee", "employee_edit_part", "part", "post", 5),
+    ("employee", "employee_delete_part", "deleted_by_employee", "get", 3),
+    ("employee", "employee_delete_part", "deleted_by_employee", "post", 21),
+    ("employee", "admin_dashboard", None, "get", 2),
+    ("employee", "employees_list", None, "get", 2),
+    ("employee", "sales_list", None, "get", 2),
+    ("employee", "purchase_list", None, "get", 2),
+    ("employee", "get_stock_status_data", None, "get", 5),
+]
+
+CHANGELIST_BUDGETS = [
+    ("sparepart", 6),
+    ("sale", 8),
+    ("userprofile", 5),
+    ("outboxemail", 5),
+    ("job", 6),
+]
+
+# Above ESTIMATED_COUNT_THRESHOLD rows the unfiltered lists drop their
+# exact COUNT(*), so they run one query fewer than on small tables.
+SCALE_CHANGELIST_BUDGETS = [
+    ("sparepart", 5),
+    ("sale", 7),
+    ("userprofile", 4),
+    ("outboxemail", 5),
+    ("job", 6),
+]
+
+# (changelist, query string, expected queries) for filtered admin lists.
+FILTERED_CHANGELIST_BUDGETS = [
+    ("sparepart", "supplier={supplier}", 6),
+    ("sparepart", "stock=low", 5),
+    ("sale", "part={part}", 8),
+    ("sale", "sale_date__year={year}", 6),
+    ("userprofile", "role=employee", 4),
+]
+
+
+def part_form_data(part_number):
+    """Return valid POST data for the part forms."""
+    return {
+        "part_number": part_number,
+        "part_name": "Budget Part",
+        "category": "",
+        "quantity": 3,
+        "price": 10,
+        "minimum_stock": 1,
+    }
+
+
+def populate(rows):
+    """Create ``rows`` suppliers, parts, employees and sales plus two users.
+
+    One purchase order covers every part but the first three. Returns a
+    dict with the ``admin`` and ``employee`` users and the rows used as URL
+    arguments.
+    """
+    suppliers = Supplier.objects.bulk_create(
+        Supplier(name=f"Supplier {i}") for i in range(rows)
+    )
+    categories = Category.objects.bulk_create(
+        Category(name=f"Category {i}") for i in range(7)
+    )
+    parts = SparePart.objects.bulk_create(
+        SparePart(
+            part_number=f"QC-{i:06d}",
+            part_name=f"Part {i}",
+            category=categories[i % 7],
+            quantity=i % 15,
+            minimum_stock=5,
+            price=Decimal("9.99"),
+            supplier=suppliers[i],
+        )
+        for i in range(rows)
+    )
+    users = User.objects.bulk_create(
+        User(username=f"qc_emp_{i}", email=f"qc{i}@example.com")
+        for i in range(rows)
+    )
+    UserProfile.objects.bulk_create(
+        UserProfile(user=user, role="employee", mobile_number="0123")
+        for user in users
+    )
+    Sale.objects.bulk_create(
+        Sale(
+            sale_number=f"QS-{i:06d}",
+            part=parts[i],
+            quantity_sold=1 + i % 3,
+            total_price=Decimal("9.99"),
+            employee=users[i],
+        )
+        for i in range(rows)
+    )
+
+    purchase_order = PurchaseOrder.objects.create(supplier=suppliers[0])
+    PurchaseOrderLine.objects.bulk_create(
+        PurchaseOrderLine(
+            order=purchase_order,
+            part=part,
+            quantity_ordered=10,
+            unit_price=part.price,
+        )
+        for part in parts[3:]
+    )
+
+    admin = User.objects.create_superuser("qc_admin", "qc_admin@example.com", "x")
+    UserProfile.objects.create(user=admin, role="admin")
+    employee = User.objects.create_user("qc_employee", password="x")
+    UserProfile.objects.create(user=employee, role="employee")
+    return {
+        "admin": admin,
+        "employee": employee,
+        "part": parts[0],
+        "deleted_by_admin": parts[1],
+        "deleted_by_employee": parts[2],
+        "supplier": suppliers[0],
+        "purchase_order": purchase_order,
+        "employee_user": users[0],
+    }
+
+
+class QueryBudgetMixin:
+    """Table-driven query-count checks, run once per dataset size."""
+
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = populate(cls.rows)
+        cls.admin = cls.fixtures["admin"]
+        cls.employee = cls.fixtures["employee"]
+
+    def test_view_query_budgets(self):
+        for role, url_name, argument, method, expected in VIEW_BUDGETS:
+            with self.subTest(role=role, view=url_name, method=method):
+                self.client.force_login(self.admin if role == "admin" else self.employee)
+                args = [self.fixtures[argument].pk] if argument else []
+                url = reverse(url_name, args=args)
+                data = {}
+                if method == "post" and "part" in url_name:
+                    data = part_form_data(
+                        self.fixtures[argument].part_number
+                        if argument
+                        else f"NEW-{url_name}"
+                    )
+                # Budgets are for a cold cache.
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = getattr(self.client, method)(url, data)
+                self.assertLess(response.status_code, 400)
+
+    def test_admin_changelist_query_budgets(self):
+        self.client.force_login(self.admin)
+        for model_name, expected in CHANGELIST_BUDGETS:
+            with self.subTest(changelist=model_name):
+                url = reverse(f"admin:inventory_{model_name}_changelist")
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class SmallDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    rows = 10
+
+
+class LargeDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    rows = 1000
+
+
+def fill(model, rows, columns):
+    """Insert ``rows`` rows into ``model``'s table in one SQL statement.
+
+    ``columns`` maps column names to SQL expressions of the row number
+    ``i``; a recursive CTE generates the numbers, which is far faster
+    than building model instances for bulk_create.
+    """
+    # pylint: disable=protected-access
+    names = ", ".join(columns)
+    values = ", ".join(columns.values())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} ({names}) "
+            "WITH RECURSIVE seq(i) AS "
+            "(SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < %s) "
+            f"SELECT {values} FROM seq",
+            [rows],
+        )
+
+
+class AdminChangelistScaleTests(TestCase):
+    """Admin changelists stay within budget and skip exact counts at 100k rows."""
+
+    rows = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = populate(10)
+        now = "'" + timezone.now().strftime("%Y-%m-%d %H:%M:%S") + "'"
+        offset = "(SELECT MAX(id) FROM {table})"
+        fill(Supplier, cls.rows, {
+            "name": "'Supplier ' || i",
+            "email": "''",
+            "phone": "''",
+            "address": "''",
+            "created_at": now,
+        })
+        fill(SparePart, cls.rows, {
+            "part_number": "'SC-' || i",
+            "part_name": "'Part ' || i",
+            "category_id": "(SELECT MIN(id) FROM inventory_category) + i % 7",
+            "quantity": "i % 15",
+            "minimum_stock": "5",
+            "reorder_quantity": "0",
+            "abc_class": "''",
+            "annual_revenue": "0",
+            "annual_units": "0",
+            "price": "9.99",
+            "supplier_id": f"{offset.format(table='inventory_supplier')} - i",
+            "location": "''",
+            "description": "''",
+            "created_at": now,
+            "updated_at": now,
+        })
+        fill(User, cls.rows, {
+            "password": "''",
+            "is_superuser": "0",
+            "username": "'sc_emp_' || i",
+            "first_name": "''",
+            "last_name": "''",
+            "email": "''",
+            "is_staff": "0",
+            "is_active": "1",
+            "date_joined": now,
+        })
+        fill(UserProfile, cls.rows, {
+            "user_id": f"{offset.format(table='auth_user')} - i",
+            "role": "'employee'",
+            "must_change_password": "0",
+        })
+        fill(Sale, cls.rows, {
+            "sale_number": "'SS-' || i",
+            "part_id": f"{offset.format(table='inventory_sparepart')} - i",
+            "quantity_sold": "1 + i % 3",
+            "total_price": "9.99",
+            "employee_id": f"{offset.format(table='auth_user')} - i",
+            "sale_date": now,
+            "notes": "''",
+        })
+        # As after ``generate_data``: the estimates rely on fresh statistics.
+        analyze(SparePart, Sale, UserProfile)
+
+    def setUp(self):
+        self.client.force_login(self.fixtures["admin"])
+
+    def test_changelists_keep_their_budget(self):
+        for model_name, expected in SCALE_CHANGELIST_BUDGETS:
+            with self.subTest(changelist=model_name):
+                url = reverse(f"admin:inventory_{model_name}_changelist")
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_unfiltered_changelists_use_estimated_counts(self):
+        for model_name in ("sparepart", "sale", "userprofile"):
+            with self.subTest(changelist=model_name):
+                url = reverse(f"admin:inventory_{model_name}_changelist")
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertFalse(
+                    [q["sql"] for q in queries if "COUNT(" in q["sql"].upper()]
+                )
+                self.assertGreaterEqual(response.context["cl"].result_count, self.rows)
+
+    def test_filtered_changelists(self):
+        supplier = self.fixtures["supplier"]
+        part = self.fixtures["part"]
+        year = timezone.now().year
+        for model_name, query, expected in FILTERED_CHANGELIST_BUDGETS:
+            with self.subTest(changelist=model_name, query=query):
+                url = reverse(f"admin:inventory_{model_name}_changelist")
+                query = query.format(supplier=supplier.pk, part=part.pk, year=year)
+                with self.assertNumQueries(expected):
+                    response = self.client.get(f"{url}?{query}")
+                self.assertEqual(response.status_code, 200)
+                self.assertGreaterEqual(response.context["cl"].result_count, 1)
+
+        response = self.client.get(
+            reverse("admin:inventory_sparepart_changelist") + f"?supplier={supplier.pk}"
+        )
+        self.assertContains(response, f'<option value="{supplier.pk}" selected>')
+
+    def test_supplier_autocomplete_searches_instead_of_listing(self):
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "Supplier 99998",
+                "app_label": "inventory",
+                "model_name": "sparepart",
+                "field_name": "supplier",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)["results"]
+        self.assertEqual([r["text"] for r in results], ["Supplier 99998"])
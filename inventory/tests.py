@@ -1,8 +1,78 @@
-from django.test import TestCase
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 
-from inventory.models import SparePart
+from inventory.access_log import AsyncAccessLogHandler, BatchedRotatingFileHandler
+from inventory import (
+    archive,
+    bulk,
+    categories,
+    classification,
+    forecast,
+    history,
+    ledger,
+    outbox,
+    purchasing,
+    reports,
+    scorecard,
+    simulation,
+    sql,
+)
+from inventory.alerts import send_digests
+from inventory.management.commands.benchmark import percentile
+from inventory.management.commands.generate_data import explicit_sale_dates
+from inventory.jobs import claim_next, enqueue, job, run_job
+from inventory.middleware import (
+    AccessLogMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    QueryBudgetExceeded,
+    QueryInstrumentationMiddleware,
+    QueryStats,
+    TrafficCaptureMiddleware,
+)
+from inventory.models import (
+    ArchivedSale,
+    ArchivedSparePart,
+    Category,
+    Job,
+    OutboxEmail,
+    PurchaseOrder,
+    PurchaseOrderLine,
+    Sale,
+    SaleRollup,
+    SparePart,
+    StockAlertEvent,
+    StockMovement,
+    StockSnapshot,
+    Supplier,
+    UserProfile,
+)
+from inventory.outbox import enqueue_email, send_pending
+from inventory.slow_queries import query_shape
+from inventory.sql import analyze
+from inventory.tasks import refresh_statistics
+from inventory.traffic import flush_all
 
 
 class BasicViewTests(TestCase):
@@ -223,3 +293,2101 @@ class BasicViewTests(TestCase):
         self.assertTrue(data["success"])
         self.assertGreaterEqual(len(data["labels"]), 1)
         self.assertGreaterEqual(len(data["quantities"]), 1)
+
+
+class AsyncApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="api_user",
+            password="testpass123",
+        )
+        SparePart.objects.create(
+            part_number="A1",
+            part_name="Air Filter",
+            quantity=0,
+            price=12,
+            minimum_stock=3,
+        )
+        SparePart.objects.create(
+            part_number="B1",
+            part_name="Brake Disc",
+            quantity=20,
+            price=80,
+            minimum_stock=3,
+        )
+
+    async def test_async_client_gets_stock_status(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse("get_stock_status_data"))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["out_of_stock"], 1)
+        self.assertEqual(data["in_stock"], 1)
+
+    def test_api_requires_login(self):
+        response = self.client.get(reverse("get_parts_data"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/login", response.url)
+
+    def test_api_rejects_post(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("get_stock_status_data"))
+        self.assertEqual(response.status_code, 405)
+
+    def test_get_parts_data_filters_and_paginates(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("get_parts_data"),
+            {"stock_filter": "out", "page_size": 10},
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["results"][0]["part_number"], "A1")
+
+    def test_get_part_data_returns_404_for_missing_part(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("get_part_data", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.json()["success"])
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="outbox_admin",
+            password="testpass123",
+            is_staff=True,
+        )
+        self.client.force_login(self.admin)
+
+    def test_add_employee_queues_email_without_sending(self):
+        response = self.client.post(
+            reverse("add_employee"),
+            {
+                "username": "new_emp",
+                "first_name": "New",
+                "last_name": "Employee",
+                "email": "new_emp@example.com",
+                "mobile_number": "0123456789",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipients, ["new_emp@example.com"])
+        self.assertEqual(queued.status, OutboxEmail.STATUS_PENDING)
+
+    def test_welcome_email_links_to_set_password_instead_of_password(self):
+        response = self.client.post(
+            reverse("add_employee"),
+            {
+                "username": "link_emp",
+                "first_name": "Link",
+                "last_name": "Employee",
+                "email": "link_emp@example.com",
+                "mobile_number": "0123456789",
+            },
+        )
+        self.assertNotIn("password", response.context)
+        self.assertFalse(User.objects.get(username="link_emp").has_usable_password())
+        body = OutboxEmail.objects.get().body
+        link = re.search(r"http://testserver(/set-password/\S+)", body).group(1)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(link).status_code, 200)
+        response = self.client.post(
+            link,
+            {"new_password": "n3w-Secret!", "confirm_password": "n3w-Secret!"},
+        )
+        self.assertRedirects(response, reverse("login"), fetch_redirect_response=False)
+        employee = User.objects.get(username="link_emp")
+        self.assertTrue(employee.check_password("n3w-Secret!"))
+        self.assertFalse(employee.userprofile.must_change_password)
+        # The token is tied to the old password hash, so it is single-use.
+        self.assertEqual(self.client.get(link).status_code, 400)
+
+    def test_retry_now_resets_attempts(self):
+        email = enqueue_email("Hello", "Body", ["a@example.com"])
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            status=OutboxEmail.STATUS_FAILED,
+            attempts=5,
+        )
+        self.admin.is_superuser = True
+        self.admin.save()
+        self.client.post(
+            reverse("admin:inventory_outboxemail_changelist"),
+            {"action": "retry_now", "_selected_action": [email.pk]},
+        )
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 0)
+
+    def test_send_outbox_delivers_pending_emails(self):
+        enqueue_email("Hello", "Body", ["a@example.com"])
+        enqueue_email("Hello again", "Body", ["b@example.com"])
+        call_command("send_outbox", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.STATUS_SENT).exists()
+        )
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=30)
+    def test_failed_email_is_retried_with_backoff_then_marked_failed(self):
+        email = enqueue_email("Hello", "Body", ["a@example.com"])
+        with mock.patch(
+            "inventory.outbox.EmailMessage.send",
+            side_effect=OSError("connection reset"),
+        ):
+            now = timezone.now()
+            self.assertEqual(send_pending(now=now), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+            self.assertEqual(email.next_attempt_at, now + timedelta(seconds=30))
+            self.assertIn("connection reset", email.last_error)
+
+            # Not due yet, so nothing is attempted.
+            self.assertEqual(send_pending(now=now), (0, 0))
+
+            self.assertEqual(send_pending(now=email.next_attempt_at), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.STATUS_FAILED)
+
+    def test_overlapping_runs_send_each_email_once(self):
+        first = enqueue_email("Hello", "Body", ["a@example.com"])
+        enqueue_email("Hello again", "Body", ["b@example.com"])
+        now = timezone.now()
+        claimed = outbox.claim_batch(1, now)
+        self.assertEqual([email.pk for email in claimed], [first.pk])
+
+        # Another run only gets what the first one has not claimed.
+        self.assertEqual(send_pending(now=now), (1, 0))
+        self.assertEqual(send_pending(now=now), (0, 0))
+        self.assertEqual([m.to for m in mail.outbox], [["b@example.com"]])
+
+        # A claim whose run died is taken over once its lease expires.
+        first.refresh_from_db()
+        self.assertEqual(first.status, OutboxEmail.STATUS_SENDING)
+        self.assertEqual(send_pending(now=first.locked_until + timedelta(seconds=1)), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_no_delivery_job_is_queued_while_one_is_running(self):
+        enqueue_email("Hello", "Body", ["a@example.com"])
+        Job.objects.filter(name=outbox.SEND_JOB).update(status=Job.STATUS_RUNNING)
+        enqueue_email("Hello again", "Body", ["b@example.com"])
+        self.assertEqual(Job.objects.filter(name=outbox.SEND_JOB).count(), 1)
+        # The running job itself schedules the next run when it finishes.
+        self.assertIsNotNone(outbox.schedule_delivery(wait_for_running=False))
+
+
+def _run_simulation_tasks(tasks, results):
+    """Daemon process target: run simulation tasks on two workers."""
+    try:
+        results.put(simulation._run_tasks(tasks, 2))  # pylint: disable=protected-access
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        results.put(repr(exc))
+
+
+@job("tests.echo", timeout=60, max_attempts=2)
+def _echo_job(value=None):
+    return {"value": value}
+
+
+@job("tests.boom", timeout=60, max_attempts=2)
+def _failing_job():
+    raise ValueError("boom")
+
+
+class JobRunnerTests(TestCase):
+    def test_claim_next_respects_priority_and_run_at(self):
+        low = enqueue("tests.echo", {"value": "low"})
+        high = enqueue("tests.echo", {"value": "high"}, priority=10)
+        enqueue(
+            "tests.echo",
+            {"value": "later"},
+            priority=99,
+            run_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(claim_next("w1").pk, high.pk)
+        self.assertEqual(claim_next("w1").pk, low.pk)
+        self.assertIsNone(claim_next("w1"))
+
+    def test_run_worker_burst_runs_jobs_and_records_result(self):
+        queued = enqueue("tests.echo", {"value": 42})
+        call_command("run_worker", "--burst", stdout=StringIO())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(queued.result, {"value": 42})
+
+    def test_run_worker_schedules_recurring_jobs_once(self):
+        call_command("run_worker", "--burst", stdout=StringIO())
+        call_command("run_worker", "--burst", stdout=StringIO())
+        self.assertEqual(
+            sorted(Job.objects.values_list("name", flat=True)),
+            sorted(
+                [
+                    archive.ARCHIVE_JOB,
+                    ledger.SNAPSHOT_JOB,
+                    forecast.FORECAST_JOB,
+                    classification.ABC_JOB,
+                    sql.ANALYZE_JOB,
+                ]
+            ),
+        )
+
+    def test_queued_email_is_delivered_by_the_worker(self):
+        enqueue_email("Hello", "Body", ["a@example.com"])
+        enqueue_email("Hello again", "Body", ["b@example.com"])
+        self.assertEqual(Job.objects.filter(name=outbox.SEND_JOB).count(), 1)
+        call_command("run_worker", "--burst", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        # Nothing is pending any more, so no follow-up run is queued.
+        self.assertFalse(
+            Job.objects.filter(name=outbox.SEND_JOB, status=Job.STATUS_QUEUED).exists()
+        )
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        queued = enqueue("tests.boom")
+        self.assertFalse(run_job(claim_next("w1")))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_QUEUED)
+        self.assertGreater(queued.run_at, timezone.now())
+
+        self.assertFalse(run_job(claim_next("w1", now=queued.run_at)))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_FAILED)
+        self.assertIn("ValueError: boom", queued.error)
+
+    def test_expired_lease_is_reclaimed_by_another_worker(self):
+        queued = enqueue("tests.echo")
+        first = claim_next("w1")
+        self.assertIsNone(claim_next("w2"))
+
+        reclaimed = claim_next("w2", now=first.locked_until + timedelta(seconds=1))
+        self.assertEqual(reclaimed.pk, queued.pk)
+        self.assertEqual(reclaimed.worker_id, "w2")
+        self.assertEqual(reclaimed.attempts, 2)
+
+        # The original worker no longer owns the job, so its result is dropped.
+        run_job(first)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_RUNNING)
+
+    def test_job_status_api_is_admin_only(self):
+        queued = enqueue("tests.echo")
+        employee = User.objects.create_user(username="job_emp", password="x")
+        self.client.force_login(employee)
+        response = self.client.get(reverse("get_job_status", args=[queued.pk]))
+        self.assertEqual(response.status_code, 403)
+
+        admin = User.objects.create_user(
+            username="job_admin",
+            password="x",
+            is_staff=True,
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse("get_job_status", args=[queued.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], Job.STATUS_QUEUED)
+
+
+class StockAlertTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="alert_admin",
+            password="testpass123",
+            email="alerts@example.com",
+            is_staff=True,
+        )
+        self.part = SparePart.objects.create(
+            part_number="AL1",
+            part_name="Spark Plug",
+            quantity=20,
+            price=5,
+            minimum_stock=10,
+        )
+
+    def _edit_quantity(self, quantity):
+        self.client.force_login(self.admin)
+        self.client.post(
+            reverse("edit_part", args=[self.part.pk]),
+            {
+                "part_number": "AL1",
+                "part_name": "Spark Plug",
+                "quantity": quantity,
+                "price": 5,
+                "minimum_stock": 10,
+            },
+        )
+
+    def test_crossing_into_low_and_out_records_events(self):
+        self._edit_quantity(8)
+        self._edit_quantity(0)
+        events = list(
+            StockAlertEvent.objects.order_by("id").values_list(
+                "previous_state", "new_state",
+            )
+        )
+        self.assertEqual(events, [("in", "low"), ("low", "out")])
+
+    def test_changes_within_a_state_record_nothing(self):
+        self._edit_quantity(15)
+        self.part.refresh_from_db()
+        self.part.quantity = 25
+        self.part.save()
+        self.assertFalse(StockAlertEvent.objects.exists())
+
+    def test_first_crossing_schedules_a_single_digest_job(self):
+        self._edit_quantity(8)
+        self._edit_quantity(0)
+        digest_jobs = Job.objects.filter(name="alerts.send_digests")
+        self.assertEqual(digest_jobs.count(), 1)
+        self.assertGreater(digest_jobs.get().run_at, timezone.now())
+
+    def test_digest_queues_one_email_per_recipient(self):
+        User.objects.create_user(
+            username="alert_admin2",
+            password="x",
+            email="alerts2@example.com",
+            is_staff=True,
+        )
+        self._edit_quantity(8)
+        self._edit_quantity(0)
+
+        self.assertEqual(send_digests(), 2)
+        digests = OutboxEmail.objects.order_by("id")
+        self.assertEqual(
+            [email.recipients for email in digests],
+            [["alerts2@example.com"], ["alerts@example.com"]],
+        )
+        self.assertIn("AL1 Spark Plug: OUT", digests[0].body)
+        self.assertFalse(
+            StockAlertEvent.objects.filter(digested_at__isnull=True).exists()
+        )
+        self.assertEqual(send_digests(), 0)
+
+
+class QueryInstrumentationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="sql_admin",
+            password="testpass123",
+            is_staff=True,
+        )
+        self.client.force_login(self.admin)
+        self.async_client.force_login(self.admin)
+
+    def test_response_carries_server_timing_header(self):
+        response = self.client.get(reverse("spare_parts_list"))
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("tpl;dur=", header)
+        self.assertIn("total;dur=", header)
+
+    def test_structured_log_line_reports_view_and_query_count(self):
+        with self.assertLogs("inventory.requests", level="INFO") as logs:
+            self.client.get(reverse("employees_list"))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["url_name"], "employees_list")
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(record["duplicates"], [])
+
+    def test_employees_list_does_not_query_profiles_per_row(self):
+        for index in range(5):
+            user = User.objects.create_user(username=f"emp_{index}", password="x")
+            UserProfile.objects.create(user=user, role="employee")
+        with self.assertLogs("inventory.requests", level="INFO") as logs:
+            self.client.get(reverse("employees_list"))
+        self.assertEqual(json.loads(logs.records[-1].getMessage())["duplicates"], [])
+
+    def test_query_stats_flags_repeated_shapes(self):
+        stats = QueryStats()
+        for _ in range(3):
+            stats(lambda *args: None, "SELECT 1 WHERE id = %s", (1,), False, {})
+        stats(lambda *args: None, "SELECT 2", (), False, {})
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.duplicates(threshold=3), {"SELECT 1 WHERE id = %s": 3})
+
+    @override_settings(QUERY_BUDGETS={"spare_parts_list": 1})
+    def test_strict_mode_raises_when_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("spare_parts_list"))
+
+    def test_middleware_runs_async_for_coroutine_handlers(self):
+        async def get_response(request):  # pylint: disable=unused-argument
+            return None
+
+        for middleware_class in (
+            AccessLogMiddleware,
+            MetricsMiddleware,
+            QueryInstrumentationMiddleware,
+            ProfilingMiddleware,
+            TrafficCaptureMiddleware,
+        ):
+            self.assertTrue(iscoroutinefunction(middleware_class(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware_class(lambda request: None)))
+
+    async def test_async_view_queries_are_counted(self):
+        with self.assertLogs("inventory.requests", level="INFO") as logs:
+            response = await self.async_client.get(reverse("get_stock_status_data"))
+        self.assertEqual(response.status_code, 200)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["url_name"], "get_stock_status_data")
+        self.assertGreater(record["queries"], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response["Server-Timing"])
+
+
+class MetricsEndpointTests(TestCase):
+    def test_metrics_reports_latency_queries_and_queue_depth(self):
+        self.client.get(reverse("login"))
+        enqueue_email("Hi", "Body", ["a@example.com"])
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'partstrack_request_latency_seconds_count{method="GET",url_name="login"}',
+            body,
+        )
+        self.assertIn('partstrack_db_queries_per_request_bucket{le="1.0",url_name="login"}', body)
+        self.assertIn('partstrack_queue_depth{queue="outbox",status="pending"} 1.0', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_requires_token_when_configured(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        response = self.client.get(
+            reverse("metrics"),
+            HTTP_AUTHORIZATION="Bearer s3cret",
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+
+    def test_sampled_request_writes_profile_named_by_url(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse("login"))
+        files = os.listdir(self.profile_dir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("login-"))
+
+    def test_profile_header_is_honoured_only_for_staff(self):
+        employee = User.objects.create_user(username="prof_emp", password="x")
+        admin = User.objects.create_user(username="prof_admin", password="x", is_staff=True)
+        with self.settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_DIR=self.profile_dir):
+            self.client.force_login(employee)
+            self.client.get(reverse("employee_dashboard"), HTTP_X_PROFILE_REQUEST="1")
+            self.assertEqual(os.listdir(self.profile_dir), [])
+
+            self.client.force_login(admin)
+            self.client.get(reverse("admin_dashboard"), HTTP_X_PROFILE_REQUEST="1")
+        self.assertEqual(len(os.listdir(self.profile_dir)), 1)
+
+    def test_profile_summary_reports_samples_per_url(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse("login"))
+            self.client.get(reverse("login"))
+        out = StringIO()
+        call_command("profile_summary", "--dir", self.profile_dir, stdout=out)
+        self.assertIn("login: 2", out.getvalue())
+        self.assertIn("function calls", out.getvalue())
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="slow_admin",
+            password="x",
+            is_staff=True,
+        )
+        self.client.force_login(self.admin)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged_with_view_stack_and_plan(self):
+        with self.assertLogs("inventory.slow_queries", level="WARNING") as logs:
+            self.client.get(reverse("spare_parts_list"))
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        from_view = [r for r in records if r["view"] == "inventory.views.spare_parts_list"]
+        self.assertTrue(from_view)
+        self.assertTrue(
+            any("inventory/views.py" in frame for r in from_view for frame in r["stack"])
+        )
+        self.assertTrue(any(r.get("plan") for r in records))
+
+    def test_query_shape_collapses_in_lists(self):
+        short, short_id = query_shape("SELECT 1 WHERE id IN (%s, %s)")
+        _, long_id = query_shape("SELECT 1 WHERE id IN (%s, %s, %s, %s)")
+        self.assertEqual(short, "SELECT 1 WHERE id IN (%s, ...)")
+        self.assertEqual(short_id, long_id)
+
+    def test_report_ranks_shapes_by_total_time(self):
+        log_path = os.path.join(tempfile.mkdtemp(), "slow.log")
+        self.addCleanup(shutil.rmtree, os.path.dirname(log_path))
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            for shape, duration in (("aaa", 5), ("bbb", 50), ("aaa", 10)):
+                log_file.write(
+                    json.dumps(
+                        {"shape": shape, "duration_ms": duration, "sql": shape, "view": None}
+                    )
+                    + "\n"
+                )
+        out = StringIO()
+        call_command("slow_query_report", "--file", log_path, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("bbb  total=50.0ms"))
+        self.assertIn("count=2", out.getvalue())
+
+
+class BenchmarkToolingTests(TestCase):
+    def test_generate_data_bulk_creates_requested_rows(self):
+        call_command(
+            "generate_data",
+            suppliers=3,
+            parts=40,
+            sales=500,
+            days=30,
+            batch_size=100,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Supplier.objects.count(), 3)
+        self.assertEqual(SparePart.objects.count(), 40)
+        self.assertEqual(Sale.objects.count(), 500)
+        oldest = Sale.objects.order_by("sale_date").first().sale_date
+        self.assertLess(oldest, timezone.now() - timedelta(days=1))
+        # Generation restores auto_now_add: new sales are dated now again.
+        sale = Sale.objects.create(
+            sale_number="GEN-NEW",
+            part=SparePart.objects.first(),
+            quantity_sold=1,
+            total_price=Decimal("1.00"),
+            sale_date=oldest,
+        )
+        self.assertGreater(sale.sale_date, timezone.now() - timedelta(minutes=1))
+
+    def test_percentile_uses_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+
+class TrafficCaptureTests(TestCase):
+    def setUp(self):
+        capture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, capture_dir, ignore_errors=True)
+        self.capture_file = os.path.join(capture_dir, "requests.jsonl")
+
+    def read_capture(self):
+        flush_all()
+        with open(self.capture_file, encoding="utf-8") as capture:
+            return [json.loads(line) for line in capture]
+
+    def test_capture_is_off_by_default(self):
+        with self.settings(TRAFFIC_CAPTURE_FILE=self.capture_file):
+            self.client.get(reverse("login"))
+        flush_all()
+        self.assertFalse(os.path.exists(self.capture_file))
+
+    def test_captured_records_are_sanitized(self):
+        employee = User.objects.create_user(username="cap_emp", password="x")
+        self.client.force_login(employee)
+        with self.settings(
+            TRAFFIC_CAPTURE_ENABLED=True,
+            TRAFFIC_CAPTURE_FILE=self.capture_file,
+        ):
+            self.client.get(
+                reverse("employee_parts_list"),
+                {"search": "brake", "api_token": "s3cret"},
+            )
+        [record] = self.read_capture()
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["path"], reverse("employee_parts_list"))
+        self.assertEqual(record["role"], "employee")
+        self.assertEqual(record["status"], 200)
+        self.assertIn("search=brake", record["query"])
+        self.assertNotIn("s3cret", record["query"])
+        self.assertIn("duration_ms", record)
+
+    def test_writes_are_buffered(self):
+        with self.settings(
+            TRAFFIC_CAPTURE_ENABLED=True,
+            TRAFFIC_CAPTURE_FILE=self.capture_file,
+            TRAFFIC_CAPTURE_BUFFER_SIZE=3,
+            TRAFFIC_CAPTURE_FLUSH_INTERVAL=3600,
+        ):
+            self.client.get(reverse("login"))
+            self.client.get(reverse("login"))
+            self.assertFalse(os.path.exists(self.capture_file))
+            self.client.get(reverse("login"))
+            with open(self.capture_file, encoding="utf-8") as capture:
+                self.assertEqual(len(capture.readlines()), 3)
+
+
+class TrafficReplayTests(LiveServerTestCase):
+    def test_replay_reports_throughput_and_percentiles(self):
+        capture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, capture_dir, ignore_errors=True)
+        capture_file = os.path.join(capture_dir, "requests.jsonl")
+        login = reverse("login")
+        with open(capture_file, "w", encoding="utf-8") as capture:
+            for offset, method in ((0.0, "GET"), (0.01, "POST"), (0.02, "GET")):
+                capture.write(
+                    json.dumps(
+                        {"ts": 1000 + offset, "method": method, "path": login,
+                         "query": "", "role": "anonymous"}
+                    )
+                    + "\n"
+                )
+        out = StringIO()
+        call_command(
+            "replay_traffic",
+            "--file", capture_file,
+            "--base-url", self.live_server_url,
+            "--concurrency", "2",
+            "--speedup", "0",
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn("2 requests in", output)
+        self.assertIn("0 errors, 1 skipped", output)
+        self.assertIn(f"GET {login}", output)
+        self.assertIn("p95=", output)
+
+
+class AccessLogTests(TestCase):
+    def setUp(self):
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir, ignore_errors=True)
+        self.log_file = os.path.join(log_dir, "access.log")
+
+    def make_record(self, message):
+        return logging.LogRecord("inventory.access", logging.INFO, "", 0, message, None, None)
+
+    def test_requests_are_logged_through_the_queue(self):
+        handler = AsyncAccessLogHandler(self.log_file, batch_size=50, flush_interval=3600)
+        access_logger = logging.getLogger("inventory.access")
+        old_handlers, old_level = access_logger.handlers, access_logger.level
+        access_logger.handlers = [handler]
+        access_logger.setLevel(logging.INFO)
+        try:
+            employee = User.objects.create_user(username="acc_emp", password="x")
+            self.client.force_login(employee)
+            self.client.get(reverse("employee_parts_list"))
+            handler.flush()
+        finally:
+            access_logger.handlers = old_handlers
+            access_logger.setLevel(old_level)
+            handler.close()
+        with open(self.log_file, encoding="utf-8") as log:
+            [record] = [json.loads(line) for line in log]
+        self.assertEqual(record["url_name"], "employee_parts_list")
+        self.assertEqual(record["role"], "employee")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["bytes"], 0)
+        self.assertIn("latency_ms", record)
+
+    def test_file_handler_writes_in_batches_and_rotates(self):
+        handler = BatchedRotatingFileHandler(
+            self.log_file,
+            maxBytes=40,
+            backupCount=2,
+            batch_size=2,
+            flush_interval=3600,
+        )
+        self.addCleanup(handler.close)
+        handler.handle(self.make_record("a" * 15))
+        self.assertFalse(os.path.exists(self.log_file))
+        handler.handle(self.make_record("b" * 15))
+        self.assertTrue(os.path.exists(self.log_file))
+        handler.handle(self.make_record("c" * 15))
+        handler.handle(self.make_record("d" * 15))
+        self.assertTrue(os.path.exists(self.log_file + ".1"))
+
+    def test_report_prints_percentiles_slowest_first(self):
+        with open(self.log_file, "w", encoding="utf-8") as log:
+            for url_name, latency in (("fast", 1), ("slow", 90), ("fast", 3), ("slow", 80)):
+                log.write(
+                    json.dumps(
+                        {"method": "GET", "path": "/", "url_name": url_name,
+                         "role": "admin", "status": 200, "latency_ms": latency,
+                         "queries": 4, "bytes": 100}
+                    )
+                    + "\n"
+                )
+        out = StringIO()
+        call_command("access_log_report", "--file", self.log_file, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("GET slow"))
+        self.assertIn("n=2", lines[0])
+        self.assertIn("p95=   90.00ms", lines[0])
+
+
+class BulkPartUpdateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("bulk_admin", "bulk@example.com", "x")
+        self.old_supplier = Supplier.objects.create(name="Old Supplier")
+        self.new_supplier = Supplier.objects.create(name="New Supplier")
+        self.brake_category = Category.objects.create(name="Brakes")
+        for index, quantity in enumerate((20, 12, 3)):
+            SparePart.objects.create(
+                part_number=f"BK{index}",
+                part_name=f"Brake {index}",
+                category=self.brake_category,
+                quantity=quantity,
+                minimum_stock=10,
+                price=Decimal("10.00"),
+                supplier=self.old_supplier,
+            )
+        SparePart.objects.create(
+            part_number="EN1",
+            part_name="Engine Mount",
+            category=Category.objects.create(name="Engine"),
+            quantity=50,
+            price=Decimal("40.00"),
+        )
+        SparePart.objects.filter(category=self.brake_category).update(
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+        self.brakes = SparePart.objects.filter(category=self.brake_category)
+
+    def test_price_adjustment_is_one_update(self):
+        # savepoint, category ids, UPDATE, category counters, release
+        with self.assertNumQueries(5):
+            updated = bulk.adjust_price(self.brakes, 12.5)
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            set(self.brakes.values_list("price", flat=True)),
+            {Decimal("11.25")},
+        )
+        self.assertEqual(SparePart.objects.get(part_number="EN1").price, Decimal("40.00"))
+        self.assertTrue(
+            all(
+                updated_at > timezone.now() - timedelta(minutes=1)
+                for updated_at in self.brakes.values_list("updated_at", flat=True)
+            )
+        )
+
+    def test_stock_changes_record_only_crossings(self):
+        bulk.set_minimum_stock(self.brakes, 15)
+        self.assertEqual(
+            list(StockAlertEvent.objects.values_list("part__part_number", "new_state")),
+            [("BK1", "low")],
+        )
+        bulk.adjust_quantity(self.brakes, -14)
+        self.assertEqual(
+            dict(self.brakes.values_list("part_number", "quantity")),
+            {"BK0": 6, "BK1": 0, "BK2": 0},
+        )
+        self.assertEqual(
+            sorted(
+                StockAlertEvent.objects.values_list(
+                    "part__part_number", "previous_state", "new_state",
+                )
+            ),
+            [
+                ("BK0", "in", "low"),
+                ("BK1", "in", "low"),
+                ("BK1", "low", "out"),
+                ("BK2", "low", "out"),
+            ],
+        )
+        self.assertEqual(Job.objects.filter(name="alerts.send_digests").count(), 1)
+
+    def test_admin_action_updates_selection_across_filter(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("admin:inventory_sparepart_changelist")
+            + f"?category__id__exact={self.brake_category.pk}",
+            {
+                "action": "reassign_supplier",
+                "select_across": "1",
+                "index": "0",
+                "_selected_action": [self.brakes.first().pk],
+                "new_supplier": self.new_supplier.pk,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(self.brakes.values_list("supplier", flat=True)),
+            {self.new_supplier.pk},
+        )
+        self.assertIsNone(SparePart.objects.get(part_number="EN1").supplier)
+
+    def test_bulk_view_filters_by_supplier(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("bulk_update_parts"),
+            {"supplier": self.old_supplier.pk, "operation": "adjust_price", "value": "-50"},
+        )
+        self.assertContains(response, "3 parts updated.")
+        self.assertEqual(
+            set(self.brakes.values_list("price", flat=True)),
+            {Decimal("5.00")},
+        )
+
+    def test_bulk_view_requires_a_value(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("bulk_update_parts"),
+            {"category": self.brake_category.pk, "operation": "set_minimum_stock"},
+        )
+        self.assertContains(response, "Enter a value for this operation.")
+        self.assertEqual(set(self.brakes.values_list("minimum_stock", flat=True)), {10})
+
+    def test_bulk_view_without_filter_requires_confirmation(self):
+        self.client.force_login(self.admin)
+        data = {"operation": "set_minimum_stock", "value": "4"}
+        response = self.client.post(reverse("bulk_update_parts"), data)
+        self.assertContains(response, "confirm the change applies to all parts")
+        self.assertFalse(SparePart.objects.filter(minimum_stock=4).exists())
+
+        response = self.client.post(
+            reverse("bulk_update_parts"), {**data, "apply_to_all": "on"}
+        )
+        self.assertContains(response, f"{SparePart.objects.count()} parts updated.")
+        self.assertEqual(set(SparePart.objects.values_list("minimum_stock", flat=True)), {4})
+
+    def test_admin_action_rejects_fractional_minimum_stock(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("admin:inventory_sparepart_changelist"),
+            {
+                "action": "set_minimum_stock",
+                "_selected_action": [self.brakes.first().pk],
+                "value": "7.9",
+            },
+            follow=True,
+        )
+        self.assertContains(response, "Enter a whole number.")
+        self.assertEqual(set(self.brakes.values_list("minimum_stock", flat=True)), {10})
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("arch_admin", "arch@example.com", "x")
+        self.busy = SparePart.objects.create(
+            part_number="AR1", part_name="Oil Filter", quantity=4, price=Decimal("5.00")
+        )
+        self.other = SparePart.objects.create(
+            part_number="AR2", part_name="Air Filter", quantity=9, price=Decimal("7.00")
+        )
+        start = timezone.now() - timedelta(days=120)
+        for index in range(25):
+            sale = Sale.objects.create(
+                sale_number=f"AS{index}",
+                part=self.busy,
+                quantity_sold=2,
+                total_price=Decimal("10.00"),
+                employee=self.admin,
+            )
+            Sale.objects.filter(pk=sale.pk).update(sale_date=start + timedelta(days=index * 5))
+        Sale.objects.create(
+            sale_number="AS-other",
+            part=self.other,
+            quantity_sold=1,
+            total_price=Decimal("7.00"),
+        )
+        StockAlertEvent.objects.create(
+            part=self.busy, previous_state="in", new_state="low", quantity=4, minimum_stock=10,
+        )
+
+    def test_archive_moves_part_and_sales_in_chunks(self):
+        totals = archive.sales_totals()
+        parts, sales = archive.archive_parts(
+            SparePart.objects.filter(pk=self.busy.pk), chunk_size=10,
+        )
+        self.assertEqual((parts, sales), (1, 25))
+        self.assertFalse(SparePart.objects.filter(pk=self.busy.pk).exists())
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(ArchivedSale.objects.filter(part_id=self.busy.pk).count(), 25)
+        archived = ArchivedSparePart.objects.get(original_id=self.busy.pk)
+        self.assertEqual(archived.part_number, "AR1")
+        self.assertEqual(archive.sales_totals(), totals)
+        self.assertEqual(totals, (26, Decimal("257.00")))
+        rollups = SaleRollup.objects.filter(part_id=self.busy.pk)
+        self.assertGreater(rollups.count(), 1)
+        self.assertEqual(sum(r.sale_count for r in rollups), 25)
+
+    def test_delete_never_loads_sales_and_keeps_revenue(self):
+        totals = archive.sales_totals()
+        with CaptureQueriesContext(connection) as queries:
+            archive.delete_parts(SparePart.objects.filter(pk=self.busy.pk), chunk_size=10)
+        self.assertFalse(
+            [q["sql"] for q in queries if '"inventory_sale"."notes"' in q["sql"]]
+        )
+        self.assertFalse(ArchivedSale.objects.exists())
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(archive.sales_totals(), totals)
+
+    def test_repeated_rollups_accumulate(self):
+        first = Sale.objects.filter(part=self.busy).order_by("pk")[:3]
+        archive.move_sales(Sale.objects.filter(pk__in=list(first.values_list("pk", flat=True))))
+        archive.move_sales(Sale.objects.filter(part=self.busy))
+        self.assertEqual(
+            sum(SaleRollup.objects.values_list("sale_count", flat=True)), 25
+        )
+        self.assertEqual(
+            SaleRollup.objects.values("period", "part_id").distinct().count(),
+            SaleRollup.objects.count(),
+        )
+
+    def test_delete_views_use_fast_path(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse("delete_part", args=[self.other.pk]), {"archive": "1"})
+        self.assertTrue(ArchivedSparePart.objects.filter(original_id=self.other.pk).exists())
+
+        response = self.client.post(
+            reverse("admin:inventory_sparepart_delete", args=[self.busy.pk]),
+            {"post": "yes"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SparePart.objects.exists())
+        response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.context["sales_count"], 26)
+        self.assertEqual(response.context["sales_revenue"], "257.00")
+
+
+class SaleArchivalTests(ArchiveTests):
+    def test_old_sales_move_by_whole_months(self):
+        totals = archive.sales_totals()
+        cutoff = archive.archive_cutoff(months=1)
+        expected = Sale.objects.filter(sale_date__lt=cutoff).count()
+        self.assertGreater(expected, 0)
+        moved = archive.archive_old_sales(months=1, chunk_size=7)
+        self.assertEqual(moved, expected)
+        self.assertFalse(Sale.objects.filter(sale_date__lt=cutoff).exists())
+        self.assertEqual(cutoff.day, 1)
+        for sale in ArchivedSale.objects.all():
+            self.assertEqual(sale.period, timezone.localtime(sale.sale_date).date().replace(day=1))
+        self.assertEqual(archive.sales_totals(), totals)
+
+    def test_history_unions_live_and_archived_sales(self):
+        archive.archive_old_sales(months=1)
+        rows = list(archive.sales_history(part_id=self.busy.pk))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows, sorted(rows, key=lambda row: row["sale_date"]))
+        self.assertTrue(rows[0]["archived"])
+        self.assertFalse(rows[-1]["archived"])
+
+        since = timezone.now() - timedelta(days=60)
+        recent = list(archive.sales_history(since=since))
+        self.assertEqual(
+            len(recent),
+            Sale.objects.filter(sale_date__gte=since).count()
+            + ArchivedSale.objects.filter(sale_date__gte=since).count(),
+        )
+
+    def test_job_archives_and_reschedules_itself_once(self):
+        archive.schedule_archival()
+        archive.schedule_archival()
+        jobs = Job.objects.filter(name=archive.ARCHIVE_JOB)
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(timezone.localtime(jobs.get().run_at).day, 1)
+
+        jobs.update(run_at=timezone.now())
+        claimed = claim_next("test-worker")
+        with self.settings(SALE_ARCHIVE_HORIZON_MONTHS=1):
+            run_job(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Job.STATUS_SUCCEEDED)
+        self.assertGreater(claimed.result["archived"], 0)
+        self.assertEqual(jobs.filter(status=Job.STATUS_QUEUED).count(), 1)
+
+    @mock.patch("inventory.admin.ESTIMATED_COUNT_THRESHOLD", 5)
+    def test_changelist_count_is_not_overstated_after_archiving(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:inventory_sale_changelist")
+        analyze(Sale)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).context["cl"].paginator.count, 26)
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"].upper()])
+
+        # Make every other sale old, so archiving leaves gaps in the key range.
+        ids = list(Sale.objects.order_by("pk").values_list("pk", flat=True))
+        Sale.objects.filter(pk__in=ids[1:-1:2]).update(
+            sale_date=timezone.now() - timedelta(days=400)
+        )
+        Sale.objects.exclude(pk__in=ids[1:-1:2]).update(sale_date=timezone.now())
+        self.assertEqual(archive.archive_old_sales(months=6), 12)
+        paginator = self.client.get(url).context["cl"].paginator
+        self.assertEqual(paginator.count, 14)
+        self.assertTrue(paginator.page(paginator.num_pages).object_list)
+
+        # New sales do not force an exact count; the nightly job catches up.
+        Sale.objects.create(
+            sale_number="AS-new", part=self.other, quantity_sold=1, total_price=Decimal("7.00"),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).context["cl"].paginator.count, 14)
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"].upper()])
+        self.assertEqual(refresh_statistics(), {"tables": 3})
+        self.assertEqual(self.client.get(url).context["cl"].paginator.count, 15)
+
+    def test_command_dry_run_and_history_export(self):
+        out = StringIO()
+        call_command("archive_sales", "--months", "1", "--dry-run", stdout=out)
+        self.assertIn("would be archived", out.getvalue())
+        self.assertFalse(ArchivedSale.objects.exists())
+
+        call_command("archive_sales", "--months", "1", stdout=StringIO())
+        out = StringIO()
+        call_command("archive_sales", "--export-history", "--part", str(self.other.pk), stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            lines[0].split(","),
+            [
+                "sale_number",
+                "part_id",
+                "quantity_sold",
+                "total_price",
+                "employee_id",
+                "sale_date",
+                "archived",
+            ],
+        )
+        self.assertEqual(len(lines), 2)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.part = SparePart.objects.create(
+            part_number="LG1",
+            part_name="Ledger Part",
+            quantity=10,
+            minimum_stock=2,
+        )
+        self.other = SparePart.objects.create(
+            part_number="LG2",
+            part_name="Other Part",
+            quantity=5,
+            minimum_stock=2,
+        )
+
+    def movements(self, part):
+        return list(
+            StockMovement.objects.filter(part_id=part.pk)
+            .order_by("pk")
+            .values_list("delta", "reason")
+        )
+
+    def test_saves_append_movements_only_when_quantity_changes(self):
+        part = SparePart.objects.get(pk=self.part.pk)
+        part.quantity = 7
+        part.save()
+        part.location = "Shelf 4"
+        part.save()
+        part.quantity = 9
+        part.stock_reason = StockMovement.REASON_RECEIPT
+        part.save()
+        self.assertEqual(
+            self.movements(self.part),
+            [(10, "initial"), (-3, "edit"), (2, "receipt")],
+        )
+
+    def test_bulk_adjustment_writes_movements_in_one_statement(self):
+        parts = SparePart.objects.all()
+        with CaptureQueriesContext(connection) as queries:
+            bulk.adjust_quantity(parts, -6)
+        inserts = [q for q in queries if "inventory_stockmovement" in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.movements(self.part)[-1], (-6, "adjustment"))
+        # Clamped at zero: the ledger records what actually changed.
+        self.assertEqual(self.movements(self.other)[-1], (-5, "adjustment"))
+        bulk.adjust_quantity(SparePart.objects.filter(quantity=0), 0)
+        self.assertEqual(StockMovement.objects.count(), 4)
+
+    def test_stock_at_uses_snapshot_plus_delta(self):
+        start = timezone.now()
+        StockMovement.objects.update(created_at=start - timedelta(days=10))
+        part = SparePart.objects.get(pk=self.part.pk)
+        self.assertEqual(ledger.take_snapshots(now=start - timedelta(days=5)), 2)
+
+        part.quantity = 4
+        part.save()
+        StockMovement.objects.filter(delta=-6).update(created_at=start - timedelta(days=3))
+        part.quantity = 12
+        part.save()
+        # Nothing moved since the last run for the other part.
+        self.assertEqual(ledger.take_snapshots(), 1)
+
+        self.assertEqual(ledger.stock_at(self.part.pk, start - timedelta(days=11)), 0)
+        self.assertEqual(ledger.stock_at(self.part.pk, start - timedelta(days=4)), 10)
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.stock_at(self.part.pk, start - timedelta(days=2)), 4)
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now()), 12)
+        self.assertEqual(ledger.stock_at(self.other.pk, timezone.now()), 5)
+
+    def test_late_committed_movement_is_not_lost(self):
+        taken_at = timezone.now()
+        ledger.take_snapshots(now=taken_at)
+        # Stamped before the snapshot, but committed after it was taken.
+        SparePart.objects.filter(pk=self.part.pk).update(quantity=7)
+        StockMovement.objects.create(
+            part_id=self.part.pk,
+            delta=-3,
+            reason=StockMovement.REASON_EDIT,
+            created_at=taken_at - timedelta(minutes=1),
+        )
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now()), 7)
+        self.assertEqual(ledger.take_snapshots(), 1)
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now()), 7)
+
+    def test_movement_read_into_snapshot_is_not_counted_twice(self):
+        taken_at = timezone.now()
+        part = SparePart.objects.get(pk=self.part.pk)
+        part.quantity = 6
+        part.save()
+        # The movement landed after ``now`` was chosen but before the read.
+        StockMovement.objects.filter(delta=-4).update(
+            created_at=taken_at + timedelta(seconds=1)
+        )
+        ledger.take_snapshots(now=taken_at)
+        self.assertEqual(
+            ledger.stock_at(self.part.pk, taken_at + timedelta(minutes=1)), 6
+        )
+
+    def test_stock_at_without_snapshots_works_back_from_live_quantity(self):
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(days=2))
+        part = SparePart.objects.get(pk=self.part.pk)
+        part.quantity = 1
+        part.save()
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now() - timedelta(days=1)), 10)
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now() - timedelta(days=3)), 0)
+
+    def test_archive_keeps_history_and_delete_forgets_it(self):
+        ledger.take_snapshots()
+        archive.archive_parts(SparePart.objects.filter(pk=self.part.pk))
+        self.assertEqual(self.movements(self.part)[-1], (-10, "removed"))
+        self.assertEqual(ledger.stock_at(self.part.pk, timezone.now()), 0)
+
+        archive.delete_parts(SparePart.objects.filter(pk=self.other.pk))
+        self.assertFalse(StockMovement.objects.filter(part_id=self.other.pk).exists())
+        self.assertFalse(StockSnapshot.objects.filter(part_id=self.other.pk).exists())
+
+    def test_snapshot_job_reschedules_itself(self):
+        ledger.schedule_snapshots()
+        ledger.schedule_snapshots()
+        jobs = Job.objects.filter(name=ledger.SNAPSHOT_JOB)
+        self.assertEqual(jobs.count(), 1)
+        jobs.update(run_at=timezone.now())
+        claimed = claim_next("test-worker")
+        run_job(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.result, {"snapshots": 2})
+        self.assertEqual(jobs.filter(status=Job.STATUS_QUEUED).count(), 1)
+
+    def test_command_prints_stock_at(self):
+        out = StringIO()
+        call_command(
+            "snapshot_stock",
+            "--part", str(self.part.pk),
+            "--at", timezone.now().isoformat(),
+            stdout=out,
+        )
+        self.assertEqual(out.getvalue().strip(), "10")
+
+
+class StockHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("history_user", password="x")
+        self.client.login(username="history_user", password="x")
+        self.part = SparePart.objects.create(
+            part_number="HS1",
+            part_name="History Part",
+            quantity=0,
+            minimum_stock=5,
+        )
+        self.start = timezone.now() - timedelta(days=400)
+        rng = np.random.default_rng(7)
+        deltas = rng.integers(-3, 5, size=2000)
+        levels = np.cumsum(deltas)
+        StockMovement.objects.bulk_create(
+            StockMovement(
+                part_id=self.part.pk,
+                delta=int(delta),
+                reason=StockMovement.REASON_ADJUSTMENT,
+                created_at=self.start + timedelta(hours=4 * index),
+            )
+            for index, delta in enumerate(deltas)
+        )
+        SparePart.objects.filter(pk=self.part.pk).update(
+            quantity=int(levels[-1]),
+            created_at=self.start - timedelta(days=1),
+        )
+        self.levels = levels
+
+    def test_series_rebuilds_levels_from_ledger(self):
+        timestamps, quantities = history.stock_series(
+            self.part.pk, self.start - timedelta(days=1), timezone.now(),
+        )
+        self.assertEqual(len(timestamps), 2002)
+        self.assertTrue(np.all(np.diff(timestamps) >= 0))
+        self.assertEqual(quantities[0], 0)
+        np.testing.assert_array_equal(quantities[1:-1], self.levels)
+        self.assertEqual(quantities[-1], self.levels[-1])
+        moments = StockMovement.objects.filter(part_id=self.part.pk).order_by("pk")
+        np.testing.assert_allclose(
+            timestamps[1:-1],
+            [moment.timestamp() for moment in moments.values_list("created_at", flat=True)],
+            rtol=0,
+            atol=1e-3,
+        )
+
+    def test_downsampling_keeps_endpoints_and_extremes(self):
+        x = np.arange(10000, dtype=np.float64)
+        y = np.sin(x / 300) * 100
+        y[4321] = -500
+        for method in history.METHODS:
+            with self.subTest(method=method):
+                sx, sy = history.downsample(x, y, 200, method)
+                self.assertLessEqual(len(sx), 200)
+                self.assertEqual((sx[0], sx[-1]), (0, 9999))
+                self.assertTrue(np.all(np.diff(sx) > 0))
+                self.assertIn(-500, sy)
+        np.testing.assert_array_equal(history.minmax(x[:50], y[:50], 200), np.arange(50))
+
+    def test_api_returns_at_most_requested_points(self):
+        url = reverse("get_part_history", args=[self.part.pk])
+        response = self.client.get(url, {"points": 100, "method": "lttb"})
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["total_points"], 2002)
+        self.assertEqual(len(data["timestamps"]), 100)
+        self.assertEqual(len(data["quantities"]), 100)
+        self.assertEqual(data["quantities"][-1], int(self.levels[-1]))
+
+        since = (timezone.now() - timedelta(days=30)).date().isoformat()
+        data = self.client.get(url, {"from": since, "points": 60}).json()
+        self.assertLessEqual(len(data["timestamps"]), 60)
+        self.assertLess(data["total_points"], 200)
+        earliest_ms = timezone.now().timestamp() * 1000 - 31 * 86400000
+        self.assertGreaterEqual(data["timestamps"][0], earliest_ms)
+
+    def test_api_rejects_bad_parameters(self):
+        url = reverse("get_part_history", args=[self.part.pk])
+        for params in ({"from": "yesterday"}, {"points": "many"}, {"method": "average"},
+                       {"from": "2030-01-01", "to": "2029-01-01"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        missing = reverse("get_part_history", args=[self.part.pk + 1])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+class DemandForecastTests(TestCase):
+    def setUp(self):
+        self.end = forecast.window_end(timezone.now())
+        old = self.end - timedelta(days=365)
+        self.steady = SparePart.objects.create(part_number="FC1", part_name="Steady")
+        self.bursty = SparePart.objects.create(part_number="FC2", part_name="Bursty")
+        self.idle = SparePart.objects.create(part_number="FC3", part_name="Idle", quantity=3)
+        self.new = SparePart.objects.create(part_number="FC4", part_name="New")
+        SparePart.objects.exclude(pk=self.new.pk).update(created_at=old)
+        SparePart.objects.filter(pk=self.new.pk).update(created_at=self.end - timedelta(days=10))
+        sales = []
+        for day in range(1, 61):
+            when = self.end - timedelta(days=day) + timedelta(hours=12)
+            sales.append((self.steady, 2, when))
+            if day % 5 == 0:
+                sales.append((self.bursty, 10, when))
+            if day <= 10:
+                sales.append((self.new, 2, when))
+        # Outside the window: must be ignored.
+        sales.append((self.idle, 50, self.end - timedelta(days=90)))
+        with explicit_sale_dates():
+            Sale.objects.bulk_create(
+                Sale(
+                    sale_number=f"FS{index}",
+                    part=part,
+                    quantity_sold=quantity,
+                    total_price=Decimal("1.00") * quantity,
+                    sale_date=when,
+                )
+                for index, (part, quantity, when) in enumerate(sales)
+            )
+
+    def suggestions(self, part):
+        part.refresh_from_db()
+        return part.suggested_minimum_stock, part.suggested_reorder_quantity
+
+    def test_moving_average_policy(self):
+        with self.settings(FORECAST_LEAD_TIME_DAYS=7, FORECAST_REVIEW_DAYS=30,
+                           FORECAST_SERVICE_LEVEL=0.95):
+            self.assertEqual(forecast.forecast_demand(method="sma", days=60), 4)
+        # Mean 2/day with no variability.
+        self.assertEqual(self.suggestions(self.steady), (14, 60))
+        # Mean 2/day, std 4: 14 + 1.645 * 4 * sqrt(7) rounds up to 32.
+        self.assertEqual(self.suggestions(self.bursty), (32, 60))
+        self.assertEqual(self.suggestions(self.idle), (0, 0))
+        # Only the ten days since creation count.
+        self.assertEqual(self.suggestions(self.new), (14, 60))
+        self.bursty.refresh_from_db()
+        self.assertAlmostEqual(self.bursty.forecast_daily_demand, 2.0)
+        self.assertIsNotNone(self.bursty.forecast_at)
+
+    def test_ewma_weights_recent_demand(self):
+        Sale.objects.filter(part=self.steady, sale_date__gte=self.end - timedelta(days=7)).update(
+            quantity_sold=8,
+        )
+        forecast.forecast_demand(method="ewma", days=60)
+        self.steady.refresh_from_db()
+        self.bursty.refresh_from_db()
+        self.assertGreater(self.steady.forecast_daily_demand, 2.5)
+        self.assertEqual(self.suggestions(self.idle), (0, 0))
+
+    def test_statistics_are_vectorized_over_all_parts(self):
+        positions = np.array([0, 0, 2])
+        mean, std = forecast.demand_statistics(
+            positions,
+            np.array([0, 1, 0]),
+            np.array([3.0, 1.0, 4.0]),
+            np.array([4.0, 4.0, 2.0]),
+            "sma",
+            0.1,
+        )
+        np.testing.assert_allclose(mean, [1.0, 0.0, 2.0])
+        np.testing.assert_allclose(std, [np.sqrt(10 / 4 - 1), 0.0, 2.0])
+
+    def test_apply_copies_suggestions_and_records_crossings(self):
+        forecast.forecast_demand(method="sma", days=60)
+        SparePart.objects.filter(pk=self.steady.pk).update(quantity=12)
+        applied = forecast.apply_suggestions(SparePart.objects.all())
+        self.assertEqual(applied, 4)
+        self.steady.refresh_from_db()
+        self.assertEqual((self.steady.minimum_stock, self.steady.reorder_quantity), (14, 60))
+        # 12 on hand was in stock under the old minimum of 10, low under 14.
+        event = StockAlertEvent.objects.get()
+        self.assertEqual((event.part_id, event.new_state), (self.steady.pk, "low"))
+
+    def test_job_forecasts_and_reschedules(self):
+        forecast.schedule_forecast()
+        forecast.schedule_forecast()
+        jobs = Job.objects.filter(name=forecast.FORECAST_JOB)
+        self.assertEqual(jobs.count(), 1)
+        jobs.update(run_at=timezone.now())
+        claimed = claim_next("test-worker")
+        run_job(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.result, {"parts": 4})
+        self.assertEqual(jobs.filter(status=Job.STATUS_QUEUED).count(), 1)
+
+    def test_command_applies_suggestions(self):
+        out = StringIO()
+        call_command("forecast_demand", "--method", "sma", "--days", "60", "--apply", stdout=out)
+        self.assertIn("Forecast 4 part(s)", out.getvalue())
+        self.assertIn("Applied suggestions to 4 part(s).", out.getvalue())
+        self.bursty.refresh_from_db()
+        self.assertEqual(self.bursty.minimum_stock, 32)
+
+
+class SafetyStockSimulationTests(TestCase):
+    def setUp(self):
+        end = forecast.window_end(timezone.now())
+        self.steady = SparePart.objects.create(
+            part_number="SS1", part_name="Steady",
+            category=Category.objects.create(name="Brakes"),
+            minimum_stock=2, reorder_quantity=20, price=Decimal("10.00"),
+        )
+        self.lumpy = SparePart.objects.create(
+            part_number="SS2", part_name="Lumpy",
+            category=Category.objects.create(name="Filters"),
+            minimum_stock=0, reorder_quantity=20, price=Decimal("4.00"),
+        )
+        SparePart.objects.update(created_at=end - timedelta(days=365))
+        sales = []
+        for day in range(1, 61):
+            when = end - timedelta(days=day) + timedelta(hours=12)
+            sales.append((self.steady, 2, when))
+            if day % 4 == 0:
+                sales.append((self.lumpy, 6, when))
+        with explicit_sale_dates():
+            Sale.objects.bulk_create(
+                Sale(
+                    sale_number=f"SS{index}",
+                    part=part,
+                    quantity_sold=quantity,
+                    total_price=Decimal("1.00") * quantity,
+                    sale_date=when,
+                )
+                for index, (part, quantity, when) in enumerate(sales)
+            )
+
+    def test_higher_reorder_point_serves_more_demand(self):
+        daily = np.array([0.0, 0.0, 6.0, 1.0, 3.0])
+        service, stockouts, on_hand = simulation.simulate_part(
+            daily, [0, 5, 10, 30], 10, 7, 60, 300, seed=1,
+        )
+        self.assertTrue(np.all(np.diff(service) >= 0))
+        self.assertTrue(np.all(np.diff(stockouts) <= 0))
+        self.assertTrue(np.all(np.diff(on_hand) > 0))
+        self.assertLess(service[0], 0.9)
+        self.assertGreater(service[-1], 0.99)
+
+    def test_constant_demand_is_deterministic(self):
+        service, stockouts, _ = simulation.simulate_part(
+            np.full(30, 2.0), [0, 14], 20, 7, 90, 5, seed=0,
+        )
+        self.assertEqual(service[1], 1.0)
+        self.assertEqual(stockouts[1], 0.0)
+        self.assertLess(service[0], 1.0)
+
+    def test_candidates_include_current_and_suggested(self):
+        self.assertEqual(simulation.candidate_points(10, 14), [0, 7, 10, 14, 21, 28])
+        self.assertEqual(simulation.candidate_points(3, None, [5, 1]), [1, 3, 5])
+
+    def test_report_per_part_and_category(self):
+        with self.settings(FORECAST_HISTORY_DAYS=60, FORECAST_SERVICE_LEVEL=0.95):
+            report = simulation.run_simulation(
+                candidates=[0, 10, 20, 40], runs=100, horizon=60, workers=1,
+            )
+        parts = {part["part_number"]: part for part in report["parts"]}
+        self.assertEqual(set(parts), {"SS1", "SS2"})
+        steady = parts["SS1"]
+        self.assertAlmostEqual(steady["daily_demand"], 2.0)
+        self.assertEqual(
+            [row["minimum_stock"] for row in steady["candidates"]], [0, 2, 10, 20, 40],
+        )
+        self.assertEqual(steady["current"]["minimum_stock"], 2)
+        self.assertLess(steady["current"]["service_level"], 0.95)
+        self.assertEqual(steady["recommended"]["minimum_stock"], 20)
+        self.assertGreaterEqual(steady["recommended"]["service_level"], 0.95)
+        # Worst-served parts come first.
+        levels = [part["current"]["service_level"] for part in report["parts"]]
+        self.assertEqual(levels, sorted(levels))
+
+        by_category = {row["category"]: row for row in report["categories"]}
+        self.assertEqual(set(by_category), {"Brakes", "Filters"})
+        self.assertEqual(by_category["Brakes"]["parts"], 1)
+        self.assertEqual(
+            by_category["Brakes"]["recommended_service_level"],
+            steady["recommended"]["service_level"],
+        )
+        self.assertGreater(
+            by_category["Brakes"]["recommended_holding_cost"],
+            by_category["Brakes"]["current_holding_cost"],
+        )
+
+    def test_negative_minimum_stock_is_simulated_as_zero(self):
+        SparePart.objects.filter(pk=self.steady.pk).update(minimum_stock=-3)
+        with self.settings(FORECAST_HISTORY_DAYS=60):
+            report = simulation.run_simulation(runs=20, horizon=30, workers=1)
+        steady = next(part for part in report["parts"] if part["part_number"] == "SS1")
+        self.assertEqual(steady["current"]["minimum_stock"], 0)
+
+    def test_process_pool_matches_serial_run(self):
+        options = {"candidates": [0, 10, 20], "runs": 50, "horizon": 30, "seed": 7}
+        serial = simulation.run_simulation(workers=1, **options)
+        with mock.patch.object(simulation, "CHUNK_SIZE", 1):
+            parallel = simulation.run_simulation(workers=2, **options)
+        self.assertEqual(serial["parts"], parallel["parts"])
+        self.assertEqual(serial["categories"], parallel["categories"])
+
+    def test_runs_serially_inside_daemon_process(self):
+        # run_worker --mode processes runs jobs in daemonic processes,
+        # which may not have children of their own.
+        tasks = [
+            (part_id, (np.array([0, 1, 3]), [0, 2, 4], 5, 2, 20, 10, part_id))
+            for part_id in range(3)
+        ]
+        with mock.patch.object(simulation, "CHUNK_SIZE", 1):
+            expected = simulation._run_tasks(tasks, 1)  # pylint: disable=protected-access
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_run_simulation_tasks,
+                args=(tasks, results),
+                daemon=True,
+            )
+            process.start()
+            outcome = results.get(timeout=60)
+            process.join()
+        np.testing.assert_equal(outcome, expected)
+
+    def test_select_parts_filters_category_and_supplier(self):
+        supplier = Supplier.objects.create(name="Sim Supplier")
+        SparePart.objects.filter(pk=self.lumpy.pk).update(supplier=supplier)
+        self.assertEqual(list(simulation.select_parts("Brakes")), [self.steady])
+        self.assertEqual(list(simulation.select_parts(supplier_id=supplier.pk)), [self.lumpy])
+
+    def test_command_prints_report_and_writes_csv(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "simulation.csv")
+            call_command(
+                "simulate_safety_stock", "--candidates", "0,10", "--runs", "20",
+                "--horizon", "30", "--workers", "1", "--csv", path, stdout=out,
+            )
+            with open(path, encoding="utf-8") as csv_file:
+                lines = csv_file.read().splitlines()
+        self.assertIn("Simulated 2 part(s), 20 runs of 30 days", out.getvalue())
+        self.assertIn("Brakes", out.getvalue())
+        self.assertTrue(lines[0].startswith("part_number,category"))
+        # Three candidates for SS1 (0, 2, 10) and two for SS2 (0, 10).
+        self.assertEqual(len(lines), 6)
+
+    @override_settings(SIMULATION_WORKERS=1)
+    def test_page_queues_job_and_shows_report(self):
+        employee = User.objects.create_user(username="sim_emp", password="x")
+        self.client.force_login(employee)
+        response = self.client.get(reverse("safety_stock_simulation"))
+        self.assertRedirects(response, reverse("employee_dashboard"), fetch_redirect_response=False)
+
+        admin = User.objects.create_user(username="sim_admin", password="x", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("safety_stock_simulation"),
+            {
+                "category": self.steady.category_id,
+                "candidates": "0, 10, 20",
+                "runs": "20",
+                "horizon": "30",
+            },
+        )
+        queued = Job.objects.get(name=simulation.SIMULATION_JOB)
+        self.assertRedirects(
+            response,
+            f"{reverse('safety_stock_simulation')}?job={queued.pk}",
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(queued.payload["candidates"], [0, 10, 20])
+        response = self.client.get(response.url)
+        self.assertContains(response, "refreshes when it is done")
+
+        run_job(claim_next("test-worker"))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(queued.result["part_count"], 1)
+        response = self.client.get(f"{reverse('safety_stock_simulation')}?job={queued.pk}")
+        self.assertContains(response, "Service level by category")
+        self.assertContains(response, "SS1")
+        self.assertNotContains(response, "SS2")
+
+    def test_form_rejects_bad_candidates(self):
+        admin = User.objects.create_user(username="sim_admin2", password="x", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("safety_stock_simulation"), {"candidates": "5, lots"},
+        )
+        self.assertContains(response, "Enter whole numbers separated by commas.")
+        self.assertFalse(Job.objects.filter(name=simulation.SIMULATION_JOB).exists())
+
+
+class PurchaseOrderTests(TestCase):
+    def setUp(self):
+        self.acme = Supplier.objects.create(name="Acme")
+        self.bolt = Supplier.objects.create(name="Bolt Co")
+        self.pads = SparePart.objects.create(
+            part_number="PO1", part_name="Pads", quantity=2, minimum_stock=10,
+            reorder_quantity=30, price=Decimal("5.00"), supplier=self.acme,
+        )
+        self.disc = SparePart.objects.create(
+            part_number="PO2", part_name="Disc", quantity=0, minimum_stock=4,
+            price=Decimal("20.00"), supplier=self.acme,
+        )
+        self.belt = SparePart.objects.create(
+            part_number="PO3", part_name="Belt", quantity=1, minimum_stock=5,
+            suggested_reorder_quantity=12, price=Decimal("8.00"), supplier=self.bolt,
+        )
+        self.loose = SparePart.objects.create(
+            part_number="PO4", part_name="Loose", quantity=0, minimum_stock=0,
+            price=Decimal("1.00"),
+        )
+        self.stocked = SparePart.objects.create(
+            part_number="PO5", part_name="Stocked", quantity=50, minimum_stock=5,
+            supplier=self.bolt,
+        )
+
+    def lines(self):
+        return dict(PurchaseOrderLine.objects.values_list("part__part_number", "quantity_ordered"))
+
+    def test_orders_are_grouped_by_supplier_up_to_target_stock(self):
+        with CaptureQueriesContext(connection) as queries:
+            orders = purchasing.generate_orders()
+        inserts = [
+            q for q in queries
+            if q["sql"].startswith('INSERT INTO "inventory_purchaseorderline"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(orders), 3)
+        # Minimum plus reorder quantity, else the forecast's, else the minimum again.
+        self.assertEqual(self.lines(), {"PO1": 38, "PO2": 8, "PO3": 16, "PO4": 1})
+        by_supplier = {
+            order.supplier_id: sorted(order.lines.values_list("part__part_number", flat=True))
+            for order in PurchaseOrder.objects.all()
+        }
+        self.assertEqual(
+            by_supplier,
+            {self.acme.pk: ["PO1", "PO2"], self.bolt.pk: ["PO3"], None: ["PO4"]},
+        )
+        line = PurchaseOrderLine.objects.get(part=self.disc)
+        self.assertEqual(line.unit_price, Decimal("20.00"))
+
+    def test_open_orders_are_not_ordered_twice(self):
+        purchasing.generate_orders()
+        self.assertEqual(purchasing.generate_orders(), [])
+        SparePart.objects.filter(pk=self.pads.pk).update(quantity=0)
+        orders = purchasing.generate_orders()
+        # Only the two units sold since the first order are topped up.
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(
+            list(orders[0].lines.values_list("part_id", "quantity_ordered")), [(self.pads.pk, 2)],
+        )
+
+    def test_receiving_updates_stock_ledger_and_status(self):
+        purchasing.generate_orders()
+        order = PurchaseOrder.objects.get(supplier=self.acme)
+        self.assertEqual(purchasing.receive_order(order, {self.pads.pk: 10}), 10)
+        order.refresh_from_db()
+        self.assertEqual(order.status, PurchaseOrder.STATUS_PARTIAL)
+        self.pads.refresh_from_db()
+        self.assertEqual(self.pads.quantity, 12)
+
+        with self.assertRaises(ValueError):
+            purchasing.receive_order(order, {self.pads.pk: 29})
+        with self.assertRaises(ValueError):
+            purchasing.receive_order(order, {self.belt.pk: 1})
+
+        self.assertEqual(purchasing.receive_order(order), 36)
+        order.refresh_from_db()
+        self.assertEqual(order.status, PurchaseOrder.STATUS_RECEIVED)
+        self.assertIsNotNone(order.received_at)
+        self.pads.refresh_from_db()
+        self.disc.refresh_from_db()
+        self.assertEqual((self.pads.quantity, self.disc.quantity), (40, 8))
+        receipts = StockMovement.objects.filter(
+            part_id=self.pads.pk, reason=StockMovement.REASON_RECEIPT,
+        )
+        self.assertEqual(list(receipts.values_list("delta", flat=True)), [10, 28])
+        self.assertEqual(receipts.first().note, f"Received on {order.number}")
+        with self.assertRaises(ValueError):
+            purchasing.receive_order(order)
+
+    def test_failed_receipt_changes_nothing(self):
+        purchasing.generate_orders()
+        order = PurchaseOrder.objects.get(supplier=self.acme)
+        with self.assertRaises(ValueError):
+            purchasing.receive_order(order, {self.pads.pk: 5, self.disc.pk: 99})
+        self.pads.refresh_from_db()
+        self.assertEqual(self.pads.quantity, 2)
+        self.assertFalse(
+            StockMovement.objects.filter(reason=StockMovement.REASON_RECEIPT).exists()
+        )
+
+    def test_cancelled_orders_are_no_longer_on_order(self):
+        purchasing.generate_orders()
+        order = PurchaseOrder.objects.get(supplier=self.bolt)
+        purchasing.cancel_order(order)
+        with self.assertRaises(ValueError):
+            purchasing.cancel_order(order)
+        orders = purchasing.generate_orders()
+        self.assertEqual([o.supplier_id for o in orders], [self.bolt.pk])
+
+    def test_pages_generate_receive_and_export(self):
+        admin = User.objects.create_user(username="po_admin", password="x", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("purchase_list"), {"action": "generate"}, follow=True,
+        )
+        self.assertRedirects(response, reverse("purchase_list"))
+        self.assertContains(response, "Generated 3 purchase orders")
+        order = PurchaseOrder.objects.get(supplier=self.acme)
+        self.assertContains(response, order.number)
+        # Reloading the page after the redirect does not generate again.
+        response = self.client.get(reverse("purchase_list"))
+        self.assertNotContains(response, "Generated 3 purchase orders")
+        self.assertEqual(PurchaseOrder.objects.count(), 3)
+
+        url = reverse("purchase_order_detail", args=[order.pk])
+        response = self.client.get(url, {"format": "csv"})
+        self.assertIn("PO1,Pads,38,5.00", response.content.decode())
+
+        response = self.client.post(url, {"action": "receive", f"qty_{self.disc.pk}": "3"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.disc.refresh_from_db()
+        self.assertEqual(self.disc.quantity, 3)
+
+        response = self.client.post(url, {"action": "receive", f"qty_{self.disc.pk}": "50"})
+        self.assertContains(response, "receive between 1 and 5")
+        response = self.client.post(url, {"action": "receive_all"})
+        order.refresh_from_db()
+        self.assertEqual(order.status, PurchaseOrder.STATUS_RECEIVED)
+
+        # The purchase list now shows what is on order and suggests the rest.
+        response = self.client.get(reverse("purchase_list"))
+        self.assertNotContains(response, order.number)
+
+    def test_command_previews_and_generates(self):
+        out = StringIO()
+        call_command("generate_purchase_orders", "--dry-run", stdout=out)
+        self.assertIn("4 part(s), 63 unit(s) would be ordered.", out.getvalue())
+        call_command("generate_purchase_orders", "--supplier", str(self.acme.pk), stdout=out)
+        self.assertIn("Created 1 purchase order(s) with 2 line(s)", out.getvalue())
+
+
+class AbcClassificationTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # Revenue shares: 70%, 20%, 6%, 4%; unit shares: 10%, 5%, 5%, 80%.
+        plan = [
+            ("AB1", Decimal("700.00"), 2),
+            ("AB2", Decimal("200.00"), 1),
+            ("AB3", Decimal("60.00"), 1),
+            ("AB4", Decimal("40.00"), 16),
+        ]
+        self.parts = {}
+        sales = []
+        for number, revenue, units in plan:
+            part = SparePart.objects.create(
+                part_number=number, part_name=number, quantity=1, minimum_stock=5,
+            )
+            self.parts[number] = part
+            sales.append((part, units, revenue, now - timedelta(days=30)))
+        self.idle = SparePart.objects.create(
+            part_number="AB5", part_name="Idle", quantity=1, minimum_stock=5,
+        )
+        # Outside the one-year window.
+        sales.append((self.idle, 500, Decimal("9000.00"), now - timedelta(days=400)))
+        with explicit_sale_dates():
+            Sale.objects.bulk_create(
+                Sale(
+                    sale_number=f"AS{index}",
+                    part=part,
+                    quantity_sold=units,
+                    total_price=revenue,
+                    sale_date=when,
+                )
+                for index, (part, units, revenue, when) in enumerate(sales)
+            )
+
+    def classes(self):
+        return dict(SparePart.objects.values_list("part_number", "abc_class"))
+
+    def test_cumulative_shares_are_vectorized(self):
+        classes = classification.cumulative_classes([5.0, 70.0, 0.0, 20.0, 5.0], 0.8, 0.95)
+        # 70 is A; 20 crosses 80% so is still A; the first 5 crosses 95%: B.
+        self.assertEqual(classes.tolist(), [1, 0, 2, 0, 2])
+        self.assertEqual(classification.cumulative_classes([0, 0], 0.8, 0.95).tolist(), [2, 2])
+
+    def test_parts_keep_their_better_class(self):
+        counts = classification.classify_parts()
+        self.assertEqual(
+            self.classes(),
+            {"AB1": "A", "AB2": "A", "AB3": "B", "AB4": "A", "AB5": "C"},
+        )
+        self.assertEqual(counts, {"A": 3, "B": 1, "C": 1})
+        part = SparePart.objects.get(part_number="AB4")
+        self.assertEqual((part.annual_revenue, part.annual_units), (Decimal("40.00"), 16))
+
+    def test_reclassification_resets_parts_that_stopped_selling(self):
+        classification.classify_parts()
+        Sale.objects.filter(part=self.parts["AB1"]).delete()
+        with CaptureQueriesContext(connection) as queries:
+            classification.classify_parts()
+        self.assertLessEqual(len(queries), 8)
+        part = SparePart.objects.get(part_number="AB1")
+        self.assertEqual((part.abc_class, part.annual_units), ("C", 0))
+
+    def test_job_runs_nightly(self):
+        with self.settings(ABC_RUN_HOUR=2):
+            classification.schedule_classification()
+            classification.schedule_classification()
+        jobs = Job.objects.filter(name=classification.ABC_JOB)
+        self.assertEqual(jobs.count(), 1)
+        run_at = timezone.localtime(jobs.get().run_at)
+        self.assertEqual((run_at.hour, run_at.minute), (2, 0))
+        self.assertGreater(run_at, timezone.now())
+        jobs.update(run_at=timezone.now())
+        run_job(claim_next("test-worker"))
+        self.assertEqual(self.classes()["AB1"], "A")
+        self.assertEqual(jobs.filter(status=Job.STATUS_QUEUED).count(), 1)
+
+    def test_lists_filter_and_prioritize_by_class(self):
+        classification.classify_parts()
+        admin = User.objects.create_user(username="abc_admin", password="x", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse("spare_parts_list"), {"abc": "b"})
+        self.assertEqual([part.part_number for part in response.context["parts"]], ["AB3"])
+
+        response = self.client.get(reverse("purchase_list"))
+        numbers = [part.part_number for part in response.context["parts"]]
+        self.assertEqual(numbers[-2:], ["AB3", "AB5"])
+        response = self.client.post(
+            reverse("purchase_list") + "?abc=A", {"action": "generate"},
+        )
+        self.assertEqual(
+            set(PurchaseOrderLine.objects.values_list("part__abc_class", flat=True)), {"A"},
+        )
+
+        response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.context["low_stock_by_class"], {"A": 3, "B": 1, "C": 1})
+        self.assertEqual(response.context["low_stock_alerts"][4].part_number, "AB5")
+
+        response = self.client.get(reverse("get_parts_data"), {"abc": "C"})
+        self.assertEqual([part["part_number"] for part in response.json()["results"]], ["AB5"])
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command("classify_parts", stdout=out)
+        self.assertIn("Classified parts (3 A, 1 B, 1 C)", out.getvalue())
+
+
+class DeadStockReportTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.supplier = Supplier.objects.create(name="Idle Supplies", email="idle@example.com")
+
+        def part(number, quantity, price):
+            return SparePart.objects.create(
+                part_number=number,
+                part_name=number,
+                quantity=quantity,
+                price=Decimal(price),
+                supplier=self.supplier,
+            )
+
+        self.cheap = part("DS1", 10, "2.00")
+        self.dear = part("DS2", 3, "100.00")
+        self.sold = part("DS3", 50, "100.00")
+        self.empty = part("DS4", 0, "100.00")
+        self.never = part("DS5", 1, "5.00")
+        with explicit_sale_dates():
+            Sale.objects.bulk_create(
+                Sale(
+                    sale_number=f"DS{index}",
+                    part=sold,
+                    quantity_sold=1,
+                    total_price=sold.price,
+                    sale_date=now - timedelta(days=days_ago),
+                )
+                for index, (sold, days_ago) in enumerate(
+                    [(self.cheap, 400), (self.dear, 200), (self.sold, 10), (self.empty, 400)]
+                )
+            )
+        self.admin = User.objects.create_user(username="ds_admin", password="x", is_staff=True)
+
+    def test_anti_join_ranks_by_tied_up_value(self):
+        parts = reports.dead_stock(180)
+        with CaptureQueriesContext(connection) as queries:
+            numbers = [part.part_number for part in parts]
+        self.assertEqual(numbers, ["DS2", "DS1", "DS5"])
+        self.assertEqual(len(queries), 1)
+        self.assertIn("NOT EXISTS", queries[0]["sql"])
+        self.assertEqual(reports.summary(parts), {"parts": 3, "value": Decimal("325.00")})
+        self.assertEqual(
+            [part.part_number for part in reports.dead_stock(365)], ["DS1", "DS5"],
+        )
+
+    def test_days_are_validated(self):
+        self.assertEqual(reports.parse_days(""), 180)
+        self.assertEqual(reports.parse_days("30"), 30)
+        for value in ("0", "x", str(reports.MAX_DAYS + 1)):
+            with self.assertRaises(ValueError):
+                reports.parse_days(value)
+
+    def test_page_and_csv(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("dead_stock_report"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["totals"]["parts"], 3)
+        rows = list(response.context["page"])
+        self.assertEqual(rows[0].last_sale.date(), (timezone.now() - timedelta(days=200)).date())
+        self.assertIsNone(rows[2].last_sale)
+
+        response = self.client.get(reverse("dead_stock_report"), {"days": "abc"})
+        self.assertIn("whole number", response.context["error"])
+
+        response = self.client.get(reverse("dead_stock_report"), {"days": 365, "format": "csv"})
+        lines = response.content.decode().splitlines()
+        self.assertEqual(lines[0], ",".join(reports.CSV_FIELDS))
+        self.assertTrue(lines[1].startswith("DS1,DS1,,Idle Supplies,10,2.00,20.00,"))
+        self.assertEqual(len(lines), 3)
+
+    def test_api_is_admin_only(self):
+        self.client.force_login(self.admin)
+        data = self.client.get(
+            reverse("get_dead_stock_data"), {"days": 180, "page_size": 2},
+        ).json()
+        self.assertEqual([row["part_number"] for row in data["results"]], ["DS2", "DS1"])
+        self.assertEqual((data["total"], data["total_value"]), (3, "325.00"))
+        self.assertEqual(data["results"][0]["tied_up_value"], "300.00")
+        response = self.client.get(reverse("get_dead_stock_data"), {"days": -1})
+        self.assertEqual(response.status_code, 400)
+
+        employee = User.objects.create_user(username="ds_employee", password="x")
+        self.client.force_login(employee)
+        self.assertEqual(self.client.get(reverse("get_dead_stock_data")).status_code, 403)
+        self.assertRedirects(
+            self.client.get(reverse("dead_stock_report")),
+            reverse("employee_dashboard"),
+            fetch_redirect_response=False,
+        )
+
+
+class SupplierScorecardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.acme = Supplier.objects.create(name="Acme", email="acme@example.com")
+        self.idle = Supplier.objects.create(name="Idle", email="idle@example.com")
+        self.bolt = SparePart.objects.create(
+            part_number="SC1", part_name="Bolt", quantity=10, minimum_stock=5,
+            price=Decimal("2.50"), supplier=self.acme,
+        )
+        self.nut = SparePart.objects.create(
+            part_number="SC2", part_name="Nut", quantity=2, minimum_stock=5,
+            price=Decimal("1.00"), supplier=self.acme,
+        )
+        with explicit_sale_dates():
+            Sale.objects.bulk_create([
+                Sale(sale_number="SC-1", part=self.bolt, quantity_sold=4,
+                     total_price=Decimal("10.00"), sale_date=now - timedelta(days=5)),
+                Sale(sale_number="SC-2", part=self.nut, quantity_sold=1,
+                     total_price=Decimal("1.00"), sale_date=now - timedelta(days=200)),
+            ])
+        self.admin = User.objects.create_user(username="sc_admin", password="x", is_staff=True)
+
+    def test_one_grouped_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            cards = scorecard.compute()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            cards[self.acme.pk],
+            {
+                "part_count": 2,
+                "low_stock_count": 1,
+                "stock_value": Decimal("27.00"),
+                "revenue": Decimal("10.00"),
+            },
+        )
+        self.assertEqual(cards[self.idle.pk], scorecard.EMPTY)
+
+    def test_cached_until_a_write_commits(self):
+        scorecard.scorecard()
+        with self.assertNumQueries(0):
+            scorecard.scorecard()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nut.quantity = 20
+            self.nut.save()
+        self.assertEqual(scorecard.scorecard()[self.acme.pk]["low_stock_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Sale.objects.create(sale_number="SC-3", part=self.nut, quantity_sold=1,
+                                total_price=Decimal("1.00"))
+        self.assertEqual(scorecard.scorecard()[self.acme.pk]["revenue"], Decimal("11.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.reassign_supplier(SparePart.objects.filter(pk=self.bolt.pk), self.idle)
+        cards = scorecard.scorecard()
+        self.assertEqual(cards[self.idle.pk]["revenue"], Decimal("10.00"))
+        self.assertEqual(cards[self.acme.pk]["part_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.delete_parts(SparePart.objects.filter(pk=self.bolt.pk))
+        self.assertEqual(scorecard.scorecard()[self.idle.pk], scorecard.EMPTY)
+
+    def test_suppliers_page_shows_scorecard(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("sales_list"))
+        acme = next(s for s in response.context["suppliers"] if s.pk == self.acme.pk)
+        self.assertEqual(acme.card["stock_value"], Decimal("27.00"))
+        self.assertContains(response, "€27.00")
+        with self.assertNumQueries(3):
+            self.client.get(reverse("sales_list"))
+
+
+class CategoryCounterTests(TestCase):
+    def setUp(self):
+        self.brakes = Category.objects.create(name="Brakes")
+        self.engine = Category.objects.create(name="Engine")
+        self.pad = SparePart.objects.create(
+            part_number="CT1", part_name="Pad", category=self.brakes,
+            quantity=20, minimum_stock=5, price=Decimal("2.50"),
+        )
+        self.disc = SparePart.objects.create(
+            part_number="CT2", part_name="Disc", category=self.brakes,
+            quantity=3, minimum_stock=5, price=Decimal("10.00"),
+        )
+
+    def counters(self, category):
+        category.refresh_from_db()
+        return category.part_count, category.low_stock_count, category.stock_value
+
+    def assertMatchesRefresh(self):
+        maintained = {c.pk: self.counters(c) for c in Category.objects.all()}
+        categories.refresh()
+        self.assertEqual(maintained, {c.pk: self.counters(c) for c in Category.objects.all()})
+
+    def test_saves_move_counters_incrementally(self):
+        self.assertEqual(self.counters(self.brakes), (2, 1, Decimal("80.00")))
+        part = SparePart.objects.get(pk=self.disc.pk)
+        part.quantity = 30
+        with CaptureQueriesContext(connection) as queries:
+            part.save()
+        counter_updates = [q for q in queries if 'UPDATE "inventory_category"' in q["sql"]]
+        self.assertEqual(len(counter_updates), 1)
+        self.assertEqual(self.counters(self.brakes), (2, 0, Decimal("350.00")))
+
+        part.category = self.engine
+        part.save()
+        self.assertEqual(self.counters(self.brakes), (1, 0, Decimal("50.00")))
+        self.assertEqual(self.counters(self.engine), (1, 0, Decimal("300.00")))
+        self.assertMatchesRefresh()
+
+    def test_save_without_loaded_state_refreshes_old_and_new_category(self):
+        other = Category.objects.create(name="Other", part_count=7)
+        part = SparePart.objects.get(pk=self.disc.pk)
+        part.__dict__.pop("loaded_category_stats")
+        part.category = self.engine
+        part.save()
+        self.assertEqual(self.counters(self.brakes), (1, 0, Decimal("50.00")))
+        self.assertEqual(self.counters(self.engine), (1, 1, Decimal("30.00")))
+        self.assertEqual(self.counters(other)[0], 7)
+
+        part.quantity = 10
+        with CaptureQueriesContext(connection) as queries:
+            part.save()
+        # Loaded by the first save: the second one is a plain increment.
+        counter_updates = [q for q in queries if 'UPDATE "inventory_category"' in q["sql"]]
+        self.assertEqual(len(counter_updates), 1)
+        self.assertNotIn("SELECT", counter_updates[0]["sql"])
+        self.assertEqual(self.counters(self.engine), (1, 0, Decimal("100.00")))
+
+    def test_set_based_writes_refresh_touched_categories(self):
+        bulk.adjust_quantity(SparePart.objects.filter(pk=self.pad.pk), -18)
+        self.assertEqual(self.counters(self.brakes), (2, 2, Decimal("35.00")))
+        archive.delete_parts(SparePart.objects.filter(pk=self.disc.pk))
+        self.assertEqual(self.counters(self.brakes), (1, 1, Decimal("5.00")))
+        self.assertMatchesRefresh()
+
+    def test_names_are_normalized(self):
+        self.assertEqual(categories.get_or_create_named("  brakes "), self.brakes)
+        created = categories.get_or_create_named("Body   Work")
+        self.assertEqual(created.name, "Body Work")
+        self.assertIsNone(categories.get_or_create_named("  "))
+
+    def test_facets_and_filters_read_only_categories(self):
+        with self.assertNumQueries(1):
+            facets = list(categories.facets())
+        self.assertEqual([(c.name, c.part_count) for c in facets], [("Brakes", 2)])
+
+        employee = User.objects.create_user(username="ct_employee", password="x")
+        self.client.force_login(employee)
+        response = self.client.get(
+            reverse("employee_parts_list"), {"category": self.brakes.pk, "stock_filter": "low"},
+        )
+        self.assertEqual([part.part_number for part in response.context["parts"]], ["CT2"])
+        data = self.client.get(reverse("get_parts_data"), {"category": self.engine.pk}).json()
+        self.assertEqual(data["results"], [])
+        data = self.client.get(reverse("get_part_data", args=[self.pad.pk])).json()
+        self.assertEqual(data["category"], "Brakes")
+
+    def test_command_rebuilds_counters(self):
+        Category.objects.update(part_count=0, low_stock_count=0, stock_value=0)
+        out = StringIO()
+        call_command("refresh_categories", stdout=out)
+        self.assertIn("Refreshed 2 categories", out.getvalue())
+        self.assertEqual(self.counters(self.brakes), (2, 1, Decimal("80.00")))
@@ -0,0 +1,114 @@
+"""Capture of sanitized request records for load-test replay.
+
+:class:`~inventory.middleware.TrafficCaptureMiddleware` hands one record
+per request to a :class:`TrafficRecorder`, which buffers them and appends
+them to a JSONL file in batches. ``manage.py replay_traffic`` re-issues the
+captured requests against a running server.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+# Query parameters whose values are never written to the capture file.
+SENSITIVE_PARAMS = ("password", "token", "secret", "key", "csrf", "session")
+REDACTED = "[redacted]"
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def sanitize_query(query_dict):
+    """Return ``query_dict`` urlencoded with sensitive values redacted."""
+    pairs = []
+    for name, values in query_dict.lists():
+        sensitive = any(marker in name.lower() for marker in SENSITIVE_PARAMS)
+        pairs.extend((name, REDACTED if sensitive else value) for value in values)
+    return urlencode(pairs)
+
+
+def request_role(user):
+    """Return ``admin``, ``employee`` or ``anonymous`` for ``user``."""
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+    if user.is_staff or user.is_superuser:
+        return "admin"
+    return "employee"
+
+
+class TrafficRecorder:
+    """Thread-safe buffered JSONL writer.
+
+    Records are flushed when ``buffer_size`` of them are waiting, when the
+    oldest waiting record is ``flush_interval`` seconds old, and at exit.
+    """
+
+    def __init__(self, path, buffer_size=100, flush_interval=5.0):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, entry):
+        """Buffer ``entry``, flushing if the buffer is full or stale."""
+        with self._lock:
+            self._buffer.append(json.dumps(entry, separators=(",", ":")))
+            due = (
+                len(self._buffer) >= self.buffer_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if due:
+                self._flush_locked()
+
+    def flush(self):
+        """Write every buffered record to the capture file."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as capture_file:
+            capture_file.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+
+
+def get_recorder(path, buffer_size=100, flush_interval=5.0):
+    """Return the process-wide recorder writing to ``path``."""
+    with _recorders_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            recorder = TrafficRecorder(path, buffer_size, flush_interval)
+            _recorders[path] = recorder
+        return recorder
+
+
+def flush_all():
+    """Flush every recorder; registered to run at interpreter exit."""
+    with _recorders_lock:
+        recorders = list(_recorders.values())
+    for recorder in recorders:
+        recorder.flush()
+
+
+atexit.register(flush_all)
+
+
+def load_capture(path):
+    """Return the records of a capture file, oldest first."""
+    records = []
+    with open(path, encoding="utf-8") as capture_file:
+        for line in capture_file:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    return records
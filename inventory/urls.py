@@ -38,6 +38,16 @@ urlpatterns = [
 
     path("parts/", views.spare_parts_list, name="spare_parts_list"),
     path("parts/add/", views.add_part, name="add_part"),
+    path(
+        "parts/bulk-update/",
+        views.bulk_update_parts,
+        name="bulk_update_parts",
+    ),
+    path(
+        "parts/simulate/",
+        views.safety_stock_simulation,
+        name="safety_stock_simulation",
+    ),
     path("parts/edit/<int:pk>/", views.edit_part, name="edit_part"),
     path("parts/delete/<int:pk>/", views.delete_part, name="delete_part"),
 
@@ -72,7 +82,22 @@ urlpatterns = [
         views.force_password_change,
         name="force_password_change",
     ),
+    path(
+        "set-password/<uidb64>/<token>/",
+        views.set_password,
+        name="set_password",
+    ),
     path("purchase-list/", views.purchase_list, name="purchase_list"),
+    path(
+        "reports/dead-stock/",
+        views.dead_stock_report,
+        name="dead_stock_report",
+    ),
+    path(
+        "purchase-orders/<int:pk>/",
+        views.purchase_order_detail,
+        name="purchase_order_detail",
+    ),
 
     path(
         "api/stock-status/",
@@ -84,4 +109,22 @@ urlpatterns = [
         views.get_top_parts_data,
         name="get_top_parts_data",
     ),
+    path("api/parts/", views.get_parts_data, name="get_parts_data"),
+    path(
+        "api/parts/<int:pk>/",
+        views.get_part_data,
+        name="get_part_data",
+    ),
+    path(
+        "api/parts/<int:pk>/history/",
+        views.get_part_history,
+        name="get_part_history",
+    ),
+    path("api/jobs/<int:pk>/", views.get_job_status, name="get_job_status"),
+    path(
+        "api/reports/dead-stock/",
+        views.get_dead_stock_data,
+        name="get_dead_stock_data",
+    ),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
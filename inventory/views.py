@@ -6,25 +6,54 @@ This file contains Django views for the inventory app.
 
 # Standard library
 import csv
-import uuid
+import functools
+from datetime import datetime
 
 # Django / third-party
+from asgiref.sync import sync_to_async
 from django import forms
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
-from django.db import models
+from django.contrib.auth.tokens import default_token_generator
+from django.core.paginator import Paginator
+from django.db import models, transaction
 from django.db.models import Sum
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views.decorators.http import require_POST, require_GET, require_http_methods
 
 # Local app
-from .forms import EmployeeForm, SparePartForm, SupplierForm
-from .models import Sale, SparePart, UserProfile, Supplier
+from . import (
+    archive,
+    bulk,
+    categories,
+    classification,
+    history,
+    purchasing,
+    reports,
+    scorecard,
+    simulation,
+)
+from .forms import (
+    BulkPartUpdateForm,
+    EmployeeForm,
+    SafetyStockSimulationForm,
+    SparePartForm,
+    SupplierForm,
+)
+from .jobs import enqueue
+from .metrics import render_latest as render_metrics
+from .models import Job, PurchaseOrder, Sale, SparePart, UserProfile, Supplier
+from .outbox import enqueue_email
 
 
 class EmployeeUpdateForm(forms.ModelForm):
@@ -128,8 +157,7 @@ def admin_dashboard(request):
     low_stock_count = low_stock_parts.count()
     out_of_stock_count = out_of_stock_parts.count()
     stock_value = sum(p.quantity * p.price for p in parts)
-    sales_count = Sale.objects.count()
-    sales_revenue = sum(s.total_price for s in Sale.objects.all())
+    sales_count, sales_revenue = archive.sales_totals()
     in_stock = parts.filter(quantity__gt=models.F("minimum_stock")).count()
 
     context = {
@@ -141,7 +169,9 @@ def admin_dashboard(request):
         "stock_value": f"{stock_value:.2f}",
         "sales_count": sales_count,
         "sales_revenue": f"{sales_revenue:.2f}",
-        "low_stock_alerts": low_stock_parts[:5],
+        "low_stock_alerts": low_stock_parts.select_related("supplier", "category")
+        .order_by(classification.priority(), "quantity")[:5],
+        "low_stock_by_class": classification.class_counts(low_stock_parts),
         "in_stock": in_stock,
     }
     return render(request, "inventory/admin_dashboard.html", context)
@@ -162,9 +192,7 @@ def employee_dashboard(request):
     total_parts = parts.count()
     low_stock_count = low_stock_parts.count()
 
-    sales = Sale.objects.all()
-    total_sales = sales.count()
-    total_revenue = sum(s.total_price for s in sales)
+    total_sales, total_revenue = archive.sales_totals()
 
     context = {
         "user_role": "employee",
@@ -174,25 +202,72 @@ def employee_dashboard(request):
         "out_of_stock": out_of_stock,
         "total_sales": total_sales,
         "total_revenue": f"{total_revenue:.2f}",
-        "low_stock_alerts": low_stock_parts[:5],
+        "low_stock_alerts": low_stock_parts.select_related("supplier", "category")
+        .order_by(classification.priority(), "quantity")[:5],
     }
     return render(request, "inventory/employee_dashboard.html", context)
 
 
-@login_required(login_url="login")
-@require_GET
-def get_stock_status_data(request):  # pylint: disable=unused-argument
+def async_login_required(view_func):
+    """Async counterpart of ``login_required`` for coroutine views.
+
+    ``request.user`` is resolved lazily from the session, which touches the
+    database, so it is evaluated in a worker thread before the view runs.
+    """
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(
+            lambda: request.user.is_authenticated,
+        )()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), "login")
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_require_GET(view_func):  # pylint: disable=invalid-name
+    """Async counterpart of ``require_GET`` for coroutine views."""
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return HttpResponseNotAllowed(["GET"])
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _part_as_dict(part):
+    """Serialize a spare part for the JSON API."""
+    return {
+        "id": part.id,
+        "part_number": part.part_number,
+        "part_name": part.part_name,
+        "category": part.category.name if part.category else "",
+        "quantity": part.quantity,
+        "minimum_stock": part.minimum_stock,
+        "price": str(part.price),
+        "is_low_stock": part.is_low_stock,
+        "abc_class": part.abc_class,
+    }
+
+
+@async_login_required
+@async_require_GET
+async def get_stock_status_data(request):  # pylint: disable=unused-argument
     """Return JSON with counts of in/low/out-of-stock parts."""
     try:
         parts = SparePart.objects.all()
-        in_stock = parts.filter(
+        in_stock = await parts.filter(
             quantity__gt=models.F("minimum_stock"),
-        ).count()
-        low_stock = parts.filter(
+        ).acount()
+        low_stock = await parts.filter(
             quantity__lte=models.F("minimum_stock"),
             quantity__gt=0,
-        ).count()
-        out_of_stock = parts.filter(quantity=0).count()
+        ).acount()
+        out_of_stock = await parts.filter(quantity=0).acount()
 
         data = {
             "in_stock": in_stock,
@@ -210,22 +285,25 @@ def get_stock_status_data(request):  # pylint: disable=unused-argument
         )
 
 
-@login_required(login_url="login")
-@require_GET
-def get_top_parts_data(request):  # pylint: disable=unused-argument
+@async_login_required
+@async_require_GET
+async def get_top_parts_data(request):  # pylint: disable=unused-argument
     """Return JSON with top parts (by quantity sold) for charts."""
     try:
-        top_parts = (
-            Sale.objects.values("part__part_name")
+        top_parts = [
+            item
+            async for item in Sale.objects.values("part__part_name")
             .annotate(total_quantity=Sum("quantity_sold"))
             .order_by("-total_quantity")[:5]
-        )
+        ]
 
         if top_parts:
             labels = [item["part__part_name"] for item in top_parts]
             quantities = [item["total_quantity"] for item in top_parts]
         else:
-            fallback_parts = SparePart.objects.all().order_by("-quantity")[:5]
+            fallback_parts = [
+                p async for p in SparePart.objects.all().order_by("-quantity")[:5]
+            ]
             labels = [p.part_name for p in fallback_parts]
             quantities = [p.quantity for p in fallback_parts]
 
@@ -248,16 +326,241 @@ def get_top_parts_data(request):  # pylint: disable=unused-argument
         )
 
 
+@async_login_required
+@async_require_GET
+async def get_parts_data(request):
+    """Return a page of parts as JSON, with search, stock, class and category filters."""
+    parts = classification.filter_class(
+        SparePart.objects.select_related("category").order_by("part_number"),
+        request.GET.get("abc"),
+    )
+    category = request.GET.get("category", "")
+    if category.isdigit():
+        parts = parts.filter(category_id=category)
+    query = request.GET.get("q", "").strip()
+    stock_filter = request.GET.get("stock_filter", "")
+
+    if query:
+        parts = parts.filter(
+            models.Q(part_name__icontains=query)
+            | models.Q(part_number__icontains=query),
+        )
+
+    if stock_filter == "low":
+        parts = parts.filter(
+            quantity__lte=models.F("minimum_stock"),
+            quantity__gt=0,
+        )
+    elif stock_filter == "out":
+        parts = parts.filter(quantity=0)
+
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+        page_size = min(max(int(request.GET.get("page_size", 50)), 1), 200)
+    except ValueError:
+        return JsonResponse(
+            {"error": "page and page_size must be integers", "success": False},
+            status=400,
+        )
+
+    offset = (page - 1) * page_size
+    total = await parts.acount()
+    results = [
+        _part_as_dict(part) async for part in parts[offset:offset + page_size]
+    ]
+
+    return JsonResponse(
+        {
+            "results": results,
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "success": True,
+        },
+    )
+
+
+@async_login_required
+@async_require_GET
+async def get_part_data(request, pk):  # pylint: disable=unused-argument
+    """Return a single part as JSON."""
+    try:
+        part = await SparePart.objects.select_related("supplier", "category").aget(pk=pk)
+    except SparePart.DoesNotExist:
+        return JsonResponse(
+            {"error": "Part not found", "success": False},
+            status=404,
+        )
+
+    data = _part_as_dict(part)
+    data["supplier"] = part.supplier.name if part.supplier else None
+    data["location"] = part.location
+    data["description"] = part.description
+    data["success"] = True
+    return JsonResponse(data)
+
+
+@async_login_required
+@async_require_GET
+async def get_dead_stock_data(request):
+    """Return a page of the dead-stock report as JSON (admin only)."""
+    is_admin = await sync_to_async(
+        lambda: request.user.is_staff or request.user.is_superuser,
+    )()
+    if not is_admin:
+        return JsonResponse(
+            {"error": "Admin access required", "success": False},
+            status=403,
+        )
+
+    try:
+        days = reports.parse_days(request.GET.get("days"))
+        page = max(int(request.GET.get("page", 1)), 1)
+        page_size = min(max(int(request.GET.get("page_size", 50)), 1), 200)
+    except ValueError:
+        return JsonResponse(
+            {
+                "error": f"days must be 1-{reports.MAX_DAYS}; page and page_size integers",
+                "success": False,
+            },
+            status=400,
+        )
+
+    parts = reports.dead_stock(days)
+    totals = await sync_to_async(reports.summary)(parts)
+    offset = (page - 1) * page_size
+    rows = reports.with_last_sale(parts).select_related("supplier", "category")
+    rows = rows[offset:offset + page_size]
+    return JsonResponse(
+        {
+            "days": days,
+            "results": [reports.as_row(part) async for part in rows],
+            "page": page,
+            "page_size": page_size,
+            "total": totals["parts"],
+            "total_value": str(totals["value"]),
+            "success": True,
+        },
+    )
+
+
+def _parse_instant(value):
+    """Parse an ISO date or datetime query parameter into an aware datetime.
+
+    Returns None for an empty value; raises ValueError if it is malformed.
+    """
+    if not value:
+        return None
+    instant = parse_datetime(value)
+    if instant is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        instant = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(instant):
+        instant = timezone.make_aware(instant)
+    return instant
+
+
+@async_login_required
+@async_require_GET
+async def get_part_history(request, pk):
+    """Return a part's stock level over time, downsampled for charts.
+
+    ``from`` and ``to`` are ISO dates or datetimes and default to the
+    part's creation and now. ``points`` caps the series length and
+    ``method`` picks ``minmax`` (default) or ``lttb`` bucketing.
+    """
+    try:
+        part = await SparePart.objects.aget(pk=pk)
+    except SparePart.DoesNotExist:
+        return JsonResponse(
+            {"error": "Part not found", "success": False},
+            status=404,
+        )
+
+    try:
+        end = _parse_instant(request.GET.get("to")) or timezone.now()
+        start = _parse_instant(request.GET.get("from")) or part.created_at
+        points = int(request.GET.get("points", history.DEFAULT_POINTS))
+    except ValueError:
+        return JsonResponse(
+            {
+                "error": "from and to must be ISO dates, points an integer",
+                "success": False,
+            },
+            status=400,
+        )
+    method = request.GET.get("method", "minmax")
+    if method not in history.METHODS or start >= end:
+        return JsonResponse(
+            {"error": "Invalid method or empty time range", "success": False},
+            status=400,
+        )
+    points = min(max(points, 4), history.MAX_POINTS)
+
+    data = await sync_to_async(history.part_history)(pk, start, end, points, method)
+    data.update(
+        {
+            "part_id": part.pk,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "success": True,
+        }
+    )
+    return JsonResponse(data)
+
+
+@async_login_required
+@async_require_GET
+async def get_job_status(request, pk):
+    """Return the status of a background job so the UI can poll for it."""
+    is_admin = await sync_to_async(
+        lambda: request.user.is_staff or request.user.is_superuser,
+    )()
+    if not is_admin:
+        return JsonResponse(
+            {"error": "Admin access required", "success": False},
+            status=403,
+        )
+
+    try:
+        job = await Job.objects.aget(pk=pk)
+    except Job.DoesNotExist:
+        return JsonResponse(
+            {"error": "Job not found", "success": False},
+            status=404,
+        )
+
+    return JsonResponse(
+        {
+            "id": job.id,
+            "name": job.name,
+            "status": job.status,
+            "attempts": job.attempts,
+            "result": job.result,
+            "error": job.error.strip().splitlines()[-1] if job.error else "",
+            "created_at": job.created_at.isoformat(),
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "success": True,
+        },
+    )
+
+
 @login_required(login_url="login")
 @require_GET
 def employee_parts_list(request):
-    """Employee-facing parts listing with optional search and stock filtering."""
+    """Employee-facing parts listing with optional search, stock and category filtering."""
     if request.user.is_staff or request.user.is_superuser:
         return redirect("spare_parts_list")
 
-    parts = SparePart.objects.all()
+    parts = SparePart.objects.select_related("category")
     query = request.GET.get("q", "").strip()
     stock_filter = request.GET.get("stock_filter", "")
+    category = request.GET.get("category", "")
+
+    if category.isdigit():
+        parts = parts.filter(category_id=category)
 
     if query:
         parts = parts.filter(
@@ -287,7 +590,9 @@ def employee_parts_list(request):
         "low_stock_count": low_stock_count,
         "out_of_stock_count": out_of_stock_parts.count(),
         "stock_value": f"{stock_value:.2f}",
-        "low_stock_alerts": low_stock_parts[:5],
+        "low_stock_alerts": low_stock_parts.select_related("supplier", "category")[:5],
+        "categories": categories.facets(),
+        "category": category,
         "is_employee": True,
     }
     return render(request, "inventory/employee_parts_list.html", context)
@@ -345,9 +650,9 @@ def employee_delete_part(request, pk):
     if request.user.is_staff or request.user.is_superuser:
         return redirect("delete_part", pk=pk)
 
-    part = get_object_or_404(SparePart, pk=pk)
+    part = get_object_or_404(SparePart.objects.select_related("category"), pk=pk)
     if request.method == "POST":
-        part.delete()
+        archive.delete_parts(SparePart.objects.filter(pk=part.pk))
         return redirect("employee_parts_list")
 
     return render(
@@ -383,9 +688,7 @@ def admin_analytics(request):
     ).count()
     out_of_stock = parts.filter(quantity=0).count()
 
-    sales = Sale.objects.all()
-    total_sales = sales.count()
-    total_revenue = sum(s.total_price for s in sales)
+    total_sales, total_revenue = archive.sales_totals()
 
     context = {
         "user_role": "admin",
@@ -405,8 +708,12 @@ def admin_analytics(request):
 @login_required(login_url="login")
 @require_GET
 def spare_parts_list(request):
-    """Admin-facing spare parts list."""
-    parts = SparePart.objects.all()
+    """Admin-facing spare parts list, optionally limited to one ABC class."""
+    abc_class = request.GET.get("abc", "").upper()
+    parts = classification.filter_class(
+        SparePart.objects.select_related("category"),
+        abc_class,
+    )
     low_stock_parts = parts.filter(quantity__lte=models.F("minimum_stock"))
     out_of_stock_parts = parts.filter(quantity=0)
     stock_value = sum(p.quantity * p.price for p in parts)
@@ -418,11 +725,89 @@ def spare_parts_list(request):
         "low_stock_count": low_stock_parts.count(),
         "out_of_stock_count": out_of_stock_parts.count(),
         "stock_value": f"{stock_value:.2f}",
-        "low_stock_alerts": low_stock_parts[:5],
+        "low_stock_alerts": low_stock_parts.select_related("supplier", "category")[:5],
+        "abc_class": abc_class,
+        "abc_classes": classification.CLASSES,
+        "categories": categories.facets(),
     }
     return render(request, "inventory/parts_list.html", context)
 
 
+@login_required(login_url="login")
+@require_http_methods(["GET", "POST"])
+def bulk_update_parts(request):
+    """Apply one set-based change to all parts matching a category/supplier."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect("employee_dashboard")
+
+    updated = None
+    if request.method == "POST":
+        form = BulkPartUpdateForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            parts = SparePart.objects.all()
+            if data["category"]:
+                parts = parts.filter(category=data["category"])
+            if data["supplier"]:
+                parts = parts.filter(supplier=data["supplier"])
+            operation = data["operation"]
+            value = (
+                data["new_supplier"]
+                if operation == "reassign_supplier"
+                else data["value"]
+            )
+            updated = bulk.apply_operation(parts, operation, value)
+    else:
+        form = BulkPartUpdateForm()
+
+    return render(
+        request,
+        "inventory/bulk_update_parts.html",
+        {"form": form, "updated": updated, "user_role": "admin"},
+    )
+
+
+@login_required(login_url="login")
+@require_http_methods(["GET", "POST"])
+def safety_stock_simulation(request):
+    """Queue a safety-stock simulation and show its report when it is done."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect("employee_dashboard")
+
+    if request.method == "POST":
+        form = SafetyStockSimulationForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            job = enqueue(
+                simulation.SIMULATION_JOB,
+                {
+                    "category": data["category"].name if data["category"] else "",
+                    "supplier_id": data["supplier"].pk if data["supplier"] else None,
+                    "candidates": data["candidates"],
+                    "runs": data["runs"],
+                    "horizon": data["horizon"],
+                },
+            )
+            return redirect(f"{request.path}?job={job.pk}")
+    else:
+        form = SafetyStockSimulationForm()
+
+    job = None
+    job_id = request.GET.get("job", "")
+    if job_id.isdigit():
+        job = Job.objects.filter(pk=job_id, name=simulation.SIMULATION_JOB).first()
+    return render(
+        request,
+        "inventory/safety_stock_simulation.html",
+        {
+            "form": form,
+            "job": job,
+            "report": job.result if job and job.status == Job.STATUS_SUCCEEDED else None,
+            "user_role": "admin",
+        },
+    )
+
+
 @login_required(login_url="login")
 @require_http_methods(["GET", "POST"])
 def add_part(request):
@@ -463,10 +848,14 @@ def edit_part(request, pk):
 @login_required(login_url="login")
 @require_http_methods(["GET", "POST"])
 def delete_part(request, pk):
-    """Admin delete part view."""
+    """Admin delete part view; posting ``archive`` archives it instead."""
     part = get_object_or_404(SparePart, pk=pk)
     if request.method == "POST":
-        part.delete()
+        parts = SparePart.objects.filter(pk=part.pk)
+        if request.POST.get("archive"):
+            archive.archive_parts(parts)
+        else:
+            archive.delete_parts(parts)
         return redirect("spare_parts_list")
     return render(
         request,
@@ -539,7 +928,9 @@ def employees_list(request):
     if not (request.user.is_staff or request.user.is_superuser):
         return redirect("employee_dashboard")
 
-    employees = User.objects.filter(userprofile__role="employee")
+    employees = User.objects.filter(userprofile__role="employee").select_related(
+        "userprofile",
+    )
     total_employees = employees.count()
 
     context = {
@@ -557,13 +948,16 @@ def sales_list(request):
     if not (request.user.is_staff or request.user.is_superuser):
         return redirect("employee_dashboard")
 
-    suppliers = Supplier.objects.all().order_by("name")
-    total_suppliers = suppliers.count()
+    suppliers = list(Supplier.objects.all().order_by("name"))
+    cards = scorecard.scorecard()
+    for supplier in suppliers:
+        supplier.card = cards.get(supplier.pk, scorecard.EMPTY)
 
     context = {
         "suppliers": suppliers,
         "user_role": "admin",
-        "total_suppliers": total_suppliers,
+        "total_suppliers": len(suppliers),
+        "scorecard_days": settings.SUPPLIER_SCORECARD_DAYS,
     }
     return render(request, "inventory/sales_list.html", context)
 
@@ -657,50 +1051,55 @@ def add_employee(request):
                     {"form": form, "user_role": "admin"},
                 )
 
-            random_password = str(uuid.uuid4())[:8]
-
-            user = User.objects.create_user(
-                username=username,
-                email=form.cleaned_data.get("email", ""),
-                first_name=form.cleaned_data.get("first_name", ""),
-                last_name=form.cleaned_data.get("last_name", ""),
-                password=random_password,
-                is_staff=False,
-                is_superuser=False,
-            )
-
-            UserProfile.objects.create(
-                user=user,
-                role="employee",
-                must_change_password=True,
-                mobile_number=form.cleaned_data.get("mobile_number", ""),
-            )
-
-            subject = "Your PartsTrack login credentials"
-            message = (
-                f"Hello {user.first_name},\n\n"
-                "Your PartsTrack employee account has been created.\n\n"
-                "Login URL: https://example.com/login/\n"
-                f"Username: {username}\n"
-                f"Password: {random_password}\n\n"
-                "Please log in and change your password after your first login."
-            )
+            with transaction.atomic():
+                # No one knows a password for the account until the employee
+                # chooses one through the emailed link.
+                user = User(
+                    username=username,
+                    email=User.objects.normalize_email(form.cleaned_data.get("email", "")),
+                    first_name=form.cleaned_data.get("first_name", ""),
+                    last_name=form.cleaned_data.get("last_name", ""),
+                    is_staff=False,
+                    is_superuser=False,
+                )
+                user.set_unusable_password()
+                user.save()
+
+                UserProfile.objects.create(
+                    user=user,
+                    role="employee",
+                    must_change_password=True,
+                    mobile_number=form.cleaned_data.get("mobile_number", ""),
+                )
 
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [form.cleaned_data.get("email")],
-                    fail_silently=False,
+                # The outbox keeps message bodies, so the email carries a
+                # one-time set-password link rather than the password.
+                set_password_url = request.build_absolute_uri(
+                    reverse(
+                        "set_password",
+                        args=[
+                            urlsafe_base64_encode(force_bytes(user.pk)),
+                            default_token_generator.make_token(user),
+                        ],
+                    )
                 )
-            except Exception:
-                # Ignore email errors so employee creation still works
-                pass
+                subject = "Set up your PartsTrack account"
+                message = (
+                    f"Hello {user.first_name},\n\n"
+                    "Your PartsTrack employee account has been created.\n\n"
+                    f"Username: {username}\n\n"
+                    "Choose your password here:\n"
+                    f"{set_password_url}\n\n"
+                    "The link can be used once and expires in "
+                    f"{settings.PASSWORD_RESET_TIMEOUT // 86400} days."
+                )
+
+                # Delivered by the send_outbox worker so the request never
+                # waits on the SMTP server.
+                enqueue_email(subject, message, [form.cleaned_data.get("email")])
 
             context = {
                 "employee": user,
-                "password": random_password,
                 "username": username,
                 "user_role": "admin",
                 "user": request.user,
@@ -716,7 +1115,6 @@ def add_employee(request):
     )
 
 
-
 @login_required(login_url="login")
 @require_http_methods(["GET", "POST"])
 def force_password_change(request):
@@ -725,29 +1123,64 @@ def force_password_change(request):
     profile = UserProfile.objects.get(user=user)
 
     if request.method == "POST":
-        new_password = request.POST.get("new_password")
-        confirm_password = request.POST.get("confirm_password")
-
-        if not new_password or not confirm_password:
+        new_password, error = _new_password_from(request)
+        if error:
             return render(
                 request,
                 "inventory/force_password_change.html",
-                {"error": "Please fill in both fields."},
+                {"error": error},
             )
 
-        if new_password != confirm_password:
+        user.set_password(new_password)
+        user.save()
+        profile.must_change_password = False
+        profile.save()
+
+        logout(request)
+        return redirect("login")
+
+    return render(request, "inventory/force_password_change.html")
+
+
+def _new_password_from(request):
+    """Return ``(password, error)`` from a new/confirm password form post."""
+    new_password = request.POST.get("new_password")
+    confirm_password = request.POST.get("confirm_password")
+    if not new_password or not confirm_password:
+        return None, "Please fill in both fields."
+    if new_password != confirm_password:
+        return None, "Passwords do not match."
+    return new_password, None
+
+
+@require_http_methods(["GET", "POST"])
+def set_password(request, uidb64, token):
+    """Let a new employee choose a password from their welcome email link."""
+    try:
+        user = User.objects.get(pk=urlsafe_base64_decode(uidb64).decode())
+    except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+        user = None
+    # The token covers the password hash, so it stops working once used.
+    if user is None or not default_token_generator.check_token(user, token):
+        return render(
+            request,
+            "inventory/force_password_change.html",
+            {"error": "This link is invalid or has expired.", "invalid_link": True},
+            status=400,
+        )
+
+    if request.method == "POST":
+        new_password, error = _new_password_from(request)
+        if error:
             return render(
                 request,
                 "inventory/force_password_change.html",
-                {"error": "Passwords do not match."},
+                {"error": error},
             )
 
         user.set_password(new_password)
         user.save()
-        profile.must_change_password = False
-        profile.save()
-
-        logout(request)
+        UserProfile.objects.filter(user=user).update(must_change_password=False)
         return redirect("login")
 
     return render(request, "inventory/force_password_change.html")
@@ -756,16 +1189,36 @@ def force_password_change(request):
 @login_required(login_url="login")
 @require_http_methods(["GET", "POST"])
 def purchase_list(request):  # pylint: disable=unused-argument
-    """Render or export a CSV purchase list for parts under minimum stock."""
+    """Render the purchase list, export it as CSV or generate purchase orders."""
     if not (request.user.is_staff or request.user.is_superuser):
         return redirect("employee_dashboard")
 
-    parts = SparePart.objects.filter(
-        models.Q(quantity__lte=models.F("minimum_stock"))
-        | models.Q(quantity=0),
+    abc_class = request.GET.get("abc", "").upper()
+    candidates = classification.filter_class(SparePart.objects.all(), abc_class)
+    parts = purchasing.with_order_quantities(purchasing.low_stock(candidates)).order_by(
+        classification.priority(),
+        "quantity",
+        "part_number",
     )
 
     if request.method == "POST":
+        if request.POST.get("action") == "generate":
+            generated = purchasing.generate_orders(candidates, user=request.user)
+            if generated:
+                messages.success(
+                    request,
+                    f"Generated {len(generated)} purchase order"
+                    f"{'' if len(generated) == 1 else 's'}, one per supplier.",
+                )
+            else:
+                messages.info(
+                    request,
+                    "Nothing to order: every low-stock part is already covered "
+                    "by an open order.",
+                )
+            # Redirect so that reloading the page does not generate again.
+            return redirect(request.get_full_path())
+
         response = HttpResponse(
             content_type="text/csv",
             headers={
@@ -785,8 +1238,153 @@ def purchase_list(request):  # pylint: disable=unused-argument
 
         return response
 
+    orders = purchasing.with_totals(
+        PurchaseOrder.objects.filter(status__in=PurchaseOrder.OPEN_STATUSES)
+    ).select_related("supplier").order_by("-created_at", "pk")
     return render(
         request,
         "inventory/purchase_list.html",
-        {"parts": parts, "user_role": "admin"},
+        {
+            "parts": parts,
+            "orders": orders,
+            "abc_class": abc_class,
+            "abc_classes": classification.CLASSES,
+            "user_role": "admin",
+        },
+    )
+
+
+def _received_quantities(request, lines):
+    """Return ``{part_id: quantity}`` from the posted ``qty_<part_id>`` fields.
+
+    Raises ``ValueError`` when a filled-in quantity is not a whole number.
+    """
+    received = {}
+    for line in lines:
+        value = request.POST.get(f"qty_{line.part_id}", "").strip()
+        if not value:
+            continue
+        if not value.isdigit():
+            raise ValueError(f"{line.part.part_number}: enter a whole number.")
+        received[line.part_id] = int(value)
+    return received
+
+
+@login_required(login_url="login")
+@require_http_methods(["GET", "POST"])
+def purchase_order_detail(request, pk):
+    """Show a purchase order, export it as CSV, or receive or cancel it."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect("employee_dashboard")
+
+    order = get_object_or_404(
+        purchasing.with_totals(PurchaseOrder.objects.select_related("supplier")),
+        pk=pk,
+    )
+    lines = order.lines.select_related("part").order_by("part__part_number")
+
+    error = None
+    if request.method == "POST":
+        action = request.POST.get("action")
+        try:
+            if action == "cancel":
+                purchasing.cancel_order(order)
+            elif action == "receive_all":
+                purchasing.receive_order(order)
+            else:
+                purchasing.receive_order(order, _received_quantities(request, lines))
+        except ValueError as exc:
+            error = str(exc)
+        else:
+            return redirect("purchase_order_detail", pk=order.pk)
+
+    if request.GET.get("format") == "csv":
+        response = HttpResponse(
+            content_type="text/csv",
+            headers={
+                "Content-Disposition": f'attachment; filename="{order.number}.csv"',
+            },
+        )
+        writer = csv.writer(response)
+        writer.writerow(["Part Number", "Part Name", "Quantity", "Unit Price"])
+        for line in lines:
+            writer.writerow(
+                [
+                    line.part.part_number,
+                    line.part.part_name,
+                    line.quantity_ordered,
+                    line.unit_price,
+                ],
+            )
+        return response
+
+    return render(
+        request,
+        "inventory/purchase_order_detail.html",
+        {
+            "order": order,
+            "lines": lines,
+            "error": error,
+            "is_open": order.status in PurchaseOrder.OPEN_STATUSES,
+            "user_role": "admin",
+        },
+    )
+
+
+@login_required(login_url="login")
+@require_GET
+def dead_stock_report(request):
+    """List parts with stock but no recent sales, or export them as CSV."""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return redirect("employee_dashboard")
+
+    error = None
+    try:
+        days = reports.parse_days(request.GET.get("days"))
+    except ValueError:
+        days = reports.parse_days(None)
+        error = f"Enter a whole number of days from 1 to {reports.MAX_DAYS}."
+    parts = reports.dead_stock(days)
+
+    rows = reports.with_last_sale(parts).select_related("supplier", "category")
+    if request.GET.get("format") == "csv":
+        response = HttpResponse(
+            content_type="text/csv",
+            headers={
+                "Content-Disposition": f'attachment; filename="dead_stock_{days}d.csv"',
+            },
+        )
+        writer = csv.writer(response)
+        writer.writerow(reports.CSV_FIELDS)
+        for part in rows.iterator(chunk_size=2000):
+            row = reports.as_row(part)
+            writer.writerow([row[field] for field in reports.CSV_FIELDS])
+        return response
+
+    totals = reports.summary(parts)
+    paginator = Paginator(rows, 50)
+    # The summary already counted the rows; reuse it instead of a COUNT(*).
+    paginator.count = totals["parts"]
+    page = paginator.get_page(request.GET.get("page"))
+    return render(
+        request,
+        "inventory/dead_stock_report.html",
+        {
+            "days": days,
+            "error": error,
+            "max_days": reports.MAX_DAYS,
+            "page": page,
+            "totals": totals,
+            "user_role": "admin",
+        },
     )
+
+
+@require_GET
+def metrics_view(request):
+    """Expose Prometheus metrics aggregated across all server workers."""
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
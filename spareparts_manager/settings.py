@@ -6,6 +6,8 @@ Generated by 'django-admin startproject' using Django 4.2.25.
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -16,6 +18,8 @@ SECRET_KEY = os.environ.get(
     "dev-only-insecure-key"
 )
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True  # OK for class project
 
@@ -36,11 +40,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "inventory.middleware.AccessLogMiddleware",
+    "inventory.middleware.MetricsMiddleware",
+    "inventory.middleware.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "inventory.middleware.ProfilingMiddleware",
+    "inventory.middleware.TrafficCaptureMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -64,12 +73,17 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "spareparts_manager.wsgi.application"
+# Production runs the ASGI app under uvicorn workers (see gunicorn.conf.py).
+ASGI_APPLICATION = "spareparts_manager.asgi.application"
 
 # Database
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Web and job-worker processes share this file; wait for locks
+        # instead of failing immediately with "database is locked".
+        "OPTIONS": {"timeout": 20},
     }
 }
 
@@ -118,3 +132,181 @@ EMAIL_HOST_USER = "abinjprakash622@gmail.com"
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# ---- EMAIL OUTBOX ----
+# Mail is queued in the database and delivered by `manage.py send_outbox`.
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", 60))
+OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get("OUTBOX_RETRY_MAX_SECONDS", 3600))
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", 600))
+
+# ---- LOW-STOCK ALERTS ----
+# Threshold crossings are batched into one digest per recipient at most
+# every STOCK_ALERT_DIGEST_INTERVAL seconds. Recipients default to active
+# staff users with an email address.
+STOCK_ALERT_DIGEST_INTERVAL = int(os.environ.get("STOCK_ALERT_DIGEST_INTERVAL", 900))
+STOCK_ALERT_RECIPIENTS = [
+    address.strip()
+    for address in os.environ.get("STOCK_ALERT_RECIPIENTS", "").split(",")
+    if address.strip()
+]
+
+# ---- REQUEST INSTRUMENTATION ----
+# QueryInstrumentationMiddleware logs per-request query counts and timings.
+# Budgets map URL names to a maximum query count; QUERY_BUDGET_STRICT makes
+# overruns raise (the test runner enables it), otherwise they are logged.
+QUERY_BUDGET_DEFAULT = int(os.environ.get("QUERY_BUDGET_DEFAULT", 50))
+QUERY_BUDGETS = {}
+QUERY_BUDGET_STRICT = TESTING or os.environ.get("QUERY_BUDGET_STRICT") == "1"
+QUERY_DUPLICATE_THRESHOLD = 3
+
+# Optional bearer token required to scrape /metrics.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# ---- PROFILING ----
+# Fraction of requests run under cProfile; staff can also force a profile
+# by sending the PROFILING_HEADER header. Summarize with profile_summary.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_HEADER = "X-Profile-Request"
+PROFILING_DIR = os.environ.get("PROFILING_DIR", os.path.join(BASE_DIR, "profiles"))
+
+# ---- TRAFFIC CAPTURE ----
+# Sanitized request records for load-test replay (manage.py replay_traffic).
+# Buffered: written every BUFFER_SIZE records or FLUSH_INTERVAL seconds.
+TRAFFIC_CAPTURE_ENABLED = os.environ.get("TRAFFIC_CAPTURE") == "1"
+TRAFFIC_CAPTURE_FILE = os.environ.get(
+    "TRAFFIC_CAPTURE_FILE",
+    os.path.join(BASE_DIR, "traffic", "requests.jsonl"),
+)
+TRAFFIC_CAPTURE_BUFFER_SIZE = 100
+TRAFFIC_CAPTURE_FLUSH_INTERVAL = 5.0
+
+# ---- ARCHIVING ----
+# Sales moved per transaction when parts are archived or bulk-deleted.
+ARCHIVE_CHUNK_SIZE = 5000
+# Whole months of sales kept in the live Sale table; the monthly
+# archive.old_sales job moves older ones to ArchivedSale.
+SALE_ARCHIVE_HORIZON_MONTHS = int(os.environ.get("SALE_ARCHIVE_HORIZON_MONTHS", 12))
+
+# ---- STOCK LEDGER ----
+# Seconds between ledger.snapshot runs; point-in-time stock reads at most
+# this much of the movement ledger past the nearest snapshot.
+STOCK_SNAPSHOT_INTERVAL = int(os.environ.get("STOCK_SNAPSHOT_INTERVAL", 86400))
+
+# ---- DEMAND FORECAST ----
+# The forecast.demand job suggests minimum_stock (the reorder point) and
+# reorder_quantity from the last FORECAST_HISTORY_DAYS days of sales.
+FORECAST_INTERVAL = int(os.environ.get("FORECAST_INTERVAL", 86400))
+FORECAST_HISTORY_DAYS = 180
+FORECAST_METHOD = "ewma"  # or "sma" for a plain moving average
+FORECAST_SMOOTHING = 0.1
+FORECAST_LEAD_TIME_DAYS = 7
+FORECAST_REVIEW_DAYS = 30
+FORECAST_SERVICE_LEVEL = 0.95
+
+# ---- ABC CLASSIFICATION ----
+# The abc.classify job runs nightly at ABC_RUN_HOUR (local time) and ranks
+# parts by their sales over the last ABC_WINDOW_DAYS days: A covers the
+# first ABC_A_SHARE of revenue or units, B the rest up to ABC_B_SHARE.
+ABC_RUN_HOUR = 2
+ABC_WINDOW_DAYS = 365
+ABC_A_SHARE = 0.8
+ABC_B_SHARE = 0.95
+
+# ---- TABLE STATISTICS ----
+# The db.analyze job refreshes the planner statistics nightly at
+# ANALYZE_RUN_HOUR (local time); the admin shows them as row estimates.
+ANALYZE_RUN_HOUR = 3
+
+# ---- DEAD STOCK REPORT ----
+# Default window of the dead-stock report: parts with stock and no sale in
+# this many days. Keep it within SALE_ARCHIVE_HORIZON_MONTHS.
+DEAD_STOCK_DAYS = 180
+
+# ---- CACHE ----
+# File-based, so every gunicorn worker and the job worker share one cache
+# and see each other's invalidations. Tests use a local-memory cache.
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        if TESTING
+        else {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "partstrack-cache"),
+            ),
+        }
+    ),
+}
+
+# ---- SUPPLIER SCORECARD ----
+# The suppliers page shows each supplier's sales revenue over the last
+# SUPPLIER_SCORECARD_DAYS days. The scorecard is cached until a part or
+# sale is written, and for at most SUPPLIER_SCORECARD_TTL seconds.
+SUPPLIER_SCORECARD_DAYS = 90
+SUPPLIER_SCORECARD_TTL = int(os.environ.get("SUPPLIER_SCORECARD_TTL", 3600))
+
+# ---- SAFETY-STOCK SIMULATION ----
+# Monte Carlo runs and days simulated per part; the holding rate is the
+# yearly cost of stock as a share of its value. Workers default to one
+# process per CPU.
+SIMULATION_RUNS = 200
+SIMULATION_HORIZON_DAYS = 90
+SIMULATION_HOLDING_RATE = 0.25
+SIMULATION_WORKERS = int(os.environ.get("SIMULATION_WORKERS", 0)) or None
+
+# ---- SLOW QUERY LOG ----
+# Queries slower than this are logged with their plan; unset to disable.
+SLOW_QUERY_THRESHOLD_MS = (
+    None if TESTING else float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+)
+
+LOG_DIR = os.environ.get("LOG_DIR", os.path.join(BASE_DIR, "logs"))
+os.makedirs(LOG_DIR, exist_ok=True)
+SLOW_QUERY_LOG_FILE = os.path.join(LOG_DIR, "slow_queries.log")
+# JSON access log, written from a background thread in batches; summarize
+# it with access_log_report.
+ACCESS_LOG_FILE = os.path.join(LOG_DIR, "access.log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "maxBytes": 20 * 1024 * 1024,
+            "backupCount": 5,
+        },
+        "access": {
+            "class": "inventory.access_log.AsyncAccessLogHandler",
+            "filename": ACCESS_LOG_FILE,
+            "maxBytes": 50 * 1024 * 1024,
+            "backupCount": 10,
+            "batch_size": 200,
+            "flush_interval": 1.0,
+        },
+    },
+    "loggers": {
+        "inventory.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get(
+                "REQUEST_LOG_LEVEL",
+                "WARNING" if TESTING else "INFO",
+            ),
+            "propagate": False,
+        },
+        "inventory.access": {
+            "handlers": ["access"],
+            "level": "WARNING" if TESTING else "INFO",
+            "propagate": False,
+        },
+        "inventory.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}